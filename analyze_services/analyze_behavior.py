@@ -1,24 +1,63 @@
 import os
 import re
-import html
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from zoneinfo import ZoneInfo
-from flask import Flask, request, jsonify, make_response
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import cross_val_score, StratifiedKFold
-from supabase import create_client
+from flask import Flask, request, jsonify, make_response, Response, stream_with_context
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 import json
-import joblib
-import subprocess
+import importlib
+import importlib.metadata
+import importlib.util
 import sys
 import argparse
+import gc
+import signal
 import traceback
 import threading
+import math
+import bisect
+import heapq
+import base64
+import time
+import random
+import hashlib
+import socket
+import sqlite3
+from collections import OrderedDict, deque
+try:
+    import fcntl
+except ImportError:  # not on POSIX: the single dev process is always the scheduler leader
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import multiprocessing
+
+# ------------------- Lazy imports -------------------
+# pandas, numpy, joblib, scikit-learn, the Supabase client and APScheduler take well over a
+# second to import, which used to land on the first request after a cold start. They are
+# loaded on first use instead, and init_services() warms them in the background.
+
+class _LazyModule:
+    """Module stand-in that imports `name` on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+pd = _LazyModule("pandas")
+np = _LazyModule("numpy")
+joblib = _LazyModule("joblib")
 
 # Load environment variables
 load_dotenv()
@@ -26,7 +65,299 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", "5000"))
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# The client's HTTP connection pool, shared by every request thread (and greenlet) and
+# the background threads: keep-alive connections, HTTP/2 when the h2 package is
+# installed, bounded timeouts on every call, and retries with jitter for reads.
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "32"))
+# Below the pool size, connections past the cap are closed after every call under load
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", str(SUPABASE_POOL_MAX_CONNECTIONS)))
+SUPABASE_KEEPALIVE_SECONDS = float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "1").lower() in ("1", "true", "yes")
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "10"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))  # waiting for a free connection
+SUPABASE_READ_RETRIES = int(os.getenv("SUPABASE_READ_RETRIES", "2"))
+SUPABASE_RETRY_BACKOFF_SECONDS = float(os.getenv("SUPABASE_RETRY_BACKOFF_SECONDS", "0.2"))
+SUPABASE_SLOW_CALL_MS = float(os.getenv("SUPABASE_SLOW_CALL_MS", "1000"))
+SUPABASE_RETRY_STATUSES = (502, 504)  # postgrest-py already retries reads on 503 and 520
+# Circuit breakers per table: SUPABASE_BREAKER_FAILURES failed or slow calls in a row open
+# a table's circuit, reads then get the last-known-good response for the same query
+# without waiting on Supabase, and after SUPABASE_BREAKER_OPEN_SECONDS one probe call
+# is let through to test recovery.
+SUPABASE_BREAKER_FAILURES = int(os.getenv("SUPABASE_BREAKER_FAILURES", "5"))
+SUPABASE_BREAKER_SLOW_MS = float(os.getenv("SUPABASE_BREAKER_SLOW_MS", "3000"))
+SUPABASE_BREAKER_OPEN_SECONDS = float(os.getenv("SUPABASE_BREAKER_OPEN_SECONDS", "30"))
+SUPABASE_LKG_MAX_BYTES = int(os.getenv("SUPABASE_LKG_MAX_BYTES", str(64 * 1024 * 1024)))
+SUPABASE_LKG_MAX_BODY_BYTES = int(os.getenv("SUPABASE_LKG_MAX_BODY_BYTES", str(1024 * 1024)))
+
+_supabase_client = None
+_supabase_client_lock = threading.Lock()
+
+
+class DataCallMetrics:
+    """Per-call latency of Supabase requests, keyed by "METHOD table"."""
+
+    SAMPLE_SIZE = 512
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, elapsed_ms, error=False, retries=0):
+        with self._lock:
+            entry = self._calls.setdefault(key, {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0,
+                                                 "max_ms": 0.0, "samples": deque(maxlen=self.SAMPLE_SIZE)})
+            entry["calls"] += 1
+            entry["errors"] += bool(error)
+            entry["retries"] += retries
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["samples"].append(elapsed_ms)
+
+    def snapshot(self):
+        result = {}
+        with self._lock:
+            for key, entry in self._calls.items():
+                samples = sorted(entry["samples"])
+                result[key] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "mean_ms": round(entry["total_ms"] / entry["calls"], 1),
+                    "p50_ms": round(samples[len(samples) // 2], 1),
+                    "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                }
+        return result
+
+
+DATA_CALL_METRICS = DataCallMetrics()
+
+
+class DataCircuitOpenError(RuntimeError):
+    """A call refused because its table's circuit is open and nothing is cached for it."""
+
+
+class CircuitBreaker:
+    """closed -> open after SUPABASE_BREAKER_FAILURES consecutive failures -> half_open
+    after SUPABASE_BREAKER_OPEN_SECONDS, where a single probe call decides between
+    closed and open again."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_stale_at = None  # when a caller last got cached or no data from this table
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to Supabase now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= SUPABASE_BREAKER_OPEN_SECONDS:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return self.state == "closed"
+
+    def record(self, ok):
+        with self._lock:
+            self._probing = False
+            if ok:
+                if self.state != "closed":
+                    print(f"[CIRCUIT] {self.name}: closed after a successful probe")
+                self.state, self.failures = "closed", 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= SUPABASE_BREAKER_FAILURES):
+                print(f"[CIRCUIT] {self.name}: open after {self.failures} failed or slow call(s)")
+                self.state, self.opened_at = "open", time.monotonic()
+
+    def mark_stale(self):
+        self.last_stale_at = time.monotonic()
+
+    def status(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures,
+                    "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state != "closed" else None}
+
+
+class LastKnownGoodResponses:
+    """Bodies of the latest successful read per query URL, bounded by total size."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = SUPABASE_LKG_MAX_BYTES if max_bytes is None else max_bytes
+        self._responses = OrderedDict()  # url -> (status, headers, content, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def store(self, url, response):
+        content = response.content
+        if len(content) > SUPABASE_LKG_MAX_BODY_BYTES:
+            return
+        # The body is already decoded, so it must not be served with its transfer headers
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        with self._lock:
+            previous = self._responses.pop(url, None)
+            if previous is not None:
+                self._bytes -= len(previous[2])
+            self._responses[url] = (response.status_code, headers, content, time.time())
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes and self._responses:
+                self._bytes -= len(self._responses.popitem(last=False)[1][2])
+
+    def get(self, url):
+        with self._lock:
+            entry = self._responses.get(url)
+            if entry is not None:
+                self._responses.move_to_end(url)
+            return entry
+
+    def __len__(self):
+        return len(self._responses)
+
+
+DATA_CIRCUITS = {}  # table -> CircuitBreaker
+DATA_CIRCUITS_LOCK = threading.Lock()
+DATA_LAST_KNOWN_GOOD = LastKnownGoodResponses()
+
+
+def data_circuit(table):
+    with DATA_CIRCUITS_LOCK:
+        circuit = DATA_CIRCUITS.get(table)
+        if circuit is None:
+            circuit = DATA_CIRCUITS[table] = CircuitBreaker(table)
+        return circuit
+
+
+def stale_data_sources(since):
+    """Tables whose reads returned last-known-good or no data at any point after
+    `since` (a time.monotonic() value). Conservative: a table is listed if any caller
+    got stale data from it meanwhile, not only the current request."""
+    with DATA_CIRCUITS_LOCK:
+        circuits = list(DATA_CIRCUITS.values())
+    return sorted(c.name for c in circuits if c.last_stale_at is not None and c.last_stale_at >= since)
+
+
+class _PooledTransport:
+    """httpx transport over one keep-alive connection pool that retries idempotent
+    reads (GET/HEAD) on connection errors, timeouts and 502/504 with jittered
+    exponential backoff, and records each call's latency in DATA_CALL_METRICS.
+
+    Each table's calls go through its circuit breaker. A read that fails, or is refused
+    by an open circuit, gets the last-known-good response for the same query instead
+    (with an X-Served-Stale header) when there is one."""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        table = request.url.path.rsplit('/', 1)[-1]
+        circuit = data_circuit(table)
+        cacheable = request.method == "GET"
+        if not circuit.allow():
+            return self._serve_stale(request, circuit, cacheable, DataCircuitOpenError(f"circuit open for {table}"))
+        started = time.perf_counter()
+        try:
+            response = self._send(request, f"{request.method} {table}")
+        except Exception as e:
+            circuit.record(False)
+            return self._serve_stale(request, circuit, cacheable, e)
+        slow = (time.perf_counter() - started) * 1000 >= SUPABASE_BREAKER_SLOW_MS
+        circuit.record(response.status_code < 500 and not slow)
+        if cacheable and response.is_success:
+            DATA_LAST_KNOWN_GOOD.store(str(request.url), response)
+        elif cacheable and response.status_code >= 500:
+            return self._serve_stale(request, circuit, cacheable, None) or response
+        return response
+
+    def _serve_stale(self, request, circuit, cacheable, error):
+        """The last-known-good response for `request`; otherwise raise `error` (or
+        return None when there is none)."""
+        import httpx
+        circuit.mark_stale()
+        entry = DATA_LAST_KNOWN_GOOD.get(str(request.url)) if cacheable else None
+        if entry is None:
+            if error is not None:
+                raise error
+            return None
+        status, headers, content, stored_at = entry
+        headers = headers + [("X-Served-Stale", str(int(time.time() - stored_at)))]
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    def _send(self, request, key):
+        retries = SUPABASE_READ_RETRIES if request.method in ("GET", "HEAD") else 0
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                response = self._transport.handle_request(request)
+                if attempt < retries and response.status_code in SUPABASE_RETRY_STATUSES:
+                    response.close()
+                else:
+                    response.read()
+                    break
+            except Exception as e:
+                import httpx
+                if attempt >= retries or not isinstance(e, httpx.TransportError):
+                    self._record(key, started, attempt, error=True)
+                    raise
+                print(f"[SUPABASE] {key} attempt {attempt + 1} failed: {type(e).__name__}; retrying")
+            # Full jitter keeps workers that failed together from retrying in lockstep
+            time.sleep(random.uniform(0, SUPABASE_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+        self._record(key, started, attempt, error=response.status_code >= 500)
+        return response
+
+    def _record(self, key, started, retries, error):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        DATA_CALL_METRICS.record(key, elapsed_ms, error=error, retries=retries)
+        if elapsed_ms >= SUPABASE_SLOW_CALL_MS:
+            print(f"[SUPABASE] Slow call {key}: {elapsed_ms:.0f} ms ({retries} retries)")
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _build_http_client():
+    import httpx
+    http2 = SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None
+    limits = httpx.Limits(max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+                          max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+                          keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS)
+    timeout = httpx.Timeout(SUPABASE_READ_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT, pool=SUPABASE_POOL_TIMEOUT)
+    transport = _PooledTransport(httpx.HTTPTransport(http2=http2, limits=limits))
+    return httpx.Client(transport=transport, timeout=timeout, http2=http2, follow_redirects=True)
+
+
+def get_supabase_client():
+    """The process's Supabase client, created on first use (normally by init_services())."""
+    global _supabase_client
+    if _supabase_client is None:
+        with _supabase_client_lock:
+            if _supabase_client is None:
+                from supabase import create_client
+                from supabase.lib.client_options import SyncClientOptions
+                options = SyncClientOptions(httpx_client=_build_http_client())
+                _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    return _supabase_client
+
+
+class _SupabaseClientProxy:
+    """Forwards to get_supabase_client(), so call sites keep using `supabase.table(...)`."""
+
+    def __getattr__(self, attr):
+        return getattr(get_supabase_client(), attr)
+
+
+supabase = _SupabaseClientProxy()
 app = Flask(__name__)
 
 # Track last training time per pet to avoid re-training on every request
@@ -46,13 +377,24 @@ def schedule_pet_model_training(pet_id, df):
         print(f"[ANALYZE] Pet {pet_id}: Skipping retrain (last run {minutes_since} min ago)")
         return
 
+    # Admission-limited so a burst of /analyze calls can't stack up concurrent retrains
+    job_id = JOB_REGISTRY.admit("pet_model_training", details={"pet_id": str(pet_id)})
+    if job_id is None:
+        print(f"[ANALYZE] Pet {pet_id}: Skipping retrain (training admission limit reached)")
+        return
+
     def _train_async(df_snapshot):
+        JOB_REGISTRY.start(job_id)
+        started = time.perf_counter()
         try:
             print(f"[ANALYZE] Pet {pet_id}: Async retraining illness model...")
             train_illness_model(df_snapshot)
             MODEL_TRAIN_HISTORY[pet_id] = datetime.now()
+            JOB_REGISTRY.finish(job_id, "succeeded", duration=time.perf_counter() - started)
             print(f"[ANALYZE] Pet {pet_id}: Model retrain finished")
         except Exception as exc:
+            JOB_REGISTRY.finish(job_id, "failed", duration=time.perf_counter() - started,
+                                error=f"{type(exc).__name__}: {exc}")
             print(f"[ANALYZE] Pet {pet_id}: ⚠ Model retrain failed: {exc}")
 
     threading.Thread(target=_train_async, args=(df.copy(),), daemon=True).start()
@@ -323,11 +665,26 @@ HEALTH_REFERENCE_SYNONYMS = {
 # Ensure a stable models directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "models")
-os.makedirs(MODELS_DIR, exist_ok=True)
 
 # Clean up old incompatible models on startup (sklearn version mismatch issue)
 def cleanup_incompatible_models():
-    """Delete old model files to force retraining with current sklearn version."""
+    """Delete old model files to force retraining with current sklearn version.
+
+    The sklearn version that last cleaned MODELS_DIR is recorded next to the models, so
+    workers starting later don't delete models already retrained under this version.
+    """
+    marker_path = os.path.join(MODELS_DIR, ".sklearn_version")
+    try:
+        current_version = importlib.metadata.version("scikit-learn")
+    except importlib.metadata.PackageNotFoundError:
+        current_version = None
+    try:
+        with open(marker_path, "r", encoding="utf-8") as fh:
+            cleaned_version = fh.read().strip()
+    except OSError:
+        cleaned_version = None
+    if current_version is not None and cleaned_version == current_version:
+        return
     try:
         if os.path.exists(MODELS_DIR):
             model_files = [f for f in os.listdir(MODELS_DIR) if f.endswith('.pkl')]
@@ -339,12 +696,12 @@ def cleanup_incompatible_models():
                         print(f"[STARTUP] Deleted: {f}")
                     except Exception as e:
                         print(f"[STARTUP] Failed to delete {f}: {e}")
+        if current_version is not None:
+            with open(marker_path, "w", encoding="utf-8") as fh:
+                fh.write(current_version)
     except Exception as e:
         print(f"[STARTUP] Error during model cleanup: {e}")
 
-# Run cleanup on startup
-cleanup_incompatible_models()
-
 # ------------------- Helper Functions -------------------
 
 def fetch_logs_df(pet_id, limit=200, days_back=30):
@@ -359,7 +716,11 @@ def fetch_logs_df(pet_id, limit=200, days_back=30):
     # Filter to only include logs from last N days
     cutoff_date = (datetime.now() - timedelta(days=days_back)).date()
     df = df[df['log_date'] >= cutoff_date]
-    
+    return _normalize_log_columns(df)
+
+
+def _normalize_log_columns(df):
+    """Fill and stringify the health tracking columns the analysis reads."""
     df['activity_level'] = df.get('activity_level', pd.Series(['Unknown'] * len(df))).fillna('Unknown').astype(str)
     
     # Core health tracking columns
@@ -383,6 +744,9 @@ def fetch_pet_breed(pet_id):
 def train_illness_model(df, model_path=os.path.join(MODELS_DIR, "illness_model.pkl"), min_auc_threshold: float = 0.6):
     if df.shape[0] < 5:
         return None, None
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import cross_val_score, StratifiedKFold
     
     # Prepare label encoders for categorical features
     le_activity = LabelEncoder()
@@ -511,6 +875,7 @@ def train_illness_model(df, model_path=os.path.join(MODELS_DIR, "illness_model.p
         'bathroom_most_common': (bathroom_most_common or '').lower() if bathroom_most_common else None,
     }
 
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
     joblib.dump({
         'model': clf,
         'le_activity': le_activity,
@@ -522,13 +887,81 @@ def train_illness_model(df, model_path=os.path.join(MODELS_DIR, "illness_model.p
         'water_map': water_map,
         'bathroom_map': bathroom_map,
         'metadata': metadata,
-    }, model_path)
+    }, f"{model_path}.tmp")
+    # Replace atomically so MODEL_REGISTRY never loads a half-written file
+    os.replace(f"{model_path}.tmp", model_path)
 
     return clf, (le_activity, le_food, le_water, le_bathroom)
 
+
+class ModelRegistry:
+    """Model files loaded once per process and shared by every request.
+
+    get() revalidates an entry against the file's mtime and size (one stat call), so
+    a retrained model is picked up on its next use. Under gunicorn the master preloads
+    the registry before forking, and reload() (on SIGUSR1) reloads it per worker.
+    """
+
+    def __init__(self):
+        self._models = {}  # path -> ((mtime_ns, size), data, loaded_at)
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """The loaded contents of `path`, or None if the file does not exist."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._models.pop(path, None)
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        entry = self._models.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        with self._lock:
+            entry = self._models.get(path)
+            if entry is None or entry[0] != key:
+                entry = (key, joblib.load(path), datetime.now(timezone.utc).isoformat())
+                self._models[path] = entry
+                print(f"[MODELS] Loaded {os.path.basename(path)} in pid {os.getpid()}")
+        return entry[1]
+
+    def preload(self, directory=None):
+        """Load every .pkl model in `directory` (MODELS_DIR by default)."""
+        directory = directory or MODELS_DIR
+        if not os.path.isdir(directory):
+            return 0
+        loaded = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".pkl"):
+                try:
+                    loaded += self.get(os.path.join(directory, name)) is not None
+                except Exception as e:
+                    print(f"[MODELS] ⚠ Could not preload {name}: {e}")
+        return loaded
+
+    def reload(self):
+        """Drop every loaded model and load them again from disk."""
+        with self._lock:
+            paths = list(self._models)
+            self._models.clear()
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception as e:
+                print(f"[MODELS] ⚠ Could not reload {os.path.basename(path)}: {e}")
+        return len(paths)
+
+    def loaded(self):
+        return [{"path": path, "loaded_at": loaded_at} for path, (_, _, loaded_at) in self._models.items()]
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
 def load_illness_model(model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
-    if os.path.exists(model_path):
-        data = joblib.load(model_path)
+    data = MODEL_REGISTRY.get(model_path)
+    if data is not None:
         model = data.get('model')
         le_activity = data.get('le_activity')
         le_food = data.get('le_food')
@@ -545,9 +978,7 @@ def load_illness_model(model_path=os.path.join(MODELS_DIR, "illness_model.pkl"))
 def is_illness_model_trained(model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
     """Return True if a trained illness model (with encoders) exists on disk."""
     try:
-        if not os.path.exists(model_path):
-            return False
-        data = joblib.load(model_path)
+        data = MODEL_REGISTRY.get(model_path)
         return bool(data and data.get("model") and data.get("le_activity"))
     except Exception:
         return False
@@ -639,7 +1070,7 @@ def build_care_recommendations(illness_risk, mood_prob, activity_prob, avg_sleep
         "expectations": _dedup(expectations)[:8]
     }
 
-def compute_contextual_risk(df: pd.DataFrame) -> str:
+def compute_contextual_risk(df: "pd.DataFrame") -> str:
     """
     Compute illness risk from recent logs based on behavioral patterns.
     Only uses activity level, food intake, water intake, and bathroom habits.
@@ -868,42 +1299,379 @@ def _parse_missing_alert_content(content: str) -> dict:
     return details
 
 
-def _match_missing_alert_post(posts: list[dict], pet_id: str | None, owner_id: str | None, pet_name: str | None) -> dict | None:
-    normalized_name = (pet_name or "").strip().lower()
-    for post in posts:
-        if not post:
-            continue
-        post_pet_id = post.get("pet_id")
-        if pet_id and post_pet_id and str(post_pet_id) == str(pet_id):
-            return post
-    if owner_id or normalized_name:
-        for post in posts:
-            if not post:
-                continue
-            if owner_id and post.get("user_id") == owner_id:
-                content = (post.get("content") or "").lower()
-                if not normalized_name or normalized_name in content:
-                    return post
-    for post in posts:
-        if not post:
-            continue
-        content = (post.get("content") or "").lower()
-        if normalized_name and normalized_name in content:
-            return post
-    return None
+# Parsed post fields are cached by (post id, content hash), so each post body is run
+# through the regexes once; an edited post hashes differently and is parsed again.
+# Set MISSING_ALERT_PARSE_CACHE_PATH to persist the cache across restarts.
+MISSING_ALERT_PARSE_CACHE_MAX_ENTRIES = int(os.getenv("MISSING_ALERT_PARSE_CACHE_MAX_ENTRIES", "10000"))
+MISSING_ALERT_PARSE_CACHE_PATH = os.getenv("MISSING_ALERT_PARSE_CACHE_PATH")
+MISSING_ALERT_PARSE_CACHE = OrderedDict()  # "post_id:sha1" -> parsed fields
+MISSING_ALERT_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _parse_cache_key(post: dict) -> str:
+    content = post.get("content") or ""
+    return f"{post.get('id')}:{hashlib.sha1(content.encode('utf-8')).hexdigest()}"
+
+
+def parse_missing_alert_posts(posts: list[dict]) -> list[dict]:
+    """Bulk _parse_missing_alert_content() for a page of posts, through the parse cache.
+
+    Cache hits are resolved under one lock acquisition, only the misses are parsed, and
+    the persisted cache (if configured) is written once for the whole page.
+    """
+    keys = [_parse_cache_key(post) for post in posts]
+    results: list[dict | None] = [None] * len(posts)
+    with MISSING_ALERT_PARSE_CACHE_LOCK:
+        for i, key in enumerate(keys):
+            cached = MISSING_ALERT_PARSE_CACHE.get(key)
+            if cached is not None:
+                MISSING_ALERT_PARSE_CACHE.move_to_end(key)
+                results[i] = cached
+    misses = [i for i, parsed in enumerate(results) if parsed is None]
+    if not misses:
+        return results
+    for i in misses:
+        results[i] = _parse_missing_alert_content(posts[i].get("content") or "")
+    with MISSING_ALERT_PARSE_CACHE_LOCK:
+        for i in misses:
+            MISSING_ALERT_PARSE_CACHE[keys[i]] = results[i]
+        while len(MISSING_ALERT_PARSE_CACHE) > MISSING_ALERT_PARSE_CACHE_MAX_ENTRIES:
+            MISSING_ALERT_PARSE_CACHE.popitem(last=False)
+    if MISSING_ALERT_PARSE_CACHE_PATH:
+        save_missing_alert_parse_cache()
+    return results
+
+
+def parse_missing_alert_post(post: dict) -> dict:
+    return parse_missing_alert_posts([post])[0]
+
+
+def save_missing_alert_parse_cache(path=None):
+    path = path or MISSING_ALERT_PARSE_CACHE_PATH
+    try:
+        with MISSING_ALERT_PARSE_CACHE_LOCK:
+            snapshot = list(MISSING_ALERT_PARSE_CACHE.items())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"[MISSING-PARSE] Failed to persist parse cache to {path}: {e}")
+
+
+def load_missing_alert_parse_cache(path=None):
+    path = path or MISSING_ALERT_PARSE_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        with MISSING_ALERT_PARSE_CACHE_LOCK:
+            for key, parsed in snapshot[-MISSING_ALERT_PARSE_CACHE_MAX_ENTRIES:]:
+                MISSING_ALERT_PARSE_CACHE[key] = parsed
+        print(f"[MISSING-PARSE] Loaded {len(snapshot)} parsed missing alerts from {path}")
+    except Exception as e:
+        print(f"[MISSING-PARSE] Failed to load parse cache from {path}: {e}")
+
+
+
+# Active missing-alert posts are kept in an in-memory index so page views resolve a pet's
+# alert in O(1) no matter how many alerts are active. New posts are pulled incrementally
+# by created_at; a periodic full rebuild drops posts that were marked found or deleted.
+MISSING_ALERT_INDEX_REFRESH_SECONDS = float(os.getenv("MISSING_ALERT_INDEX_REFRESH_SECONDS", "15"))
+MISSING_ALERT_INDEX_FULL_REFRESH_SECONDS = float(os.getenv("MISSING_ALERT_INDEX_FULL_REFRESH_SECONDS", "300"))
+MISSING_ALERT_INDEX_PAGE_SIZE = int(os.getenv("MISSING_ALERT_INDEX_PAGE_SIZE", "1000"))
+_NAME_TOKEN_RE = re.compile(r"\w+")
+# Name-only lookups (including misses) are remembered per normalized name, so a pet with no
+# alert post doesn't rescan every post on each page view; new posts evict the names they contain
+MISSING_ALERT_NAME_CACHE_MAX_ENTRIES = int(os.getenv("MISSING_ALERT_NAME_CACHE_MAX_ENTRIES", "4096"))
+# Posts with coordinates are also bucketed into a uniform lat/lng grid for nearby queries;
+# 0.05° cells are roughly 5.5 km tall
+MISSING_ALERT_GRID_CELL_DEG = float(os.getenv("MISSING_ALERT_GRID_CELL_DEG", "0.05"))
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _coerce_coordinate(value) -> float | None:
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return coordinate if math.isfinite(coordinate) else None
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class MissingAlertIndex:
+    """Latest active missing-alert post by pet_id, by owner and by pet-name token.
+
+    Entries hold the raw post, its lowercased content and the pre-parsed
+    _parse_missing_alert_content() fields.
+    """
+
+    def __init__(self, fetch_page=None):
+        # fetch_page(since_created_at, offset, limit) -> list of missing posts, oldest first
+        self._fetch_page = fetch_page or self._fetch_supabase_page
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._rebuilding = False
+        self._reset_state()
+        self.last_full_refresh = None
+        self.last_refresh = None
+
+    def _reset_state(self):
+        self.posts = {}      # post_id -> entry
+        self.by_pet = {}     # pet_id -> entry (newest)
+        self.by_owner = {}   # owner_id -> [entries], newest first
+        self.by_token = {}   # name token -> [entries], newest first
+        self.grid = {}       # (lat cell, lng cell) -> [entries]
+        # Feed order, ascending by (created_at, post_id): "all" plus one list per urgency
+        self.feed_keys = {}     # feed name -> [(created_at, post_id)]
+        self.feed_entries = {}  # feed name -> [entries], parallel to feed_keys
+        self.watermark = None  # newest created_at seen
+        self.by_name = OrderedDict()  # normalized name -> newest entry mentioning it, or None
+
+    @staticmethod
+    def _fetch_supabase_page(since_created_at, offset, limit):
+        query = supabase.table("community_posts").select("*").eq("type", "missing")
+        if since_created_at:
+            query = query.gte("created_at", since_created_at)
+        resp = query.order("created_at", desc=False).range(offset, offset + limit - 1).execute()
+        return resp.data or []
+
+    def _fetch_all(self, since_created_at):
+        rows, offset = [], 0
+        while True:
+            page = self._fetch_page(since_created_at, offset, MISSING_ALERT_INDEX_PAGE_SIZE)
+            rows.extend(page)
+            if len(page) < MISSING_ALERT_INDEX_PAGE_SIZE:
+                return rows
+            offset += len(page)
+
+    def _add(self, post, parsed):
+        post_id = post.get("id")
+        if post_id is None or str(post_id) in self.posts:
+            return
+        entry = {
+            "post": post,
+            "content_lower": (post.get("content") or "").lower(),
+            "parsed": parsed,
+            "lat": _coerce_coordinate(post.get("latitude")),
+            "lng": _coerce_coordinate(post.get("longitude")),
+        }
+        self.posts[str(post_id)] = entry
+        # Posts arrive oldest first, so each new entry becomes the newest for its keys
+        if post.get("pet_id"):
+            self.by_pet[str(post["pet_id"])] = entry
+        if post.get("user_id"):
+            self.by_owner.setdefault(post["user_id"], []).insert(0, entry)
+        for token in set(_NAME_TOKEN_RE.findall(entry["content_lower"])):
+            self.by_token.setdefault(token, []).insert(0, entry)
+        for name in [name for name in self.by_name if name in entry["content_lower"]]:
+            del self.by_name[name]
+        if entry["lat"] is not None and entry["lng"] is not None:
+            self.grid.setdefault(self._cell(entry["lat"], entry["lng"]), []).append(entry)
+        feed_key = (str(post.get("created_at") or ""), str(post_id))
+        for feed in ("all", str(parsed.get("urgency") or "Medium").lower()):
+            keys = self.feed_keys.setdefault(feed, [])
+            position = bisect.bisect_left(keys, feed_key)
+            keys.insert(position, feed_key)
+            self.feed_entries.setdefault(feed, []).insert(position, entry)
+        created_at = post.get("created_at")
+        if created_at and (self.watermark is None or str(created_at) > self.watermark):
+            self.watermark = str(created_at)
+
+    def _rebuild(self):
+        """Fetch every missing post into fresh state, then swap it in. Readers keep using
+        the old snapshot until the swap."""
+        rows = self._fetch_all(None)
+        parsed_rows = parse_missing_alert_posts(rows)
+        fresh = MissingAlertIndex(self._fetch_page)
+        for post, parsed in zip(rows, parsed_rows):
+            fresh._add(post, parsed)
+        now = time.monotonic()
+        with self._lock:
+            for name in ("posts", "by_pet", "by_owner", "by_token", "grid",
+                         "feed_keys", "feed_entries", "watermark", "by_name"):
+                setattr(self, name, getattr(fresh, name))
+            self.last_full_refresh = self.last_refresh = now
+        print(f"[MISSING-INDEX] Rebuilt index with {len(self.posts)} active missing posts")
+
+    def refresh(self, force_full=False):
+        """Pull new posts, or rebuild everything when forced or nothing is loaded yet."""
+        if force_full or self.last_full_refresh is None:
+            self._rebuild()
+            return
+        rows = [post for post in self._fetch_all(self.watermark) if str(post.get("id")) not in self.posts]
+        parsed_rows = parse_missing_alert_posts(rows)
+        with self._lock:
+            for post, parsed in zip(rows, parsed_rows):
+                self._add(post, parsed)
+            self.last_refresh = time.monotonic()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def _run():
+            try:
+                self._rebuild()
+            except Exception as exc:
+                print(f"[MISSING-INDEX] ⚠ Background rebuild failed: {exc}")
+                # Incremental refreshes keep the snapshot current; retry the rebuild next interval
+                with self._lock:
+                    self.last_full_refresh = time.monotonic()
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def refresh_if_due(self):
+        """Refresh when the incremental interval has passed. Only one thread refreshes at a
+        time; the others keep reading the current snapshot unless there is none yet. The
+        periodic full rebuild runs on a background thread once a snapshot exists."""
+        if (self.last_full_refresh is not None
+                and time.monotonic() - self.last_full_refresh >= MISSING_ALERT_INDEX_FULL_REFRESH_SECONDS):
+            self._rebuild_in_background()
+        if self.last_refresh is not None and time.monotonic() - self.last_refresh < MISSING_ALERT_INDEX_REFRESH_SECONDS:
+            return
+        if not self._refresh_lock.acquire(blocking=self.last_refresh is None):
+            return
+        try:
+            if self.last_refresh is None or time.monotonic() - self.last_refresh >= MISSING_ALERT_INDEX_REFRESH_SECONDS:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _cell(lat, lng):
+        return (math.floor(lat / MISSING_ALERT_GRID_CELL_DEG), math.floor(lng / MISSING_ALERT_GRID_CELL_DEG))
+
+    def _entries_in_cells(self, min_lat, min_lng, max_lat, max_lng):
+        lat_lo, lng_lo = self._cell(min_lat, min_lng)
+        lat_hi, lng_hi = self._cell(max_lat, max_lng)
+        n_cells = (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1)
+        if n_cells > len(self.grid):
+            # Large areas: walk the occupied cells instead of every cell in range
+            for (cell_lat, cell_lng), entries in self.grid.items():
+                if lat_lo <= cell_lat <= lat_hi and lng_lo <= cell_lng <= lng_hi:
+                    yield from entries
+            return
+        for cell_lat in range(lat_lo, lat_hi + 1):
+            for cell_lng in range(lng_lo, lng_hi + 1):
+                yield from self.grid.get((cell_lat, cell_lng), ())
+
+    def within_bbox(self, min_lat, min_lng, max_lat, max_lng) -> list[dict]:
+        """Entries inside the box, newest first."""
+        with self._lock:
+            found = [entry for entry in self._entries_in_cells(min_lat, min_lng, max_lat, max_lng)
+                     if min_lat <= entry["lat"] <= max_lat and min_lng <= entry["lng"] <= max_lng]
+        found.sort(key=lambda entry: str(entry["post"].get("created_at") or ""), reverse=True)
+        return found
+
+    def nearby(self, lat, lng, radius_km) -> list[tuple[float, dict]]:
+        """(distance_km, entry) pairs within radius_km of the point, nearest first."""
+        lat_span = radius_km / 111.32
+        lng_span = radius_km / max(111.32 * math.cos(math.radians(lat)), 1e-6)
+        min_lat, max_lat = max(lat - lat_span, -90.0), min(lat + lat_span, 90.0)
+        min_lng, max_lng = max(lng - lng_span, -180.0), min(lng + lng_span, 180.0)
+        with self._lock:
+            candidates = list(self._entries_in_cells(min_lat, min_lng, max_lat, max_lng))
+        found = []
+        for entry in candidates:
+            distance = haversine_km(lat, lng, entry["lat"], entry["lng"])
+            if distance <= radius_km:
+                found.append((distance, entry))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def _feed_backwards(self, name, before):
+        keys, entries = self.feed_keys.get(name, []), self.feed_entries.get(name, [])
+        end = bisect.bisect_left(keys, tuple(before)) if before else len(keys)
+        for i in range(end - 1, -1, -1):
+            yield keys[i], entries[i]
+
+    def feed(self, urgencies=None, before=None, limit=20) -> tuple[list[dict], bool]:
+        """Newest-first page of entries older than the `before` (created_at, post_id) key,
+        optionally restricted to lowercased urgency labels. Returns (entries, has_more)."""
+        names = sorted(set(urgencies)) if urgencies else ["all"]
+        with self._lock:
+            sources = [self._feed_backwards(name, before) for name in names]
+            page = []
+            # Each list is walked backwards from the cursor; merge keeps them newest first
+            for _, entry in heapq.merge(*sources, key=lambda pair: pair[0], reverse=True):
+                page.append(entry)
+                if len(page) > limit:
+                    break
+        return page[:limit], len(page) > limit
+
+    def lookup(self, pet_id: str | None, owner_id: str | None, pet_name: str | None) -> dict | None:
+        """Match like the app does: by pet_id, then the owner's posts mentioning the pet's
+        name, then any post mentioning the name."""
+        normalized_name = (pet_name or "").strip().lower()
+        with self._lock:
+            if pet_id and str(pet_id) in self.by_pet:
+                return self.by_pet[str(pet_id)]
+            if owner_id:
+                for entry in self.by_owner.get(owner_id, []):
+                    if not normalized_name or normalized_name in entry["content_lower"]:
+                        return entry
+            if not normalized_name:
+                return None
+            if normalized_name in self.by_name:
+                self.by_name.move_to_end(normalized_name)
+                return self.by_name[normalized_name]
+            match = self._find_by_name(normalized_name)
+            self.by_name[normalized_name] = match
+            while len(self.by_name) > MISSING_ALERT_NAME_CACHE_MAX_ENTRIES:
+                self.by_name.popitem(last=False)
+            return match
+
+    def _find_by_name(self, normalized_name):
+        """Newest entry whose content contains the name. Caller holds self._lock."""
+        token_match = None
+        name_tokens = _NAME_TOKEN_RE.findall(normalized_name)
+        if name_tokens:
+            for entry in self.by_token.get(name_tokens[0], []):
+                if normalized_name in entry["content_lower"]:
+                    token_match = entry
+                    break
+        # The name can also sit inside a longer word ("Maxwell", "#LostMax"), which the
+        # token map misses; scan only the posts newer than the token match for that
+        for _, entry in self._feed_backwards("all", None):
+            if entry is token_match:
+                break
+            if normalized_name in entry["content_lower"]:
+                return entry
+        return token_match
+
+
+MISSING_ALERT_INDEX = MissingAlertIndex()
 
 
 def get_latest_missing_alert_details(pet_id: str | None, pet_name: str | None, owner_id: str | None) -> dict | None:
     try:
-        resp = supabase.table("community_posts").select("*").eq("type", "missing").order("created_at", desc=True).limit(12).execute()
-        posts = resp.data or []
+        MISSING_ALERT_INDEX.refresh_if_due()
     except Exception as exc:
-        print(f"[DEBUG] Failed to load missing alert posts for pet {pet_id}: {exc}")
-        return None
-    post = _match_missing_alert_post(posts, pet_id, owner_id, pet_name)
-    if not post:
+        print(f"[DEBUG] Failed to refresh missing alert index for pet {pet_id}: {exc}")
+        if MISSING_ALERT_INDEX.last_refresh is None:
+            return None
+    entry = MISSING_ALERT_INDEX.lookup(pet_id, owner_id, pet_name)
+    if not entry:
         return None
-    parsed = _parse_missing_alert_content(post.get("content") or "")
+    return _missing_alert_details(entry)
+
+
+def _missing_alert_details(entry: dict) -> dict:
+    post, parsed = entry["post"], entry["parsed"]
     details = {
         "post_id": str(post.get("id")) if post.get("id") is not None else None,
         "created_at": post.get("created_at"),
@@ -919,21 +1687,21 @@ def get_latest_missing_alert_details(pet_id: str | None, pet_name: str | None, o
     return {k: v for k, v in details.items() if v is not None}
 
 
-def _render_missing_alert_card(details: dict | None) -> str:
+def _missing_alert_card_context(details: dict | None) -> dict | None:
+    """Rows and Manila-time timestamp for the missing alert card on the public page."""
     if not details:
-        return ""
-    rows: list[str] = []
+        return None
+    rows: list[tuple[str, str]] = []
     def add_row(label: str, key: str):
         value = details.get(key)
         if value:
-            rows.append(f"""<div class=\"missing-detail-row\"><span class=\"missing-label\">{label}</span><span class=\"missing-value\">{html.escape(str(value))}</span></div>""")
+            rows.append((label, str(value)))
     add_row("Urgency", "urgency")
     add_row("Reward", "reward")
     add_row("Emergency Contact", "emergency_contact")
     add_row("Custom Message", "custom_message")
     add_row("Special Notes", "special_notes")
     add_row("Location", "post_address")
-    content_html = "".join(rows) if rows else "<p class=\"missing-alert-empty\">Missing alert posted but no extra details were captured.</p>"
     def _format_ph_datetime(value: str) -> str | None:
         if not value:
             return None
@@ -950,37 +1718,51 @@ def _render_missing_alert_card(details: dict | None) -> str:
         manila = parsed.astimezone(ZoneInfo("Asia/Manila"))
         return manila.strftime("%b %d, %Y • %I:%M %p")
 
-    meta_html = ""
     created_at = details.get("created_at")
-    formatted_timestamp = _format_ph_datetime(str(created_at)) if created_at else None
-    if formatted_timestamp:
-        meta_html = f"<div class=\"missing-alert-meta\">Posted: {html.escape(formatted_timestamp)} (Asia/Manila)</div>"
-    return f"""
-        <div class=\"missing-alert-card\">
-            <div class=\"missing-alert-heading\">Missing Alert Details</div>
-            {content_html}
-            {meta_html}
-        </div>
-    """
+    return {
+        "rows": rows,
+        "posted_at": _format_ph_datetime(str(created_at)) if created_at else None,
+    }
 
 
-# ------------------- Flask API -------------------
- 
-@app.route("/analyze", methods=["POST"])
-def analyze_endpoint():
-    data = request.get_json()
-    pet_id = data.get("pet_id")
-    if not pet_id:
-        return jsonify({"error": "pet_id required"}), 400
+# ------------------- Analysis Service -------------------
+
+# Last successful analysis per pet, served when a fresh computation fails
+ANALYSIS_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_RESULT_CACHE_MAX_ENTRIES", "2048"))
+ANALYSIS_RESULT_CACHE = OrderedDict()  # pet_id -> (computed_at, merged)
+ANALYSIS_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def _store_analysis_result(pet_id, merged):
+    with ANALYSIS_RESULT_CACHE_LOCK:
+        ANALYSIS_RESULT_CACHE[pet_id] = (datetime.now(), merged)
+        ANALYSIS_RESULT_CACHE.move_to_end(pet_id)
+        while len(ANALYSIS_RESULT_CACHE) > ANALYSIS_RESULT_CACHE_MAX_ENTRIES:
+            ANALYSIS_RESULT_CACHE.popitem(last=False)
+
 
+def cached_pet_analysis(pet_id):
+    """(computed_at, merged) for the pet's last successful analysis, or None."""
+    with ANALYSIS_RESULT_CACHE_LOCK:
+        return ANALYSIS_RESULT_CACHE.get(pet_id)
+
+
+def compute_pet_analysis(pet_id, df=None, pet_breed=None):
+    """Run the full /analyze pipeline in-process and return the response dict.
+
+    Callers that already hold the pet's logs or breed can pass them in to skip
+    the corresponding Supabase reads.
+    """
     print(f"\n[ANALYZE-START] ========== Analyzing pet {pet_id} ==========")
     
     # FETCH PET BREED FOR PERSONALIZATION
-    pet_breed = fetch_pet_breed(pet_id)
+    if pet_breed is None:
+        pet_breed = fetch_pet_breed(pet_id)
     print(f"[ANALYZE] Pet {pet_id}: Breed = {pet_breed}")
     
     # CONTINUOUS MODEL TRAINING: Fetch all logs for this specific pet and train/retrain the model
-    df = fetch_logs_df(pet_id)
+    if df is None:
+        df = fetch_logs_df(pet_id)
     print(f"[ANALYZE] Pet {pet_id}: Fetched {len(df)} logs for continuous training")
     
     # Only train if we have sufficient data, and schedule asynchronously to avoid blocking
@@ -989,8 +1771,8 @@ def analyze_endpoint():
     else:
         print(f"[ANALYZE] Pet {pet_id}: ⚠ Insufficient data for training ({len(df)} logs, need ≥5)")
 
-    # Core analysis (trend/recommendation/summaries) based on logs
-    result = analyze_pet(pet_id)
+    # Core analysis (trend/recommendation/summaries) based on the logs fetched above
+    result = analyze_pet_df(pet_id, df, prediction_date=datetime.utcnow().date().isoformat())
 
     # ML illness_risk on latest log with BREED ADJUSTMENT
     illness_risk_ml = "low"
@@ -1391,7 +2173,388 @@ def analyze_endpoint():
         }
     
     print(f"[ANALYZE-END] ========== Analysis complete for pet {pet_id} ==========\n")
-    return jsonify(merged)
+    _store_analysis_result(pet_id, merged)
+    try:
+        store_pet_snapshots([{
+            "pet_id": pet_id,
+            "watermark": analysis_input_watermark(df, pet_breed),
+            "summary": _snapshot_summary(merged, historical_context, df),
+            "analysis": merged,
+        }], source="analyze")
+    except Exception as e:
+        print(f"[SNAPSHOT] Pet {pet_id}: ⚠ Could not store snapshot: {e}")
+    return merged
+
+
+def get_pet_analysis(pet_id, df=None, pet_breed=None):
+    """The pet's fresh snapshot when its logs haven't moved, else compute_pet_analysis()
+    falling back to the last cached result on failure.
+
+    A snapshot may only hold the compact summary (see _snapshot_summary()), which has
+    every field the public page reads. Returns None when the computation fails and
+    nothing is cached for the pet.
+    """
+    if df is not None:
+        snapshot = fresh_pet_snapshot(pet_id, df, pet_breed)
+        if snapshot is not None:
+            return snapshot["analysis"] or snapshot["summary"]
+    try:
+        return compute_pet_analysis(pet_id, df=df, pet_breed=pet_breed)
+    except Exception as e:
+        print(f"[ANALYZE] Pet {pet_id}: ⚠ Analysis failed: {e}")
+        cached = cached_pet_analysis(pet_id)
+        if not cached:
+            return None
+        cached_at, merged = cached
+        print(f"[ANALYZE] Pet {pet_id}: Serving cached analysis from {cached_at.isoformat()}")
+        return dict(merged, analysis_cached_at=cached_at.isoformat())
+
+
+# ------------------- Analysis snapshots -------------------
+# The latest analysis of each pet is persisted with the watermark of its inputs: the pet's
+# logs in the analysis window, its breed, the illness model version and the day. Reads
+# serve the snapshot while that watermark holds and only recompute pets whose inputs
+# moved. Unlike pet_content_watermark() the input watermark needs no extra queries, so
+# the nightly job and the dashboards compute it in bulk from the frames they already load.
+PET_SNAPSHOT_DB = os.getenv("PET_SNAPSHOT_DB", os.path.join(BASE_DIR, "data", "pet_snapshots.sqlite3"))
+_SNAPSHOT_LOG_COLUMNS = ["id", "log_date", "activity_level", "food_intake", "water_intake", "bathroom_habits", "symptoms"]
+_SNAPSHOT_SUMMARY_KEYS = (
+    "pet_id", "breed", "trend", "recommendation", "activity_prob", "activity_probabilities",
+    "illness_risk_ml", "illness_risk_contextual", "illness_risk_blended", "illness_risk",
+    "illness_prediction", "illness_model_trained", "health_status", "is_unhealthy",
+    "illness_status_text", "log_count", "latest_log_date", "days_since_log",
+)
+_PATTERN_SUMMARY_KEYS = ("pattern_type", "illness_duration_days", "is_persistent", "unhealthy_periods",
+                         "recovery_history", "current_streak_days")
+
+
+def _canonical_log_lines(df):
+    """One string per log row over the columns an analysis reads, so per-pet
+    (fetch_logs_df()) and bulk (fetch_logs_bulk()) frames of the same logs agree."""
+    columns = [column for column in _SNAPSHOT_LOG_COLUMNS if column in df.columns]
+    lines = df[columns[0]].astype(str)
+    for column in columns[1:]:
+        lines = lines + "\x1f" + df[column].astype(str)
+    return lines
+
+
+def _input_watermark(breed, log_lines, model_version, today):
+    state = "\x1e".join([str(breed), log_lines, model_version, today])
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()
+
+
+def analysis_input_watermark(df, breed, model_version=None, today=None):
+    """Hash of everything an analysis of these logs reads: the log rows, the breed, the
+    illness model version and the day."""
+    lines = "\n".join(sorted(_canonical_log_lines(df))) if df is not None and not df.empty else ""
+    return _input_watermark(breed, lines, model_version or illness_model_version(), today or date.today().isoformat())
+
+
+def analysis_input_watermarks(logs, pet_ids, breeds=None):
+    """analysis_input_watermark() for many pets of one combined log frame."""
+    breeds = breeds or {}
+    model_version, today = illness_model_version(), date.today().isoformat()
+    lines = {}
+    if not logs.empty:
+        rows = pd.DataFrame({"pet_id": logs['pet_id'].astype(str), "line": _canonical_log_lines(logs)})
+        rows = rows.sort_values(["pet_id", "line"], kind="mergesort")
+        lines = rows.groupby("pet_id", sort=False)["line"].agg("\n".join).to_dict()
+    return {str(pet_id): _input_watermark(breeds.get(str(pet_id)), lines.get(str(pet_id), ""), model_version, today)
+            for pet_id in pet_ids}
+
+
+def _snapshot_summary(result, patterns=None, df=None):
+    """The compact snapshot of an analysis: /analyze's full payload or an
+    analyze_pets_frame() result, reduced to the fields the page and dashboards read.
+    /analyze's payload has no log recency fields, so those come from its logs `df`."""
+    def plain(value):
+        return value.item() if isinstance(value, np.generic) else value
+
+    summary = {key: plain(result.get(key)) for key in _SNAPSHOT_SUMMARY_KEYS if key in result}
+    patterns = patterns if patterns is not None else result.get("illness_patterns")
+    if patterns:
+        summary["illness_patterns"] = {key: plain(patterns.get(key)) for key in _PATTERN_SUMMARY_KEYS if key in patterns}
+    if "latest_log_date" not in summary and df is not None:
+        latest_log_date = pd.to_datetime(df['log_date']).max() if not df.empty else None
+        summary["latest_log_date"] = latest_log_date.date().isoformat() if latest_log_date is not None else None
+        summary["days_since_log"] = (datetime.now() - latest_log_date).days if latest_log_date is not None else None
+    return summary
+
+
+def _snapshot_connection():
+    os.makedirs(os.path.dirname(PET_SNAPSHOT_DB), exist_ok=True)
+    conn = sqlite3.connect(PET_SNAPSHOT_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pet_analysis_snapshots (
+            pet_id TEXT PRIMARY KEY,
+            watermark TEXT NOT NULL,
+            risk TEXT,
+            health_status TEXT,
+            pattern_summary TEXT,
+            guidance TEXT,
+            summary TEXT NOT NULL,
+            analysis TEXT,
+            source TEXT NOT NULL,
+            computed_at TEXT NOT NULL
+        )""")
+    return conn
+
+
+def store_pet_snapshots(snapshots, source):
+    """Upsert snapshots given as dicts with pet_id, watermark, summary and optionally
+    the full /analyze payload under "analysis". Returns the number written."""
+    computed_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for snapshot in snapshots:
+        summary, analysis = snapshot["summary"], snapshot.get("analysis")
+        guidance = {"recommendation": summary.get("recommendation")}
+        if analysis and analysis.get("health_guidance"):
+            guidance["health_guidance"] = analysis["health_guidance"]
+        rows.append((
+            str(snapshot["pet_id"]),
+            snapshot["watermark"],
+            summary.get("illness_risk_blended"),
+            summary.get("health_status"),
+            json.dumps(summary.get("illness_patterns"), default=str),
+            json.dumps(guidance, default=str),
+            json.dumps(summary, default=str),
+            json.dumps(analysis, default=str) if analysis is not None else None,
+            source,
+            computed_at,
+        ))
+    if not rows:
+        return 0
+    conn = _snapshot_connection()
+    try:
+        with conn:
+            # A compact snapshot never replaces a full one computed from the same inputs
+            conn.executemany("""
+                INSERT INTO pet_analysis_snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(pet_id) DO UPDATE SET
+                    watermark = excluded.watermark, risk = excluded.risk, health_status = excluded.health_status,
+                    pattern_summary = excluded.pattern_summary, guidance = excluded.guidance, summary = excluded.summary,
+                    analysis = excluded.analysis, source = excluded.source, computed_at = excluded.computed_at
+                WHERE excluded.analysis IS NOT NULL OR pet_analysis_snapshots.watermark != excluded.watermark
+                   OR pet_analysis_snapshots.analysis IS NULL""", rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def load_pet_snapshots(pet_ids):
+    """{pet_id: snapshot} for the pets that have one, with summary/analysis decoded."""
+    pet_ids = [str(pet_id) for pet_id in pet_ids]
+    snapshots = {}
+    conn = _snapshot_connection()
+    try:
+        for start in range(0, len(pet_ids), 500):
+            chunk = pet_ids[start:start + 500]
+            for pet_id, watermark, summary, analysis, source, computed_at in conn.execute(
+                    "SELECT pet_id, watermark, summary, analysis, source, computed_at FROM pet_analysis_snapshots "
+                    f"WHERE pet_id IN ({', '.join('?' * len(chunk))})", chunk):
+                snapshots[pet_id] = {
+                    "pet_id": pet_id,
+                    "watermark": watermark,
+                    "summary": json.loads(summary),
+                    "analysis": json.loads(analysis) if analysis else None,
+                    "source": source,
+                    "computed_at": computed_at,
+                }
+    finally:
+        conn.close()
+    return snapshots
+
+
+def fresh_pet_snapshot(pet_id, df, breed, require_analysis=False):
+    """The pet's snapshot if it was computed from exactly these inputs, else None.
+    require_analysis=True also skips compact (nightly / dashboard) snapshots."""
+    try:
+        snapshot = load_pet_snapshots([pet_id]).get(str(pet_id))
+    except Exception as e:
+        print(f"[SNAPSHOT] Pet {pet_id}: ⚠ Snapshot lookup failed: {e}")
+        return None
+    if snapshot is None or snapshot["watermark"] != analysis_input_watermark(df, breed):
+        return None
+    if require_analysis and snapshot["analysis"] is None:
+        return None
+    print(f"[SNAPSHOT] Pet {pet_id}: Serving {snapshot['source']} snapshot from {snapshot['computed_at']}")
+    return snapshot
+
+
+# ------------------- Async serving -------------------
+# Under gunicorn's gevent workers (see gunicorn.conf.py) sockets are monkey-patched and
+# threads are greenlets, so a request waiting on Supabase yields to the others on its
+# worker. Two things keep that overlap working: handlers issue their independent reads
+# at once through the non-blocking variants below, and pandas/sklearn work, which never
+# yields, runs on the hub's native thread pool instead of stalling the whole worker.
+DATA_FETCH_WORKERS = int(os.getenv("DATA_FETCH_WORKERS", "16"))
+DATA_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=DATA_FETCH_WORKERS, thread_name_prefix="data-fetch")
+ASYNC_CPU_THREADS = int(os.getenv("ASYNC_CPU_THREADS", str(os.cpu_count() or 2)))
+
+
+def fetch_logs_df_async(pet_id, limit=200, days_back=30):
+    """fetch_logs_df() without waiting: returns a Future for the DataFrame."""
+    return DATA_FETCH_EXECUTOR.submit(fetch_logs_df, pet_id, limit, days_back)
+
+
+def fetch_pet_breed_async(pet_id):
+    """fetch_pet_breed() without waiting: returns a Future for the breed."""
+    return DATA_FETCH_EXECUTOR.submit(fetch_pet_breed, pet_id)
+
+
+def async_mode():
+    """True when this process serves requests on gevent (sockets monkey-patched)."""
+    if "gevent" not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched("socket")
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs), on a native thread when in async_mode() so the event
+    loop keeps serving other requests meanwhile. A plain call otherwise."""
+    if not async_mode():
+        return fn(*args, **kwargs)
+    from gevent import get_hub
+    pool = get_hub().threadpool
+    if pool.maxsize < ASYNC_CPU_THREADS:
+        pool.maxsize = ASYNC_CPU_THREADS
+    return pool.apply(fn, args, kwargs)
+
+
+# ------------------- Single-flight -------------------
+# A shared missing-pet poster brings many scans of the same pet at once. Concurrent
+# identical computations, keyed by (pet_id, kind), share one execution: the first caller
+# runs it and the rest wait for its result (or its exception). Waiters give up after
+# SINGLE_FLIGHT_TIMEOUT_SECONDS, and a flight older than that no longer absorbs new
+# callers, so one hung computation can't hold a pet's requests indefinitely.
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "20"))
+
+
+class SingleFlightTimeoutError(TimeoutError):
+    """Waited SINGLE_FLIGHT_TIMEOUT_SECONDS for another caller's identical computation."""
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self, timeout=None):
+        self.timeout = SINGLE_FLIGHT_TIMEOUT_SECONDS if timeout is None else timeout
+        self._flights = {}  # key -> {"done", "started", "result", "error"}
+        self._metrics = {}  # kind -> counters
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn(*args, **kwargs), or the result of the identical call already in flight.
+        key is (pet_id, kind); metrics are kept per kind."""
+        kind = key[-1]
+        with self._lock:
+            metrics = self._metrics.setdefault(kind, {"executions": 0, "coalesced": 0, "timeouts": 0, "errors": 0})
+            flight = self._flights.get(key)
+            if flight is not None and time.monotonic() - flight["started"] < self.timeout:
+                metrics["coalesced"] += 1
+                leader = False
+            else:
+                flight = self._flights[key] = {"done": threading.Event(), "started": time.monotonic(),
+                                               "result": None, "error": None}
+                metrics["executions"] += 1
+                leader = True
+
+        if leader:
+            try:
+                flight["result"] = fn(*args, **kwargs)
+            except Exception as e:
+                flight["error"] = e
+                with self._lock:
+                    metrics["errors"] += 1
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight["done"].set()
+        elif not flight["done"].wait(self.timeout - (time.monotonic() - flight["started"])):
+            with self._lock:
+                metrics["timeouts"] += 1
+            raise SingleFlightTimeoutError(f"{kind} for {key[0]} still running after {self.timeout:g}s")
+
+        if flight["error"] is not None:
+            raise flight["error"]
+        return flight["result"]
+
+    def stats(self):
+        with self._lock:
+            in_flight = {}
+            for key in self._flights:
+                in_flight[key[-1]] = in_flight.get(key[-1], 0) + 1
+            return {kind: dict(values, in_flight=in_flight.get(kind, 0)) for kind, values in self._metrics.items()}
+
+
+PET_FLIGHTS = SingleFlight()
+
+
+@app.route("/single-flight", methods=["GET"])
+def single_flight_endpoint():
+    """Per kind: computations run, requests that shared one instead (saved), timeouts."""
+    return jsonify({"worker": process_worker_id(), "timeout_seconds": PET_FLIGHTS.timeout,
+                    "kinds": PET_FLIGHTS.stats()})
+
+
+# ------------------- Flask API -------------------
+ 
+class _LogFetchError(Exception):
+    """The breed or log reads behind an /analyze request failed."""
+
+
+def _analyze_pet_request(pet_id):
+    """Fetch, then serve the fresh snapshot or compute the analysis (one /analyze flight)."""
+    breed_future, logs_future = fetch_pet_breed_async(pet_id), fetch_logs_df_async(pet_id)
+    try:
+        pet_breed, df = breed_future.result(), logs_future.result()
+    except Exception as e:
+        raise _LogFetchError(str(e)) from e
+    snapshot = fresh_pet_snapshot(pet_id, df, pet_breed, require_analysis=True)
+    if snapshot is not None:
+        return snapshot["analysis"]
+    return run_cpu_bound(compute_pet_analysis, pet_id, df=df, pet_breed=pet_breed)
+
+
+@app.route("/analyze", methods=["POST"])
+def analyze_endpoint():
+    data = request.get_json()
+    pet_id = data.get("pet_id")
+    if not pet_id:
+        return jsonify({"error": "pet_id required"}), 400
+
+    started = time.monotonic()
+    # Polling clients revalidate with If-None-Match; answer that before running the analysis
+    _, current = _lookup_pet_watermark(pet_id)
+    if current is not None:
+        etag = representation_etag("analyze", current[0])
+        not_modified = _not_modified_response(etag, current[1])
+        if not_modified is not None:
+            return not_modified
+    try:
+        result = PET_FLIGHTS.do((pet_id, "analyze"), _analyze_pet_request, pet_id)
+    except SingleFlightTimeoutError as e:
+        print(f"[SINGLE-FLIGHT] {e}")
+        return jsonify({"error": "analysis is taking too long, try again shortly"}), 503
+    except _LogFetchError as e:
+        # Supabase is down and its circuit has nothing cached for this pet: the last
+        # stored analysis beats an error
+        print(f"[ANALYZE] Pet {pet_id}: ⚠ Log fetch failed: {e}")
+        snapshot = load_pet_snapshots([pet_id]).get(str(pet_id))
+        if snapshot is None or snapshot["analysis"] is None:
+            raise
+        return _mark_stale(jsonify(dict(snapshot["analysis"], stale=True, stale_sources=["behavior_logs"],
+                                        analysis_cached_at=snapshot["computed_at"])), ["behavior_logs"])
+    stale_sources = stale_data_sources(started)
+    if stale_sources:
+        return _mark_stale(jsonify(dict(result, stale=True, stale_sources=stale_sources)), stale_sources)
+    response = jsonify(result)
+    if current is not None:
+        _with_validators(response, etag, current[1])
+    return response
 
 @app.route("/predict", methods=["POST"])
 def predict_endpoint():
@@ -1406,8 +2569,12 @@ def predict_endpoint():
     if not all([pet_id, activity_level, food_intake, water_intake, bathroom_habits]):
         return jsonify({"error": "Missing fields"}), 400
 
+    # The log count for the notice below is fetched while the prediction runs
+    logs_future = fetch_logs_df_async(pet_id)
+
     # Illness risk prediction
-    illness_risk = predict_illness_risk(activity_level, food_intake, water_intake, bathroom_habits, symptom_count)
+    illness_risk = run_cpu_bound(predict_illness_risk, activity_level, food_intake, water_intake,
+                                 bathroom_habits, symptom_count)
     illness_model_trained = is_illness_model_trained()
     is_unhealthy = isinstance(illness_risk, str) and illness_risk.lower() in ("high", "medium")
     health_status = "unhealthy" if is_unhealthy else "healthy"
@@ -1418,7 +2585,7 @@ def predict_endpoint():
 
     # Add user messaging about analysis method
     try:
-        df = fetch_logs_df(pet_id)
+        df = logs_future.result()
         num_logs = len(df) if df is not None and len(df) > 0 else 0
         
         model_notice = {}
@@ -1451,479 +2618,1770 @@ def predict_endpoint():
         "model_notice": model_notice
     })
 
-# ------------------- Public pet info page -------------------
-@app.route("/pet/<pet_id>", methods=["GET"])
-def public_pet_page(pet_id):
-    try:
-        # fetch pet with owner information joined from public.users table
-        # Note: email is in auth.users, not public.users, so we only fetch name and role
-        resp = supabase.table("pets").select("*, users!owner_id(name, role)").eq("id", pet_id).limit(1).execute()
-        pet_rows = resp.data or []
-        if not pet_rows:
-            return make_response("<h3>Pet not found</h3>", 404)
-        pet = pet_rows[0]
-
-        # resolve owner using the app USERS table (public.users has: id, name, role)
-        owner_name = None
-        owner_email = None
-        owner_role = None
-        owner_id = pet.get("owner_id")
-        
-        # Try to get owner info from the joined data first
-        owner_data = pet.get("users")
-        if owner_data and isinstance(owner_data, dict):
-            owner_name = owner_data.get("name")
-            owner_role = owner_data.get("role")
-            print(f"DEBUG: Got owner from join - name: {owner_name}, role: {owner_role}")
-
-        # Fallback: if join didn't work, try direct query to users table
-        if not owner_name and owner_id:
-            try:
-                # public.users has: id, name, role (email is in auth.users)
-                uresp = supabase.table("users").select("name, role").eq("id", owner_id).limit(1).execute()
-                urows = uresp.data or []
-                if urows:
-                    u0 = urows[0]
-                    owner_name = u0.get("name")
-                    owner_role = u0.get("role") or owner_role
-                    print(f"DEBUG: Found owner in users table - name: {owner_name}, role: {owner_role}")
-                else:
-                    print(f"DEBUG: No user found in users table for owner_id: {owner_id}")
-            except Exception as e:
-                # ignore errors and continue to fallback attempts
-                print(f"DEBUG: Error fetching from users table: {e}")
-                owner_name = owner_name or None
-
-            # best-effort: if name missing, try to fetch auth users metadata (if available in your Supabase instance)
-            if not owner_name:
-                try:
-                    # supabase.auth.api.get_user may be available in your client; wrapped in try/except
-                    auth_user = None
-                    if hasattr(supabase.auth, "api") and hasattr(supabase.auth.api, "get_user"):
-                        auth_user = supabase.auth.api.get_user(owner_id)
-                    elif hasattr(supabase.auth, "get_user"):
-                        # alternative method name
-                        auth_user = supabase.auth.get_user(owner_id)
-                    if auth_user:
-                        # Get email from auth.users (it's stored there, not in public.users)
-                        if not owner_email:
-                            owner_email = auth_user.get("email") if isinstance(auth_user, dict) else getattr(auth_user, "email", None)
-                        
-                        # auth_user may be dict-like or object; handle both
-                        meta = {}
-                        try:
-                            # attempt multiple possible attribute / key names
-                            meta = (auth_user.get("user_metadata") if isinstance(auth_user, dict) else getattr(auth_user, "user_metadata", None)) or \
-                                   (auth_user.get("raw_user_meta_data") if isinstance(auth_user, dict) else getattr(auth_user, "raw_user_meta_data", None)) or {}
-                        except Exception:
-                            meta = {}
-                        if isinstance(meta, str):
-                            try:
-                                meta = json.loads(meta)
-                            except Exception:
-                                meta = {}
-                        if isinstance(meta, dict):
-                            # prefer common keys
-                            owner_name = owner_name or (meta.get("name") or meta.get("full_name") or meta.get("display_name"))
-                except Exception:
-                    pass
-
-        # fallback: use email local-part or owner id or generic label
-        if not owner_name:
-            if owner_email:
-                try:
-                    owner_name = owner_email.split("@")[0]
-                except Exception:
-                    owner_name = owner_email
-            else:
-                owner_name = owner_id or "Owner"
+@app.route("/data-client", methods=["GET"])
+def data_client_status_endpoint():
+    """Connection pool settings and per-call Supabase latency for this process."""
+    return jsonify({
+        "worker": process_worker_id(),
+        "pool": {
+            "max_connections": SUPABASE_POOL_MAX_CONNECTIONS,
+            "max_keepalive": SUPABASE_POOL_MAX_KEEPALIVE,
+            "keepalive_seconds": SUPABASE_KEEPALIVE_SECONDS,
+            "http2": SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None,
+            "connect_timeout": SUPABASE_CONNECT_TIMEOUT,
+            "read_timeout": SUPABASE_READ_TIMEOUT,
+            "read_retries": SUPABASE_READ_RETRIES,
+        },
+        "calls": DATA_CALL_METRICS.snapshot(),
+        "circuits": {name: circuit.status() for name, circuit in sorted(DATA_CIRCUITS.items())},
+        "last_known_good_entries": len(DATA_LAST_KNOWN_GOOD),
+    })
 
-        # prepare pet fields for display (added gender & health)
-        pet_name = pet.get("name") or "Unnamed"
-        pet_breed = pet.get("breed") or "Unknown"
-        
-        # Calculate age from date_of_birth if available
-        pet_age = ""
-        pet_age_field = pet.get("date_of_birth")
-        if pet_age_field:
-            try:
-                # Handle timezone-aware datetime strings (e.g., '2021-09-30 00:00:00+00')
-                birth_date = pd.to_datetime(pet_age_field)
-                # Convert to naive UTC date for comparison
-                if hasattr(birth_date, 'tz_localize') and birth_date.tzinfo is not None:
-                    birth_date = birth_date.tz_convert('UTC').tz_localize(None)
-                
-                today = pd.to_datetime(datetime.utcnow().date())
-                age_delta = (today - birth_date).days
-                
-                if age_delta < 0:
-                    # Birth date is in the future (invalid data)
-                    print(f"DEBUG: Birth date is in the future: {pet_age_field}")
-                    pet_age = "Unknown"
-                else:
-                    years = age_delta // 365
-                    months = (age_delta % 365) // 30
-                    
-                    # Display age in a simple, readable format
-                    if years >= 1:
-                        pet_age = f"{years} year{'s' if years > 1 else ''} old"
-                    elif months >= 1:
-                        pet_age = f"{months} month{'s' if months > 1 else ''} old"
-                    else:
-                        pet_age = f"{age_delta} day{'s' if age_delta > 1 else ''} old"
-                    
-                    print(f"DEBUG: Calculated age from date_of_birth '{pet_age_field}': {pet_age} (delta: {age_delta} days, years: {years}, months: {months})")
-            except Exception as e:
-                print(f"DEBUG: Failed to parse date_of_birth '{pet_age_field}': {e}")
-                import traceback
-                traceback.print_exc()
-                pet_age = "Unknown"
-        
-        pet_weight = pet.get("weight") or ""
-        pet_gender = pet.get("gender") or "Unknown"
-        pet_health = pet.get("health") or "Unknown"
-        pet_profile_picture = pet.get("profile_picture") or ""
-        
-        # Fetch owner profile picture
-        owner_profile_picture = ""
-        if owner_id:
-            try:
-                uresp = supabase.table("users").select("profile_picture").eq("id", owner_id).limit(1).execute()
-                urows = uresp.data or []
-                if urows:
-                    owner_profile_picture = urows[0].get("profile_picture") or ""
-            except Exception as e:
-                print(f"DEBUG: Failed to fetch owner profile picture: {e}")
-
-        # Get current illness risk from fresh analysis (predictions table deprecated)
-        # Fetch fresh analysis from /analyze endpoint to get latest prediction
-        latest_prediction_text = ""
-        latest_suggestions = ""
-        latest_risk = "low"
-        illness_model_trained = False
-        
-        try:
-            # Call /analyze endpoint internally to get current analysis
-            import requests
-            analysis_url = f"http://pettrackcare.onrender.com/analyze"
-            analysis_resp = requests.post(analysis_url, json={"pet_id": pet_id}, timeout=10)
-            if analysis_resp.status_code == 200:
-                analysis_data = analysis_resp.json()
-                latest_risk = analysis_data.get("illness_risk_blended") or analysis_data.get("illness_risk") or "low"
-                latest_prediction_text = analysis_data.get("trend") or ""
-                latest_suggestions = analysis_data.get("recommendation") or ""
-                illness_model_trained = analysis_data.get("illness_model_trained", False)
-                print(f"DEBUG: Got fresh analysis - risk: {latest_risk}, trend: {latest_prediction_text[:50]}")
-            else:
-                print(f"DEBUG: /analyze returned status {analysis_resp.status_code}")
-        except Exception as e:
-            print(f"DEBUG: Failed to fetch fresh analysis: {e}")
-            latest_risk = "low"
-
-        # determine a simple color for risk badge
-        lr = str(latest_risk).lower()
-        if "high" in lr:
-            risk_color = "#B82132"  # deep red
-        elif "medium" in lr:
-            risk_color = "#FF8C00"  # orange
-        elif "low" in lr:
-            risk_color = "#2ECC71"  # green
-        else:
-            risk_color = "#666666"
 
-        health_flag = str(pet_health or "").strip().lower()
-        if health_flag == "bad":
-            status_text = "Unhealthy"
-        elif health_flag == "good":
-            status_text = "Healthy"
-        else:
-            status_text = "Healthy"
-            try:
-                lr = str(latest_risk).lower()
-                if ("high" in lr) or ("medium" in lr):
-                    status_text = "Unhealthy"
-            except Exception:
-                status_text = "Healthy"
-
-        # Build care tips for display using recent logs + current risk from analysis
-        df_recent = fetch_logs_df(pet_id, limit=60)
-        if df_recent.empty:
-            mood_prob_recent, activity_prob_recent = {}, {}
-            avg_sleep_recent = 0.0
-            sleep_trend_recent = None
-        else:
-            # Mood and sleep hours no longer collected - use defaults
-            mood_prob_recent = {}
-            activity_prob_recent = df_recent['activity_level'].str.lower().value_counts(normalize=True).to_dict()
-            avg_sleep_recent = 0.0
-            sleep_trend_recent = None
-
-        care_tips = build_care_recommendations(
-            latest_risk or "low",
-            mood_prob_recent,
-            activity_prob_recent,
-            avg_sleep_recent,
-            sleep_trend_recent
-        )
-        actions_html = "".join(f"<li>{a}</li>" for a in (care_tips.get("actions") or [])[:6]) or "<li>Ensure fresh water and rest today.</li>"
-        expectations_html = "".join(f"<li>{e}</li>" for e in (care_tips.get("expectations") or [])[:6]) or "<li>Expect normal behavior with routine care.</li>"
-
-        def _is_pet_missing(value):
-            if value is None:
-                return False
-            if isinstance(value, bool):
-                return value
-            string_val = str(value).strip().lower()
-            return string_val not in ("", "0", "false", "none", "null")
-
-        pet_missing = _is_pet_missing(pet.get("is_missing"))
-        missing_alert_details = get_latest_missing_alert_details(pet.get("id"), pet_name, owner_id) if pet_missing else None
-        missing_alert_card_html = _render_missing_alert_card(missing_alert_details)
-
-        # The 7-day future predictions feature has been removed.
-        # Keep an empty placeholder so API responses maintain a stable shape.
-        future_predictions = []
-        future_html = ""
-
-        if "text/html" in request.headers.get("Accept", ""):
-            # Simple HTML with modal dialog - auto-open on load, responsive and scrollable
-            html = f"""
-            <!doctype html>
-            <html>
-                        <head>
-                            <meta name="viewport" content="width=device-width, initial-scale=1">
-                            <title>Pet Info - {pet_name}</title>
-                            <style>
-                                * {{ margin:0; padding:0; box-sizing:border-box; }}
-                                body {{ font-family: 'Inter', Arial, sans-serif; background:#f6f6f6; padding:16px; min-height:100vh; color:#1c1c1c; }}
-                                .card {{ max-width: 540px; margin:12px auto; background:#fff; border-radius:16px; padding:24px; box-shadow:0 16px 32px rgba(0,0,0,0.08); display:flex; flex-direction:column; gap:24px; }}
-                                .card h2 {{ font-size:22px; letter-spacing:0.02em; color:#B82132; margin-bottom:4px; }}
-                                .card h3 {{ font-size:16px; color:#666; margin:0; text-transform:uppercase; letter-spacing:0.08em; }}
-                                .profile-container {{ display:flex; gap:16px; align-items:flex-start; }}
-                                .profile-img {{ width:130px; height:130px; border-radius:18px; object-fit:cover; border:3px solid #ffecec; box-shadow:0 10px 24px rgba(184, 33, 50, 0.18); }}
-                                .profile-placeholder {{ width:130px; height:130px; border-radius:18px; background:#e9e9e9; border:3px dashed #d0d0d0; display:flex; align-items:center; justify-content:center; color:#999; font-size:18px; }}
-                                .info-grid {{ flex:1; display:grid; grid-template-columns:repeat(auto-fit, minmax(180px, 1fr)); gap:12px; }}
-                                .info-item {{ background:#fff7f6; border-radius:12px; padding:12px 14px; border:1px solid #ffe7e2; }}
-                                .info-item p {{ margin:0; }}
-                                .info-item .label {{ color:#777; font-size:12px; text-transform:uppercase; letter-spacing:0.1em; }}
-                                .info-item .value {{ font-size:16px; font-weight:600; color:#1c1c1c; margin-top:4px; }}
-                                .badge {{ display:inline-flex; align-items:center; gap:6px; padding:6px 12px; border-radius:999px; font-size:13px; font-weight:600; color:#fff; background:linear-gradient(120deg, #B82132, #D2665A); }}
-                                .owner-info {{ display:flex; align-items:center; gap:12px; padding:14px 0 0; border-top:1px solid #f0f0f0; }}
-                                .owner-contact {{ margin-left:auto; text-align:right; display:flex; flex-direction:column; gap:4px; }}
-                                .owner-contact .value {{ color:#1c1c1c; text-decoration:none; font-weight:600; }}
-                                .owner-info img {{ width:60px; height:60px; border-radius:50%; object-fit:cover; border:2px solid #e5e5e5; }}
-                                .owner-info .initials {{ width:60px; height:60px; border-radius:50%; background:#e0e0e0; display:flex; align-items:center; justify-content:center; font-size:24px; color:#999; }}
-                                .owner-info .label {{ font-size:12px; color:#666; margin-bottom:2px; }}
-                                .owner-info .value {{ font-size:16px; font-weight:600; color:#1c1c1c; }}
-                                .missing-alert-card {{
-                                    margin-top: 16px;
-                                    padding: 14px 16px 12px;
-                                    border-radius: 14px;
-                                    border: 1px solid #ffe7e2;
-                                    background: #fff5f2;
-                                    box-shadow: 0 12px 28px rgba(184, 33, 50, 0.15);
-                                }}
-                                .missing-alert-heading {{
-                                    font-size: 15px;
-                                    font-weight: 600;
-                                    color: #b82132;
-                                    margin-bottom: 8px;
-                                    letter-spacing: 0.05em;
-                                }}
-                                .missing-detail-row {{
-                                    display: flex;
-                                    justify-content: space-between;
-                                    align-items: flex-start;
-                                    gap: 12px;
-                                    margin-bottom: 6px;
-                                }}
-                                .missing-label {{
-                                    font-size: 11px;
-                                    text-transform: uppercase;
-                                    letter-spacing: 0.08em;
-                                    color: #777;
-                                }}
-                                .missing-value {{
-                                    font-size: 14px;
-                                    font-weight: 600;
-                                    color: #1c1c1c;
-                                    text-align: right;
-                                }}
-                                .missing-alert-meta {{
-                                    margin-top: 10px;
-                                    font-size: 12px;
-                                    color: #444;
-                                    letter-spacing: 0.02em;
-                                }}
-                                .missing-alert-empty {{
-                                    font-size: 13px;
-                                    color: #666;
-                                    margin-bottom: 0;
-                                }}
-                                .status-row {{ display:flex; align-items:center; justify-content:space-between; flex-wrap:wrap; gap:8px; }}
-                                .status-chip {{ font-size:13px; font-weight:600; padding:6px 16px; border-radius:999px; border:1px solid rgba(184,33,50,0.3); background:rgba(255,230,226,0.7); color:#B82132; }}
-                                @media (max-width: 600px) {{
-                                    .card {{ padding:20px; }}
-                                    .profile-container {{ flex-direction:column; align-items:center; }}
-                                    .info-grid {{ grid-template-columns:repeat(auto-fit, minmax(140px, 1fr)); }}
-                                }}
-                            </style>
-                        </head>
-                        <body>
-                            <div class="card">
-                                <div class="status-row">
-                                    <div>
-                                        <h2>Pet Quick Info</h2>
-                                        <h3>If seen, please contact the owner immediately.</h3>
-                                    </div>
-                                    <span class="status-chip">{status_text}</span>
-                                </div>
-                                <div class="profile-container">
-                                    {f'<img src="{pet_profile_picture}" alt="{pet_name}" class="profile-img">' if pet_profile_picture else '<div class="profile-placeholder">No photo</div>'}
-                                    <div class="info-grid">
-                                        <div class="info-item">
-                                            <p class="label">Name</p>
-                                            <p class="value">{pet_name}</p>
-                                        </div>
-                                        <div class="info-item">
-                                            <p class="label">Breed</p>
-                                            <p class="value">{pet_breed}</p>
-                                        </div>
-                                        <div class="info-item">
-                                            <p class="label">Age</p>
-                                            <p class="value">{pet_age if pet_age else 'Unknown'}</p>
-                                        </div>
-                                        <div class="info-item">
-                                            <p class="label">Weight</p>
-                                            <p class="value">{pet_weight if pet_weight else 'Not specified'}</p>
-                                        </div>
-                                        <div class="info-item">
-                                            <p class="label">Gender</p>
-                                            <p class="value">{pet_gender}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                                <div class="owner-info">
-                                    {f'<img src="{owner_profile_picture}" alt="{owner_name}" class="owner-avatar">' if owner_profile_picture else '<div class="initials">👤</div>'}
-                                    <div>
-                                        <p class="label">Owner</p>
-                                        <p class="value">{owner_name}</p>
-                                    </div>
-                                </div>
-                                {missing_alert_card_html}
-                            </div>
-                        </body>
-                        </html>
-            """
-            return make_response(html, 200, {"Content-Type": "text/html"})
+# ------------------- Public pet info page -------------------
 
-        # Otherwise, return JSON including future predictions
-        return jsonify({
-            "pet": {
-                "id": pet.get("id"),
-                "name": pet_name,
-                "breed": pet_breed,
-                "age": pet_age,
-                "weight": pet_weight,
-                "gender": pet_gender,
-                "health": pet_health,
-                "owner_name": owner_name,
-                "owner_email": owner_email,
-                "owner_role": owner_role,
-            },
-            "latest_prediction": {
-                "text": latest_prediction_text,
-                "risk": latest_risk,
-                "suggestions": latest_suggestions,
-                "status": status_text,
-                "model_trained": illness_model_trained,
-            },
-            "future_predictions": future_predictions,
-            "care_tips": care_tips,
-            "health_status": status_text,
-            "risk_color": risk_color,
-            "missing_alert": missing_alert_details,
-        })
-    except Exception as e:
-        return make_response(f"<h3>Error: {str(e)}</h3>", 500)
+# Page markup lives in templates/public_pet.html, compiled once at import so each render
+# only interpolates the per-pet values. Its stylesheet is served separately under a
+# content fingerprint so browsers and scanners can cache it indefinitely.
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
+PUBLIC_PET_TEMPLATE = app.jinja_env.get_template("public_pet.html")
 
-# Alias route so URLs under /analyze/pet/<id> also resolve (compatible with QR payloads that include /analyze)
-@app.route("/analyze/pet/<pet_id>", methods=["GET"])
-def public_pet_page_alias(pet_id):
-    return public_pet_page(pet_id)
 
+def _load_fingerprinted_asset(relative_path):
+    with open(os.path.join(app.static_folder, relative_path), "rb") as f:
+        content = f.read()
+    return content, hashlib.sha1(content).hexdigest()[:12]
 
-@app.route("/pet/<pet_id>/7day-health", methods=["GET"])
-def seven_day_health_endpoint(pet_id):
-    """Endpoint removed: return 404 with a short explanation.
 
-    The detailed 7-day forecast endpoint was removed to simplify the
-    API surface. Clients should use the single-date `GET /pet/<id>`
-    route which returns the latest prediction and care tips.
-    """
-    return jsonify({"error": "7-day health forecast endpoint removed", "note": "Use /pet/<id> for current status"}), 404
+PUBLIC_PET_CSS, PUBLIC_PET_CSS_FINGERPRINT = _load_fingerprinted_asset(os.path.join("css", "public_pet.css"))
+PUBLIC_PET_CSS_URL = f"/assets/public_pet.{PUBLIC_PET_CSS_FINGERPRINT}.css"
 
-@app.route("/", methods=["GET", "HEAD"])
-def root():
-    return "PetTrackCare API is running.", 200
 
-# ------------------- Daily Scheduler -------------------
+@app.route("/assets/public_pet.<fingerprint>.css", methods=["GET"])
+def public_pet_stylesheet(fingerprint):
+    # Pages rendered before a deploy may still reference an older fingerprint; serve the
+    # current stylesheet to them too, but only cache it long-term under its own hash.
+    cache_control = ("public, max-age=31536000, immutable" if fingerprint == PUBLIC_PET_CSS_FINGERPRINT
+                     else "public, max-age=300")
+    return make_response(PUBLIC_PET_CSS, 200, {
+        "Content-Type": "text/css; charset=utf-8",
+        "Cache-Control": cache_control,
+    })
 
-def daily_analysis_job():
-    print(f"🔄 Running daily pet behavior analysis at {datetime.now()}")
-    pets_resp = supabase.table("pets").select("id").execute()
-    for pet in pets_resp.data or []:
-        df = fetch_logs_df(pet["id"])
-        if not df.empty:
-            train_illness_model(df)  # retrain and persist illness model
-        result = analyze_pet(pet["id"])
-        print(f"[INFO] Pet {pet['id']} analysis stored:", result)
 
+# Independent Supabase reads for the public page are issued concurrently on this pool
+PUBLIC_PAGE_FETCH_WORKERS = int(os.getenv("PUBLIC_PAGE_FETCH_WORKERS", "8"))
+PUBLIC_PAGE_CALL_TIMEOUT = float(os.getenv("PUBLIC_PAGE_CALL_TIMEOUT", "6"))
+PUBLIC_PAGE_EXECUTOR = ThreadPoolExecutor(max_workers=PUBLIC_PAGE_FETCH_WORKERS, thread_name_prefix="public-page")
 
-def enqueue_task(task_name: str):
-    """Spawn a separate Python process to run a named task.
 
-    Keeps heavy CPU / I/O work out of the Flask worker process.
-    The subprocess will invoke this same module with --task=<name>.
-    """
+def _await_page_call(future, label, default=None, timeout=PUBLIC_PAGE_CALL_TIMEOUT, failed=None):
+    """Wait for a fan-out call; on timeout or error log it, record `label` in the
+    `failed` list if one is given, and return `default`."""
+    if future is None:
+        return default
     try:
-        script = os.path.abspath(__file__)
-        cmd = [sys.executable, script, f"--task={task_name}"]
-        # Start detached subprocess; silence output by default
-        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        print(f"[INFO] Enqueued task '{task_name}' as subprocess: {cmd}")
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        print(f"DEBUG: {label} timed out after {timeout}s; rendering without it")
     except Exception as e:
-        print(f"[ERROR] Failed to enqueue task {task_name}: {e}")
+        print(f"DEBUG: {label} failed: {e}")
+    if failed is not None:
+        failed.append(label)
+    return default
 
 
-def start_scheduler():
-    """Schedule light-weight triggers that enqueue heavy work as subprocesses."""
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(lambda: enqueue_task("daily_analysis"), 'interval', days=1)
-    scheduler.add_job(lambda: enqueue_task("migrate"), 'interval', days=1)
-    scheduler.start()
+def _fetch_pet_with_owner(pet_id):
+    # Owner name, role and avatar come from public.users in the same join
+    # Note: email is in auth.users, not public.users, so it is not selected here
+    resp = supabase.table("pets").select("*, users!owner_id(name, role, profile_picture)").eq("id", pet_id).limit(1).execute()
+    return resp.data or []
 
 
-# Removed: backfill_future_sleep_forecasts() - predictions table deprecated
-# Removed: migrate_legacy_sleep_forecasts() - predictions table deprecated  
-# Removed: store_prediction() - predictions table deprecated
+def _is_pet_missing(value):
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    string_val = str(value).strip().lower()
+    return string_val not in ("", "0", "false", "none", "null")
 
-def analyze_illness_duration_and_patterns(df):
-    """
-    Analyze illness duration, persistence, and historical patterns.
-    
-    Returns dict with:
-    - illness_duration_days: How long unhealthy pattern has persisted
-    - is_persistent: Whether illness lasted >7 days
-    - pattern_type: 'acute', 'chronic', 'cyclical', 'improving', 'worsening'
-    - sudden_changes: List of sudden health changes detected
-    - recovery_history: Whether pet has recovered before from similar patterns
+
+def build_public_pet_view(pet_id):
+    """Fetch and assemble everything the public pet page shows.
+
+    Returns (view, 200) on success, or (None, status) when the pet does not
+    exist (404) or its row could not be loaded in time (503). view["degraded"] is
+    True when some section fell back to cached or empty data after a failed call.
     """
-    if df is None or df.empty:
-        return {"illness_duration_days": 0, "is_persistent": False, "pattern_type": None}
+    # The pet row and its logs don't depend on each other, so fetch both at once
+    pet_future = PUBLIC_PAGE_EXECUTOR.submit(_fetch_pet_with_owner, pet_id)
+    logs_future = PUBLIC_PAGE_EXECUTOR.submit(fetch_logs_df, pet_id)
+
+    pet_rows = _await_page_call(pet_future, "pet lookup")
+    if pet_rows is None:
+        return None, 503
+    if not pet_rows:
+        return None, 404
+    pet = pet_rows[0]
+
+    # resolve owner using the app USERS table (public.users has: id, name, role, profile_picture)
+    owner_name = None
+    owner_email = None
+    owner_role = None
+    owner_profile_picture = ""
+    owner_id = pet.get("owner_id")
+    pet_name = pet.get("name") or "Unnamed"
+
+    # Missing-alert lookup and analysis only need the pet row and logs; start them now
+    pet_missing = _is_pet_missing(pet.get("is_missing"))
+    missing_future = (PUBLIC_PAGE_EXECUTOR.submit(get_latest_missing_alert_details, pet.get("id"), pet_name, owner_id)
+                      if pet_missing else None)
+    failed_calls = []
+    df_recent = _await_page_call(logs_future, "behavior log fetch", failed=failed_calls)
+    # Without the logs an analysis would read as "no data / low risk" and overwrite the
+    # pet's last good result, so fall back to the cached analysis instead
+    analysis_future = (PUBLIC_PAGE_EXECUTOR.submit(run_cpu_bound, get_pet_analysis, pet_id, df_recent, pet.get("breed"))
+                       if df_recent is not None else None)
+    if df_recent is None:
+        df_recent = pd.DataFrame()
     
-    try:
-        df_copy = df.copy()
+    # Try to get owner info from the joined data first
+    owner_data = pet.get("users")
+    if owner_data and isinstance(owner_data, dict):
+        owner_name = owner_data.get("name")
+        owner_role = owner_data.get("role")
+        owner_profile_picture = owner_data.get("profile_picture") or ""
+        print(f"DEBUG: Got owner from join - name: {owner_name}, role: {owner_role}")
+
+    # Fallback: if join didn't work, try direct query to users table
+    if not owner_name and owner_id:
+        try:
+            # public.users has: id, name, role, profile_picture (email is in auth.users)
+            uresp = supabase.table("users").select("name, role, profile_picture").eq("id", owner_id).limit(1).execute()
+            urows = uresp.data or []
+            if urows:
+                u0 = urows[0]
+                owner_name = u0.get("name")
+                owner_role = u0.get("role") or owner_role
+                owner_profile_picture = owner_profile_picture or u0.get("profile_picture") or ""
+                print(f"DEBUG: Found owner in users table - name: {owner_name}, role: {owner_role}")
+            else:
+                print(f"DEBUG: No user found in users table for owner_id: {owner_id}")
+        except Exception as e:
+            # ignore errors and continue to fallback attempts
+            print(f"DEBUG: Error fetching from users table: {e}")
+            owner_name = owner_name or None
+
+        # best-effort: if name missing, try to fetch auth users metadata (if available in your Supabase instance)
+        if not owner_name:
+            try:
+                # supabase.auth.api.get_user may be available in your client; wrapped in try/except
+                auth_user = None
+                if hasattr(supabase.auth, "api") and hasattr(supabase.auth.api, "get_user"):
+                    auth_user = supabase.auth.api.get_user(owner_id)
+                elif hasattr(supabase.auth, "get_user"):
+                    # alternative method name
+                    auth_user = supabase.auth.get_user(owner_id)
+                if auth_user:
+                    # Get email from auth.users (it's stored there, not in public.users)
+                    if not owner_email:
+                        owner_email = auth_user.get("email") if isinstance(auth_user, dict) else getattr(auth_user, "email", None)
+                    
+                    # auth_user may be dict-like or object; handle both
+                    meta = {}
+                    try:
+                        # attempt multiple possible attribute / key names
+                        meta = (auth_user.get("user_metadata") if isinstance(auth_user, dict) else getattr(auth_user, "user_metadata", None)) or \
+                               (auth_user.get("raw_user_meta_data") if isinstance(auth_user, dict) else getattr(auth_user, "raw_user_meta_data", None)) or {}
+                    except Exception:
+                        meta = {}
+                    if isinstance(meta, str):
+                        try:
+                            meta = json.loads(meta)
+                        except Exception:
+                            meta = {}
+                    if isinstance(meta, dict):
+                        # prefer common keys
+                        owner_name = owner_name or (meta.get("name") or meta.get("full_name") or meta.get("display_name"))
+            except Exception:
+                pass
+
+    # fallback: use email local-part or owner id or generic label
+    if not owner_name:
+        if owner_email:
+            try:
+                owner_name = owner_email.split("@")[0]
+            except Exception:
+                owner_name = owner_email
+        else:
+            owner_name = owner_id or "Owner"
+
+    # prepare pet fields for display (added gender & health)
+    pet_breed = pet.get("breed") or "Unknown"
+    
+    # Calculate age from date_of_birth if available
+    pet_age = ""
+    pet_age_field = pet.get("date_of_birth")
+    if pet_age_field:
+        try:
+            # Handle timezone-aware datetime strings (e.g., '2021-09-30 00:00:00+00')
+            birth_date = pd.to_datetime(pet_age_field)
+            # Convert to naive UTC date for comparison
+            if hasattr(birth_date, 'tz_localize') and birth_date.tzinfo is not None:
+                birth_date = birth_date.tz_convert('UTC').tz_localize(None)
+            
+            today = pd.to_datetime(datetime.utcnow().date())
+            age_delta = (today - birth_date).days
+            
+            if age_delta < 0:
+                # Birth date is in the future (invalid data)
+                print(f"DEBUG: Birth date is in the future: {pet_age_field}")
+                pet_age = "Unknown"
+            else:
+                years = age_delta // 365
+                months = (age_delta % 365) // 30
+                
+                # Display age in a simple, readable format
+                if years >= 1:
+                    pet_age = f"{years} year{'s' if years > 1 else ''} old"
+                elif months >= 1:
+                    pet_age = f"{months} month{'s' if months > 1 else ''} old"
+                else:
+                    pet_age = f"{age_delta} day{'s' if age_delta > 1 else ''} old"
+                
+                print(f"DEBUG: Calculated age from date_of_birth '{pet_age_field}': {pet_age} (delta: {age_delta} days, years: {years}, months: {months})")
+        except Exception as e:
+            print(f"DEBUG: Failed to parse date_of_birth '{pet_age_field}': {e}")
+            import traceback
+            traceback.print_exc()
+            pet_age = "Unknown"
+    
+    pet_weight = pet.get("weight") or ""
+    pet_gender = pet.get("gender") or "Unknown"
+    pet_health = pet.get("health") or "Unknown"
+    pet_profile_picture = pet.get("profile_picture") or ""
+    
+    # Get current illness risk from fresh analysis (predictions table deprecated).
+    # Runs in-process rather than calling back into our own /analyze route; if it
+    # overruns the page budget, fall back to the pet's last cached analysis.
+    latest_prediction_text = ""
+    latest_suggestions = ""
+    latest_risk = "low"
+    illness_model_trained = False
+    
+    cached_analysis = cached_pet_analysis(pet_id)
+    analysis_data = _await_page_call(analysis_future, "analysis",
+                                     default=cached_analysis[1] if cached_analysis else None,
+                                     failed=failed_calls)
+    if analysis_future is None:
+        analysis_data = cached_analysis[1] if cached_analysis else None
+    if analysis_data and analysis_data.get("analysis_cached_at"):
+        failed_calls.append("analysis")
+    if analysis_data:
+        latest_risk = analysis_data.get("illness_risk_blended") or analysis_data.get("illness_risk") or "low"
+        latest_prediction_text = analysis_data.get("trend") or ""
+        latest_suggestions = analysis_data.get("recommendation") or ""
+        illness_model_trained = analysis_data.get("illness_model_trained", False)
+        print(f"DEBUG: Got fresh analysis - risk: {latest_risk}, trend: {latest_prediction_text[:50]}")
+    else:
+        print(f"DEBUG: No analysis available for pet {pet_id}")
+
+    # determine a simple color for risk badge
+    lr = str(latest_risk).lower()
+    if "high" in lr:
+        risk_color = "#B82132"  # deep red
+    elif "medium" in lr:
+        risk_color = "#FF8C00"  # orange
+    elif "low" in lr:
+        risk_color = "#2ECC71"  # green
+    else:
+        risk_color = "#666666"
+
+    health_flag = str(pet_health or "").strip().lower()
+    if health_flag == "bad":
+        status_text = "Unhealthy"
+    elif health_flag == "good":
+        status_text = "Healthy"
+    else:
+        status_text = "Healthy"
+        try:
+            lr = str(latest_risk).lower()
+            if ("high" in lr) or ("medium" in lr):
+                status_text = "Unhealthy"
+        except Exception:
+            status_text = "Healthy"
+
+    # Build care tips for display using recent logs + current risk from analysis.
+    # The analysis reads up to 200 logs; the tips only ever looked at the latest 60.
+    df_recent = df_recent.sort_values("log_date").tail(60) if not df_recent.empty else df_recent
+    if df_recent.empty:
+        mood_prob_recent, activity_prob_recent = {}, {}
+        avg_sleep_recent = 0.0
+        sleep_trend_recent = None
+    else:
+        # Mood and sleep hours no longer collected - use defaults
+        mood_prob_recent = {}
+        activity_prob_recent = df_recent['activity_level'].str.lower().value_counts(normalize=True).to_dict()
+        avg_sleep_recent = 0.0
+        sleep_trend_recent = None
+
+    care_tips = build_care_recommendations(
+        latest_risk or "low",
+        mood_prob_recent,
+        activity_prob_recent,
+        avg_sleep_recent,
+        sleep_trend_recent
+    )
+    actions_html = "".join(f"<li>{a}</li>" for a in (care_tips.get("actions") or [])[:6]) or "<li>Ensure fresh water and rest today.</li>"
+    expectations_html = "".join(f"<li>{e}</li>" for e in (care_tips.get("expectations") or [])[:6]) or "<li>Expect normal behavior with routine care.</li>"
+
+    missing_alert_details = _await_page_call(missing_future, "missing alert lookup", failed=failed_calls)
+    missing_alert_card = _missing_alert_card_context(missing_alert_details)
+
+    # The 7-day future predictions feature has been removed.
+    # Keep an empty placeholder so API responses maintain a stable shape.
+    future_predictions = []
+
+    # JSON payload (including future predictions placeholder) plus the fields the HTML page shows
+    payload = {
+        "pet": {
+            "id": pet.get("id"),
+            "name": pet_name,
+            "breed": pet_breed,
+            "age": pet_age,
+            "weight": pet_weight,
+            "gender": pet_gender,
+            "health": pet_health,
+            "owner_name": owner_name,
+            "owner_email": owner_email,
+            "owner_role": owner_role,
+        },
+        "latest_prediction": {
+            "text": latest_prediction_text,
+            "risk": latest_risk,
+            "suggestions": latest_suggestions,
+            "status": status_text,
+            "model_trained": illness_model_trained,
+        },
+        "future_predictions": future_predictions,
+        "care_tips": care_tips,
+        "health_status": status_text,
+        "risk_color": risk_color,
+        "missing_alert": missing_alert_details,
+        "degraded": bool(failed_calls),
+    }
+    display = {
+        "pet_name": pet_name,
+        "status_text": status_text,
+        "pet_profile_picture": pet_profile_picture,
+        "pet_breed": pet_breed,
+        "pet_age": pet_age,
+        "pet_weight": pet_weight,
+        "pet_gender": pet_gender,
+        "owner_profile_picture": owner_profile_picture,
+        "owner_name": owner_name,
+        "missing_alert": missing_alert_card,
+    }
+    if failed_calls:
+        print(f"DEBUG: Pet {pet_id} view degraded: {', '.join(failed_calls)}")
+    return {"payload": payload, "display": display, "degraded": bool(failed_calls)}, 200
+
+
+def render_public_pet_html(display: dict) -> str:
+    """Render the public pet page HTML from build_public_pet_view()'s display fields."""
+    return PUBLIC_PET_TEMPLATE.render(stylesheet_url=PUBLIC_PET_CSS_URL, **display)
+
+
+# ------------------- Content watermarks -------------------
+# A watermark is a hash of everything a pet's analysis and public page are derived from.
+# It backs both the rendered-page cache and the ETag/Last-Modified validators, and is
+# itself cached for PET_WATERMARK_TTL_SECONDS so bursts of scans cost no queries.
+PET_WATERMARK_TTL_SECONDS = float(os.getenv("PET_WATERMARK_TTL_SECONDS", "30"))
+PET_WATERMARK_CACHE_MAX_ENTRIES = int(os.getenv("PET_WATERMARK_CACHE_MAX_ENTRIES", "4096"))
+PET_WATERMARK_CACHE = OrderedDict()  # pet_id -> {"watermark", "checked_at", "modified_at"}
+PET_WATERMARK_LOCK = threading.Lock()
+# Its two reads get their own pool so revalidations never queue behind page analyses
+PET_WATERMARK_FETCH_WORKERS = int(os.getenv("PET_WATERMARK_FETCH_WORKERS", "4"))
+PET_WATERMARK_EXECUTOR = ThreadPoolExecutor(max_workers=PET_WATERMARK_FETCH_WORKERS, thread_name_prefix="pet-watermark")
+
+
+def illness_model_version(model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
+    """Identify the illness model on disk by its modification time."""
+    try:
+        return str(os.path.getmtime(model_path))
+    except OSError:
+        return "untrained"
+
+
+def pet_content_watermark(pet_id):
+    """Hash the inputs of a pet's analysis and page: the pet row, its latest log and log
+    count, its missing-alert details (missing pets only), the illness model version
+    and today's date. Returns None if the pet no longer exists."""
+    pet_future = PET_WATERMARK_EXECUTOR.submit(
+        lambda: supabase.table("pets").select("*").eq("id", pet_id).limit(1).execute().data or [])
+    log_future = PET_WATERMARK_EXECUTOR.submit(
+        lambda: supabase.table("behavior_logs").select("*", count="exact").eq("pet_id", pet_id).order("log_date", desc=True).limit(1).execute())
+    pet_rows = pet_future.result(timeout=PUBLIC_PAGE_CALL_TIMEOUT)
+    log_resp = log_future.result(timeout=PUBLIC_PAGE_CALL_TIMEOUT)
+    if not pet_rows:
+        return None
+    pet = pet_rows[0]
+    missing_alert = None
+    if _is_pet_missing(pet.get("is_missing")):
+        missing_alert = get_latest_missing_alert_details(pet.get("id"), pet.get("name"), pet.get("owner_id"))
+    # The analysis depends on how old the logs are, so the watermark also turns over daily
+    state = [
+        pet,
+        log_resp.data or [],
+        getattr(log_resp, "count", None),
+        missing_alert,
+        illness_model_version(),
+        date.today().isoformat(),
+    ]
+    return hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def current_pet_watermark(pet_id):
+    """Return (watermark, modified_at) for a pet, or None if it no longer exists.
+
+    modified_at is when this process first saw the current watermark, so it only moves
+    forward when the content does. Raises if the lookup itself fails.
+    """
+    now = time.monotonic()
+    with PET_WATERMARK_LOCK:
+        cached = PET_WATERMARK_CACHE.get(pet_id)
+        if cached is not None and now - cached["checked_at"] < PET_WATERMARK_TTL_SECONDS:
+            return cached["watermark"], cached["modified_at"]
+
+    watermark = PET_FLIGHTS.do((pet_id, "watermark"), pet_content_watermark, pet_id)
+    with PET_WATERMARK_LOCK:
+        if watermark is None:
+            PET_WATERMARK_CACHE.pop(pet_id, None)
+            return None
+        cached = PET_WATERMARK_CACHE.get(pet_id)
+        if cached is not None and cached["watermark"] == watermark:
+            modified_at = cached["modified_at"]
+        else:
+            modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+        PET_WATERMARK_CACHE[pet_id] = {"watermark": watermark, "checked_at": now, "modified_at": modified_at}
+        PET_WATERMARK_CACHE.move_to_end(pet_id)
+        while len(PET_WATERMARK_CACHE) > PET_WATERMARK_CACHE_MAX_ENTRIES:
+            PET_WATERMARK_CACHE.popitem(last=False)
+    return watermark, modified_at
+
+
+def _lookup_pet_watermark(pet_id):
+    """current_pet_watermark() for request handlers: returns (found, current), where a
+    failed lookup yields (True, None) so the caller serves the response without validators."""
+    try:
+        current = current_pet_watermark(pet_id)
+    except Exception as e:
+        print(f"[CONDITIONAL] Pet {pet_id}: Watermark lookup failed: {e}")
+        return True, None
+    return current is not None, current
+
+
+# ------------------- Conditional requests -------------------
+
+def representation_etag(kind, watermark):
+    """Strong ETag for one representation (`kind`) of a pet's content."""
+    return hashlib.sha1(f"{kind}:{watermark}".encode("utf-8")).hexdigest()
+
+
+def _not_modified_response(etag, modified_at):
+    """A 304 response when the request's validators match, otherwise None.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if request.if_none_match:
+        if not request.if_none_match.contains(etag):
+            return None
+    elif not (modified_at and request.if_modified_since and modified_at <= request.if_modified_since):
+        return None
+    response = make_response("", 304)
+    response.set_etag(etag)
+    if modified_at:
+        response.last_modified = modified_at
+    return response
+
+
+def _mark_stale(response, sources):
+    """Flag a response built from last-known-good data (see stale_data_sources()). It
+    gets no validators, so clients don't revalidate against content they never saw fresh."""
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    response.headers["X-Data-Stale"] = ", ".join(sources)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _with_validators(response, etag, modified_at=None):
+    response.set_etag(etag)
+    if modified_at:
+        response.last_modified = modified_at
+    return response
+
+
+# ------------------- Rendered public page cache -------------------
+# QR posters for missing pets get scanned in bursts, so the rendered HTML is cached per
+# pet together with the content watermark it was built from. While the pet's watermark
+# is unchanged the cached page is served as is. Changed pages are served stale while one
+# background refresh re-renders them, up to PUBLIC_PAGE_CACHE_MAX_STALE_SECONDS old.
+PUBLIC_PAGE_CACHE_MAX_STALE_SECONDS = float(os.getenv("PUBLIC_PAGE_CACHE_MAX_STALE_SECONDS", "3600"))
+PUBLIC_PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PUBLIC_PAGE_CACHE_MAX_ENTRIES", "512"))
+PUBLIC_PAGE_CACHE = OrderedDict()  # pet_id -> {"html", "watermark", "rendered_at", "refreshing"}
+PUBLIC_PAGE_CACHE_LOCK = threading.Lock()
+
+
+def _store_public_page(pet_id, page_html, watermark):
+    with PUBLIC_PAGE_CACHE_LOCK:
+        PUBLIC_PAGE_CACHE[pet_id] = {
+            "html": page_html,
+            "watermark": watermark,
+            "rendered_at": time.monotonic(),
+            "refreshing": False,
+        }
+        PUBLIC_PAGE_CACHE.move_to_end(pet_id)
+        while len(PUBLIC_PAGE_CACHE) > PUBLIC_PAGE_CACHE_MAX_ENTRIES:
+            PUBLIC_PAGE_CACHE.popitem(last=False)
+
+
+def invalidate_public_page(pet_id):
+    with PUBLIC_PAGE_CACHE_LOCK:
+        PUBLIC_PAGE_CACHE.pop(pet_id, None)
+
+
+def _render_public_page_fresh(pet_id, watermark):
+    """Build and render the page, caching it under `watermark`.
+
+    Returns (html, status, html_watermark). A degraded view is cached without a
+    watermark, so it never counts as a hit and the next request re-renders it.
+    """
+    view, status = build_public_pet_view(pet_id)
+    if view is None:
+        return None, status, None
+    page_html = render_public_pet_html(view["display"])
+    html_watermark = None if view["degraded"] else watermark
+    _store_public_page(pet_id, page_html, html_watermark)
+    return page_html, 200, html_watermark
+
+
+def _refresh_public_page_async(pet_id, watermark):
+    """Re-render a stale page in the background; at most one refresh per pet at a time."""
+    with PUBLIC_PAGE_CACHE_LOCK:
+        entry = PUBLIC_PAGE_CACHE.get(pet_id)
+        if entry is None or entry["refreshing"]:
+            return
+        entry["refreshing"] = True
+
+    def _refresh():
+        try:
+            page_html, status, _ = _render_public_page_fresh(pet_id, watermark)
+            if page_html is None:
+                invalidate_public_page(pet_id)
+            print(f"[PAGE-CACHE] Pet {pet_id}: Background refresh finished (status {status})")
+        except Exception as exc:
+            print(f"[PAGE-CACHE] Pet {pet_id}: ⚠ Background refresh failed: {exc}")
+            with PUBLIC_PAGE_CACHE_LOCK:
+                entry = PUBLIC_PAGE_CACHE.get(pet_id)
+                if entry is not None:
+                    entry["refreshing"] = False
+
+    threading.Thread(target=_refresh, daemon=True).start()
+
+
+def get_public_pet_html(pet_id, watermark):
+    """Serve the public pet page HTML through the rendered-page cache.
+
+    `watermark` is the pet's current content watermark, or None if it could not be
+    looked up (an existing render is then served rather than risking an error page).
+    Returns (html, status, cache_state, age_seconds, html_watermark); cache_state is one
+    of 'hit', 'stale' or 'miss', and html_watermark is the watermark the HTML was built from.
+    """
+    now = time.monotonic()
+    with PUBLIC_PAGE_CACHE_LOCK:
+        entry = PUBLIC_PAGE_CACHE.get(pet_id)
+        if entry is not None:
+            PUBLIC_PAGE_CACHE.move_to_end(pet_id)
+            entry = dict(entry)
+
+    if entry is not None:
+        age = now - entry["rendered_at"]
+        if watermark is None:
+            return entry["html"], 200, "stale", age, entry["watermark"]
+        if entry["watermark"] == watermark:
+            return entry["html"], 200, "hit", age, watermark
+        if age < PUBLIC_PAGE_CACHE_MAX_STALE_SECONDS:
+            _refresh_public_page_async(pet_id, watermark)
+            return entry["html"], 200, "stale", age, entry["watermark"]
+
+    page_html, status, html_watermark = PET_FLIGHTS.do((pet_id, "pet-html"), _render_public_page_fresh,
+                                                       pet_id, watermark)
+    return page_html, status, "miss", 0.0, html_watermark
+
+
+PUBLIC_PAGE_ERRORS = {
+    404: "<h3>Pet not found</h3>",
+    503: "<h3>Pet info is temporarily unavailable. Please try again shortly.</h3>",
+}
+
+
+@app.route("/pet/<pet_id>", methods=["GET"])
+def public_pet_page(pet_id):
+    started = time.monotonic()
+    try:
+        wants_html = "text/html" in request.headers.get("Accept", "")
+        kind = "pet-html" if wants_html else "pet-json"
+
+        # Answer revalidations from the watermark alone, before any analysis runs
+        found, current = _lookup_pet_watermark(pet_id)
+        if not found:
+            invalidate_public_page(pet_id)
+            return make_response(PUBLIC_PAGE_ERRORS[404], 404)
+        watermark, modified_at = current or (None, None)
+        if watermark is not None:
+            not_modified = _not_modified_response(representation_etag(kind, watermark), modified_at)
+            if not_modified is not None:
+                return not_modified
+
+        if wants_html:
+            page_html, status, cache_state, age, html_watermark = get_public_pet_html(pet_id, watermark)
+            if page_html is None:
+                return make_response(PUBLIC_PAGE_ERRORS[status], status)
+            response = make_response(page_html, 200, {
+                "Content-Type": "text/html",
+                "Age": str(int(age)),
+                "X-Page-Cache": cache_state,
+            })
+            stale_sources = stale_data_sources(started)
+            if stale_sources:
+                return _mark_stale(response, stale_sources)
+            # A stale page is tagged with the watermark it was rendered from, never the current one
+            if html_watermark is not None:
+                _with_validators(response, representation_etag(kind, html_watermark),
+                                 modified_at if html_watermark == watermark else None)
+            return response
+        view, status = PET_FLIGHTS.do((pet_id, "pet-json"), build_public_pet_view, pet_id)
+        if view is None:
+            return make_response(PUBLIC_PAGE_ERRORS[status], status)
+        # Otherwise, return JSON including future predictions
+        stale_sources = stale_data_sources(started)
+        if stale_sources:
+            return _mark_stale(jsonify(dict(view["payload"], stale=True, stale_sources=stale_sources)), stale_sources)
+        response = jsonify(view["payload"])
+        if watermark is not None and not view["degraded"]:
+            _with_validators(response, representation_etag(kind, watermark), modified_at)
+        return response
+    except SingleFlightTimeoutError as e:
+        print(f"[SINGLE-FLIGHT] {e}")
+        return make_response(PUBLIC_PAGE_ERRORS[503], 503)
+    except Exception as e:
+        return make_response(f"<h3>Error: {str(e)}</h3>", 500)
+
+# Alias route so URLs under /analyze/pet/<id> also resolve (compatible with QR payloads that include /analyze)
+@app.route("/analyze/pet/<pet_id>", methods=["GET"])
+def public_pet_page_alias(pet_id):
+    return public_pet_page(pet_id)
+
+
+@app.route("/pet/<pet_id>/7day-health", methods=["GET"])
+def seven_day_health_endpoint(pet_id):
+    """Endpoint removed: return 404 with a short explanation.
+
+    The detailed 7-day forecast endpoint was removed to simplify the
+    API surface. Clients should use the single-date `GET /pet/<id>`
+    route which returns the latest prediction and care tips.
+    """
+    return jsonify({"error": "7-day health forecast endpoint removed", "note": "Use /pet/<id> for current status"}), 404
+
+# ------------------- Missing alert feed -------------------
+MISSING_FEED_DEFAULT_LIMIT = 20
+MISSING_FEED_MAX_LIMIT = 100
+
+
+def _missing_alert_feed_item(entry: dict) -> dict:
+    """Alert details plus the pet and owner ids, for list endpoints."""
+    item = _missing_alert_details(entry)
+    item["pet_id"] = entry["post"].get("pet_id")
+    item["user_id"] = entry["post"].get("user_id")
+    return item
+
+
+def _encode_feed_cursor(entry: dict) -> str:
+    post = entry["post"]
+    raw = json.dumps([str(post.get("created_at") or ""), str(post.get("id"))], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_feed_cursor(cursor: str) -> tuple[str, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, post_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    return str(created_at), str(post_id)
+
+
+@app.route("/missing", methods=["GET"])
+def missing_feed_endpoint():
+    """Active missing-pet alerts, newest first, served from MISSING_ALERT_INDEX.
+
+    Query params: `urgency` (comma-separated, e.g. "critical,high"), `limit` (default 20)
+    and `cursor` (the `next_cursor` of the previous page). Pages are keyed on
+    (created_at, post id), so alerts posted while paging don't shift or repeat rows.
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get("limit", MISSING_FEED_DEFAULT_LIMIT)), 1), MISSING_FEED_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    before = None
+    if args.get("cursor"):
+        try:
+            before = _decode_feed_cursor(args["cursor"])
+        except Exception:
+            return jsonify({"error": "Invalid cursor"}), 400
+    urgencies = [u.strip().lower() for u in (args.get("urgency") or "").split(",") if u.strip()]
+    known_urgencies = {label.lower() for label in URGENCY_LABELS.values()}
+    unknown = [u for u in urgencies if u not in known_urgencies]
+    if unknown:
+        return jsonify({"error": f"Unknown urgency: {', '.join(unknown)}",
+                        "allowed": sorted(known_urgencies)}), 400
+
+    try:
+        MISSING_ALERT_INDEX.refresh_if_due()
+    except Exception as e:
+        print(f"[MISSING-FEED] Index refresh failed: {e}")
+        if MISSING_ALERT_INDEX.last_refresh is None:
+            return jsonify({"error": "Missing alerts are temporarily unavailable"}), 503
+
+    entries, has_more = MISSING_ALERT_INDEX.feed(urgencies, before, limit)
+    return jsonify({
+        "results": [_missing_alert_feed_item(entry) for entry in entries],
+        "next_cursor": _encode_feed_cursor(entries[-1]) if has_more and entries else None,
+        "snapshot_watermark": MISSING_ALERT_INDEX.watermark,
+    })
+
+
+# ------------------- Nearby missing pets -------------------
+MISSING_NEARBY_DEFAULT_RADIUS_KM = 5.0
+MISSING_NEARBY_MAX_RADIUS_KM = float(os.getenv("MISSING_NEARBY_MAX_RADIUS_KM", "100"))
+MISSING_NEARBY_MAX_LIMIT = 100
+
+
+@app.route("/missing/nearby", methods=["GET"])
+def missing_nearby_endpoint():
+    """Active missing-pet alerts near a point or inside a bounding box.
+
+    Query params: either `lat`, `lng` and optional `radius_km` (default 5), or
+    `min_lat`, `min_lng`, `max_lat`, `max_lng`; plus `limit` (default 20) and `offset`.
+    Radius results are sorted nearest first, bounding-box results newest first.
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get("limit", 20)), 1), MISSING_NEARBY_MAX_LIMIT)
+        offset = max(int(args.get("offset", 0)), 0)
+        bbox = [args.get(k) for k in ("min_lat", "min_lng", "max_lat", "max_lng")]
+        if all(v is not None for v in bbox):
+            min_lat, min_lng, max_lat, max_lng = (float(v) for v in bbox)
+            # Comparisons are False for NaN, so this also rejects nan/inf
+            if not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90
+                    and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+                return jsonify({"error": "Bounding box out of range"}), 400
+            if min_lat > max_lat or min_lng > max_lng:
+                return jsonify({"error": "min_lat/min_lng must not exceed max_lat/max_lng"}), 400
+            query = {"min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng}
+            radius_km = None
+        elif args.get("lat") is not None and args.get("lng") is not None:
+            lat, lng = float(args["lat"]), float(args["lng"])
+            radius_km = float(args.get("radius_km", MISSING_NEARBY_DEFAULT_RADIUS_KM))
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                return jsonify({"error": "lat/lng out of range"}), 400
+            if not (0 < radius_km <= MISSING_NEARBY_MAX_RADIUS_KM):
+                return jsonify({"error": f"radius_km must be in (0, {MISSING_NEARBY_MAX_RADIUS_KM:g}]"}), 400
+            query = {"lat": lat, "lng": lng, "radius_km": radius_km}
+        else:
+            return jsonify({"error": "lat and lng, or min_lat, min_lng, max_lat and max_lng, required"}), 400
+    except ValueError:
+        return jsonify({"error": "Query parameters must be numeric"}), 400
+
+    try:
+        MISSING_ALERT_INDEX.refresh_if_due()
+    except Exception as e:
+        print(f"[MISSING-NEARBY] Index refresh failed: {e}")
+        if MISSING_ALERT_INDEX.last_refresh is None:
+            return jsonify({"error": "Missing alerts are temporarily unavailable"}), 503
+
+    if radius_km is None:
+        matches = [(None, entry) for entry in MISSING_ALERT_INDEX.within_bbox(min_lat, min_lng, max_lat, max_lng)]
+    else:
+        matches = MISSING_ALERT_INDEX.nearby(lat, lng, radius_km)
+
+    results = []
+    for distance, entry in matches[offset:offset + limit]:
+        item = _missing_alert_feed_item(entry)
+        if distance is not None:
+            item["distance_km"] = round(distance, 3)
+        results.append(item)
+    next_offset = offset + limit if offset + limit < len(matches) else None
+    return jsonify({
+        "query": query,
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "results": results,
+    })
+
+
+@app.route("/", methods=["GET", "HEAD"])
+def root():
+    return "PetTrackCare API is running.", 200
+
+# ------------------- Daily Scheduler -------------------
+
+NIGHTLY_RESULTS_PATH = os.getenv("NIGHTLY_RESULTS_PATH", os.path.join(BASE_DIR, "data", "nightly_analysis.jsonl"))
+
+
+def fetch_all_pets(columns="id, breed"):
+    """Every pet row, paged so tables past the API's row cap are read in full."""
+    return _fetch_all_pages(lambda: supabase.table("pets").select(columns).order("id", desc=False))
+
+
+def write_nightly_results(results, path=None):
+    """Write per-pet nightly results as JSON lines in one pass, replacing the previous
+    run's file atomically. Returns the number of pets written."""
+    path = path or NIGHTLY_RESULTS_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    written = 0
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        for pet_id, result in results.items():
+            if isinstance(result, Exception):
+                record = {"pet_id": pet_id, "error": str(result)}
+            else:
+                record = result
+            fh.write(json.dumps(record, default=str) + "\n")
+            written += 1
+    os.replace(tmp_path, path)
+    return written
+
+
+# The nightly run is split into chunks of pets analyzed on a process pool. Finished pet
+# ids are checkpointed to NIGHTLY_PROGRESS_PATH, so a crashed run resumes where it stopped.
+NIGHTLY_WORKERS = int(os.getenv("NIGHTLY_WORKERS", str(os.cpu_count() or 1)))
+NIGHTLY_CHUNK_SIZE = int(os.getenv("NIGHTLY_CHUNK_SIZE", "500"))
+NIGHTLY_PROGRESS_PATH = os.getenv("NIGHTLY_PROGRESS_PATH", os.path.join(BASE_DIR, "data", "nightly_progress.json"))
+NIGHTLY_MP_START_METHOD = os.getenv(
+    "NIGHTLY_MP_START_METHOD", "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def _load_nightly_progress(run_id, path):
+    """The checkpoint of an unfinished run with this run_id, or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            progress = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[NIGHTLY] ⚠ Ignoring unreadable progress file {path}: {e}")
+        return None
+    if progress.get("run_id") != run_id:
+        print(f"[NIGHTLY] Discarding progress of run {progress.get('run_id')}")
+        return None
+    return progress
+
+
+def _save_nightly_progress(progress, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(progress, fh)
+    os.replace(tmp_path, path)
+
+
+def _analyze_nightly_chunk(index, pet_ids, logs, breeds):
+    """Process-pool work unit: analyze one chunk of pets and return its records and timing."""
+    started = time.perf_counter()
+    results = analyze_pets_frame(logs, pet_ids, breeds)
+    watermarks = analysis_input_watermarks(logs, pet_ids, breeds)
+    records = [{"pet_id": pet_id, "error": str(result)} if isinstance(result, Exception)
+               else dict(result, input_watermark=watermarks[pet_id])
+               for pet_id, result in results.items()]
+    return {
+        "index": index,
+        "pets": len(pet_ids),
+        "logs": len(logs),
+        "seconds": round(time.perf_counter() - started, 3),
+        "pid": os.getpid(),
+        "records": records,
+    }
+
+
+# With several instances each scheduler runs the nightly job, so pets are hash-partitioned
+# into NIGHTLY_SHARD_COUNT shards and every run claims whole shards through a lease table.
+# The SQLite file stands in for a shared table: instances must share NIGHTLY_LEASE_DB.
+NIGHTLY_SHARD_COUNT = int(os.getenv("NIGHTLY_SHARD_COUNT", "1"))
+NIGHTLY_SHARD_INDEX = int(os.getenv("NIGHTLY_SHARD_INDEX")) if os.getenv("NIGHTLY_SHARD_INDEX") else None
+NIGHTLY_LEASE_DB = os.getenv("NIGHTLY_LEASE_DB", os.path.join(BASE_DIR, "data", "nightly_leases.sqlite3"))
+NIGHTLY_LEASE_TTL_SECONDS = int(os.getenv("NIGHTLY_LEASE_TTL_SECONDS", str(6 * 3600)))
+# Lease row for the run's illness model retrain, which reads every pet's logs and so
+# belongs to no analysis shard
+NIGHTLY_TRAIN_SHARD = -1
+
+
+def process_worker_id():
+    """host:pid of this process (computed per call, so forked workers report their own pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def nightly_shard_of(pet_id, shard_count):
+    """Stable shard of a pet id (Python's hash() is salted per process)."""
+    digest = hashlib.md5(str(pet_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def _nightly_shard_path(path, shard_index, shard_count):
+    if shard_count <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard_index}of{shard_count}{ext}"
+
+
+def _lease_connection(path=None):
+    path = path or NIGHTLY_LEASE_DB
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS nightly_shard_leases (
+            run_id TEXT NOT NULL,
+            shard_count INTEGER NOT NULL,
+            shard_index INTEGER NOT NULL,
+            owner TEXT NOT NULL,
+            claimed_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            completed_at REAL,
+            summary TEXT,
+            PRIMARY KEY (run_id, shard_count, shard_index)
+        )""")
+    return conn
+
+
+def claim_nightly_shard(run_id, shard_count, shard_index=None, owner=None, lease_path=None):
+    """Claim a shard of this run: `shard_index` if given, else the first shard that is
+    neither completed nor held by a live lease. Expired leases (a crashed owner) are
+    taken over. Returns the claimed shard index or None."""
+    owner = owner or process_worker_id()
+    now = time.time()
+    candidates = [shard_index] if shard_index is not None else range(shard_count)
+    conn = _lease_connection(lease_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        leases = {row[0]: row[1:] for row in conn.execute(
+            "SELECT shard_index, owner, expires_at, completed_at FROM nightly_shard_leases "
+            "WHERE run_id = ? AND shard_count = ?", (run_id, shard_count))}
+        for index in candidates:
+            lease = leases.get(index)
+            if lease is not None and (lease[2] is not None or (lease[1] > now and lease[0] != owner)):
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO nightly_shard_leases "
+                "(run_id, shard_count, shard_index, owner, claimed_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, shard_count, index, owner, now, now + NIGHTLY_LEASE_TTL_SECONDS))
+            conn.execute("COMMIT")
+            return index
+        conn.execute("COMMIT")
+        return None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def complete_nightly_shard(run_id, shard_count, shard_index, summary, lease_path=None):
+    conn = _lease_connection(lease_path)
+    try:
+        conn.execute(
+            "UPDATE nightly_shard_leases SET completed_at = ?, summary = ? "
+            "WHERE run_id = ? AND shard_count = ? AND shard_index = ?",
+            (time.time(), json.dumps(summary, default=str), run_id, shard_count, shard_index))
+    finally:
+        conn.close()
+
+
+def nightly_shard_leases(run_id, lease_path=None):
+    """Lease rows of a run, for checking which shards are claimed or done."""
+    conn = _lease_connection(lease_path)
+    try:
+        rows = conn.execute(
+            "SELECT shard_count, shard_index, owner, claimed_at, expires_at, completed_at "
+            "FROM nightly_shard_leases WHERE run_id = ? ORDER BY shard_count, shard_index", (run_id,)).fetchall()
+    finally:
+        conn.close()
+    keys = ("shard_count", "shard_index", "owner", "claimed_at", "expires_at", "completed_at")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def daily_analysis_job(workers=None, chunk_size=None, progress_path=None, results_path=None,
+                       shard_index=None, shard_count=None):
+    """Nightly analysis of every pet, or of this instance's shards of them.
+
+    With shard_count > 1 the run keeps claiming shards from the lease table (only
+    `shard_index` when given) until none are left, so each extra instance takes a share
+    of the pets instead of repeating them. The illness model is retrained once per run,
+    on every pet's logs, by whichever instance claims the training lease first; the
+    analysis shards never retrain. Returns the summary of each shard it ran.
+    """
+    shard_count = shard_count or NIGHTLY_SHARD_COUNT
+    shard_index = NIGHTLY_SHARD_INDEX if shard_index is None else shard_index
+    run_id = date.today().isoformat()
+    print(f"🔄 Running daily pet behavior analysis at {datetime.now()}")
+    if shard_count <= 1:
+        return _run_nightly_shard(run_id, 0, 1, True, workers, chunk_size, progress_path, results_path)
+
+    _run_nightly_training(run_id, shard_count)
+    summaries = []
+    while True:
+        claimed = claim_nightly_shard(run_id, shard_count, shard_index)
+        if claimed is None:
+            break
+        print(f"[NIGHTLY] Claimed shard {claimed + 1}/{shard_count} of run {run_id}")
+        summary = _run_nightly_shard(run_id, claimed, shard_count, False,
+                                     workers, chunk_size, progress_path, results_path)
+        summaries.append(summary)
+        if not summary["complete"]:
+            break  # the lease expires and another run resumes the shard from its checkpoint
+        complete_nightly_shard(run_id, shard_count, claimed, summary)
+        if shard_index is not None:
+            break
+    if not summaries:
+        print(f"[NIGHTLY] No unclaimed shards left for run {run_id}")
+    return {"run_id": run_id, "shard_count": shard_count, "shards": summaries}
+
+
+def _run_nightly_training(run_id, shard_count, lease_path=None):
+    """Retrain the illness model on all recent logs if this run's training lease is free.
+
+    A failed retrain leaves the lease to expire, so a later run of the day retries it.
+    """
+    if claim_nightly_shard(run_id, shard_count, NIGHTLY_TRAIN_SHARD, lease_path=lease_path) is None:
+        return False
+    print(f"[NIGHTLY] Claimed the model retrain of run {run_id}")
+    started = time.perf_counter()
+    try:
+        logs = fetch_logs_bulk()
+        if not logs.empty:
+            train_illness_model(logs)  # retrain and persist illness model
+    except Exception as e:
+        print(f"[NIGHTLY] Model retrain failed: {e}")
+        return False
+    seconds = round(time.perf_counter() - started, 3)
+    complete_nightly_shard(run_id, shard_count, NIGHTLY_TRAIN_SHARD, {"logs": len(logs), "seconds": seconds},
+                           lease_path=lease_path)
+    print(f"[NIGHTLY] Retrained the illness model on {len(logs)} logs in {seconds}s")
+    return True
+
+
+def _run_nightly_shard(run_id, shard_index, shard_count, train, workers, chunk_size, progress_path, results_path):
+    """Analyze the pets of one shard (every pet when shard_count is 1).
+
+    The shard's recent logs are loaded as one frame and, when `train` is set, the
+    illness model is retrained once on it. Pets are then split into chunks analyzed
+    with the groupby engine (analyze_pets_frame()) on a pool of `workers` processes.
+    Each finished chunk is appended to a partial results file and its pet ids
+    checkpointed, so re-running after a crash the same day skips finished pets (and
+    the retrain). When every chunk is done the results are written in bulk.
+    """
+    workers = workers or NIGHTLY_WORKERS
+    chunk_size = chunk_size or NIGHTLY_CHUNK_SIZE
+    progress_path = _nightly_shard_path(progress_path or NIGHTLY_PROGRESS_PATH, shard_index, shard_count)
+    results_path = _nightly_shard_path(results_path or NIGHTLY_RESULTS_PATH, shard_index, shard_count)
+    partial_path = f"{results_path}.partial"
+
+    started = time.perf_counter()
+    progress = _load_nightly_progress(run_id, progress_path)
+    if progress is None:
+        progress = {"run_id": run_id, "model_trained": False, "completed": []}
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    else:
+        print(f"[NIGHTLY] Resuming run {run_id}: {len(progress['completed'])} pets already done")
+    completed = set(progress["completed"])
+
+    pets = fetch_all_pets()
+    if shard_count > 1:
+        pets = [pet for pet in pets if nightly_shard_of(pet["id"], shard_count) == shard_index]
+        logs = fetch_logs_bulk([pet["id"] for pet in pets]) if pets else fetch_logs_bulk([])
+    else:
+        logs = fetch_logs_bulk()
+    fetched = time.perf_counter()
+    print(f"[NIGHTLY] Loaded {len(pets)} pets and {len(logs)} logs in {fetched - started:.2f}s")
+
+    if not progress["model_trained"]:
+        if train and not logs.empty:
+            train_illness_model(logs)  # retrain and persist illness model
+        progress["model_trained"] = True
+        _save_nightly_progress(progress, progress_path)
+    trained = time.perf_counter()
+
+    breeds = {str(pet["id"]): pet.get("breed") for pet in pets}
+    remaining = [pet_id for pet_id in breeds if pet_id not in completed]
+    chunks = [remaining[i:i + chunk_size] for i in range(0, len(remaining), chunk_size)]
+    chunk_of = {pet_id: index for index, chunk in enumerate(chunks) for pet_id in chunk}
+    chunk_logs = dict(iter(logs.groupby(logs['pet_id'].map(chunk_of)))) if not logs.empty else {}
+    no_logs = logs.iloc[0:0]
+
+    timings, failed_chunks = [], 0
+    report_job_progress(0, len(remaining))
+
+    def _record(timing):
+        records = timing.pop("records")
+        with open(partial_path, "a", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, default=str) + "\n")
+        store_pet_snapshots([{"pet_id": record["pet_id"], "watermark": record["input_watermark"],
+                              "summary": _snapshot_summary(record)}
+                             for record in records if "input_watermark" in record], source="nightly")
+        progress["completed"].extend(chunks[timing["index"]])
+        _save_nightly_progress(progress, progress_path)
+        report_job_progress(len(progress["completed"]) - len(completed), len(remaining))
+        timings.append(timing)
+        print(f"[NIGHTLY] Chunk {timing['index'] + 1}/{len(chunks)}: {timing['pets']} pets, "
+              f"{timing['logs']} logs in {timing['seconds']}s (pid {timing['pid']})")
+
+    def _work(index):
+        return (index, chunks[index], chunk_logs.get(index, no_logs),
+                {pet_id: breeds[pet_id] for pet_id in chunks[index]})
+
+    if workers <= 1 or len(chunks) <= 1:
+        for index in range(len(chunks)):
+            _record(_analyze_nightly_chunk(*_work(index)))
+    else:
+        context = multiprocessing.get_context(NIGHTLY_MP_START_METHOD)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+            futures = {pool.submit(_analyze_nightly_chunk, *_work(index)): index for index in range(len(chunks))}
+            for future in as_completed(futures):
+                try:
+                    _record(future.result())
+                except Exception as e:
+                    failed_chunks += 1
+                    print(f"[NIGHTLY] ⚠ Chunk {futures[future] + 1} failed: {e}")
+    analyzed = time.perf_counter()
+
+    summary = {
+        "run_id": run_id,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "pets": len(breeds),
+        "resumed_pets": len(completed),
+        "logs": len(logs),
+        "workers": workers,
+        "chunks": len(chunks),
+        "failed_chunks": failed_chunks,
+        "fetch_seconds": round(fetched - started, 3),
+        "train_seconds": round(trained - fetched, 3),
+        "analysis_seconds": round(analyzed - trained, 3),
+        "chunk_timings": sorted(timings, key=lambda timing: timing["index"]),
+    }
+    analyzed_logs = sum(timing["logs"] for timing in timings)
+    summary["rows_per_second"] = round(analyzed_logs / (analyzed - trained)) if analyzed > trained else None
+    if failed_chunks:
+        print(f"[NIGHTLY] ⚠ {failed_chunks} chunk(s) failed; progress kept in {progress_path} for a resume")
+        summary["complete"] = False
+        return summary
+
+    # Later records win, so pets re-run after a crash between append and checkpoint are not duplicated
+    results = {}
+    if os.path.exists(partial_path):
+        with open(partial_path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                record = json.loads(line)
+                results[record["pet_id"]] = record
+    written = write_nightly_results(results, results_path)
+    for path in (partial_path, progress_path):
+        if os.path.exists(path):
+            os.remove(path)
+    finished = time.perf_counter()
+    summary.update({"complete": True, "written": written,
+                    "write_seconds": round(finished - analyzed, 3), "total_seconds": round(finished - started, 3)})
+    chunk_seconds = [timing["seconds"] for timing in timings]
+    print(f"[NIGHTLY] Shard {shard_index + 1}/{shard_count}: analyzed {len(remaining)} pets in {len(chunks)} chunks "
+          f"on {workers} workers (chunk min/max {min(chunk_seconds, default=0)}s/{max(chunk_seconds, default=0)}s); "
+          f"{summary['rows_per_second']} log rows/sec, {summary['total_seconds']}s total")
+    return summary
+
+
+# ------------------- Job registry -------------------
+# Every background job (task worker runs, per-pet model retrains) is recorded in a SQLite
+# registry shared by the processes of an instance: its type, state, progress, timings and
+# last error. Admission is limited per job type; live jobs heartbeat, and one that stops
+# heartbeating for JOB_HEARTBEAT_TIMEOUT_SECONDS is marked abandoned so it no longer counts.
+JOB_REGISTRY_DB = os.getenv("JOB_REGISTRY_DB", os.path.join(BASE_DIR, "data", "jobs.sqlite3"))
+JOB_TYPE_LIMITS = {
+    job_type.strip(): int(limit)
+    for job_type, _, limit in (item.partition("=") for item in
+                               os.getenv("JOB_TYPE_LIMITS", "daily_analysis=1,migrate=1,pet_model_training=2,train_model=1,test_accuracy=1").split(","))
+    if job_type.strip() and limit.strip()
+}
+JOB_DEFAULT_LIMIT = int(os.getenv("JOB_DEFAULT_LIMIT", "1"))
+JOB_HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("JOB_HEARTBEAT_TIMEOUT_SECONDS", "300"))
+JOB_HISTORY_MAX_ENTRIES = int(os.getenv("JOB_HISTORY_MAX_ENTRIES", "500"))
+_JOB_COLUMNS = ("id", "type", "state", "owner", "worker_pid", "progress_done", "progress_total",
+                "queued_at", "started_at", "finished_at", "heartbeat_at", "duration_seconds",
+                "last_error", "result", "details")
+_JOB_LIVE_STATES = ("queued", "running")
+
+
+class JobRegistry:
+    """Persistent registry of background jobs (see the section comment)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                worker_pid INTEGER,
+                progress_done INTEGER,
+                progress_total INTEGER,
+                queued_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                heartbeat_at REAL NOT NULL,
+                duration_seconds REAL,
+                last_error TEXT,
+                result TEXT,
+                details TEXT
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_type_state ON jobs (type, state)")
+        return conn
+
+    def _execute(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+    def admit(self, job_type, details=None, worker_pid=None):
+        """Register a queued job and return its id, or None when JOB_TYPE_LIMITS[job_type]
+        jobs of that type are already queued or running."""
+        limit = JOB_TYPE_LIMITS.get(job_type, JOB_DEFAULT_LIMIT)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET state = 'abandoned', finished_at = ?, last_error = 'no heartbeat' "
+                "WHERE type = ? AND state IN ('queued', 'running') AND heartbeat_at < ?",
+                (datetime.now(timezone.utc).isoformat(), job_type, now - JOB_HEARTBEAT_TIMEOUT_SECONDS))
+            (live,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE type = ? AND state IN ('queued', 'running')",
+                                   (job_type,)).fetchone()
+            if live >= limit:
+                conn.execute("COMMIT")
+                return None
+            job_id = f"{job_type}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+            conn.execute(
+                "INSERT INTO jobs (id, type, state, owner, worker_pid, queued_at, heartbeat_at, details) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, job_type, process_worker_id(), worker_pid, datetime.now(timezone.utc).isoformat(), now,
+                 json.dumps(details, default=str) if details is not None else None))
+            conn.execute(
+                "DELETE FROM jobs WHERE state NOT IN ('queued', 'running') AND id NOT IN "
+                "(SELECT id FROM jobs ORDER BY queued_at DESC LIMIT ?)", (JOB_HISTORY_MAX_ENTRIES,))
+            conn.execute("COMMIT")
+            return job_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def start(self, job_id):
+        self._execute("UPDATE jobs SET state = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?",
+                      (datetime.now(timezone.utc).isoformat(), time.time(), job_id))
+
+    def progress(self, job_id, done, total=None):
+        """Update a job's progress counters; also counts as a heartbeat."""
+        self._execute("UPDATE jobs SET progress_done = ?, progress_total = COALESCE(?, progress_total), "
+                      "heartbeat_at = ? WHERE id = ?", (done, total, time.time(), job_id))
+
+    def heartbeat(self, worker_pid):
+        """Heartbeat the live jobs of one task worker process."""
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE worker_pid = ? AND state IN ('queued', 'running')",
+                      (time.time(), worker_pid))
+
+    def finish(self, job_id, state, duration=None, error=None, result=None):
+        self._execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, duration_seconds = COALESCE(?, duration_seconds), "
+            "last_error = ?, result = ? WHERE id = ?",
+            (state, datetime.now(timezone.utc).isoformat(), round(duration, 3) if duration is not None else None,
+             error, json.dumps(result, default=str) if result is not None else None, job_id))
+
+    def crash_worker_jobs(self, worker_pid, exitcode):
+        """Mark the live jobs of a dead task worker process crashed. Returns how many."""
+        return self._execute(
+            "UPDATE jobs SET state = 'crashed', finished_at = ?, last_error = ? "
+            "WHERE worker_pid = ? AND state IN ('queued', 'running')",
+            (datetime.now(timezone.utc).isoformat(), f"worker exited with code {exitcode}", worker_pid))
+
+    def _row(self, row):
+        job = dict(zip(_JOB_COLUMNS, row))
+        for key in ("result", "details"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        job["heartbeat_at"] = datetime.fromtimestamp(job["heartbeat_at"], timezone.utc).isoformat()
+        return job
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row(row) if row else None
+
+    def list(self, job_type=None, state=None, limit=50):
+        """Jobs newest first, optionally filtered by type and state."""
+        clauses, params = [], []
+        if job_type:
+            clauses.append("type = ?")
+            params.append(job_type)
+        if state:
+            clauses.append("state = ?")
+            params.append(state)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs {where} ORDER BY queued_at DESC LIMIT ?",
+                                (*params, limit)).fetchall()
+        finally:
+            conn.close()
+        return [self._row(row) for row in rows]
+
+    def live_counts(self):
+        """{job_type: queued or running jobs} for the types that have any."""
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT type, COUNT(*) FROM jobs WHERE state IN ('queued', 'running') "
+                                     "GROUP BY type").fetchall())
+        finally:
+            conn.close()
+
+
+JOB_REGISTRY = JobRegistry(JOB_REGISTRY_DB)
+CURRENT_JOB_ID = None  # job being run by this task worker process, for progress reports
+
+
+def report_job_progress(done, total=None):
+    """Record progress of the current task worker job; a no-op outside the worker."""
+    if CURRENT_JOB_ID is None:
+        return
+    try:
+        JOB_REGISTRY.progress(CURRENT_JOB_ID, done, total)
+    except Exception as e:
+        print(f"[JOBS] ⚠ Could not record progress of {CURRENT_JOB_ID}: {e}")
+
+
+# ------------------- Task worker -------------------
+
+def run_task(task_name, **kwargs):
+    """Run a named background task in this process (see enqueue_task() and --task)."""
+    task = task_name.lower()
+    if task == "daily_analysis":
+        return daily_analysis_job(**kwargs)
+    if task in ("migrate", "migrate_behavior_logs_to_predictions"):
+        return migrate_behavior_logs_to_predictions()
+    if task in ("backfill_sleep", "backfill_future_sleep_forecasts"):
+        return backfill_future_sleep_forecasts()
+    if task in ("migrate_legacy_sleep_forecasts", "migrate_sleep_forecasts"):
+        return migrate_legacy_sleep_forecasts()
+    if task == "train_model":
+        return train_models(**kwargs)
+    if task == "test_accuracy":
+        return evaluate_illness_model(**kwargs)
+    raise ValueError(f"Unknown task: {task_name}")
+
+
+# Scheduled tasks run in one long-lived worker process fed over a local queue, so pandas,
+# sklearn, the Supabase client and the module's caches are loaded once rather than per
+# task. The worker is started with ANALYZE_TASK_WORKER set, which skips the model cleanup
+# at import that would otherwise delete the models the web workers are serving.
+TASK_WORKER_START_METHOD = os.getenv(
+    "TASK_WORKER_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+TASK_WORKER_HEARTBEAT_SECONDS = float(os.getenv("TASK_WORKER_HEARTBEAT_SECONDS", "30"))
+
+
+def _task_worker_main(tasks, nice=0):
+    """Task worker loop: run each (job_id, task_name, kwargs) from `tasks` in turn,
+    recording its state, duration and exit state in the job registry. None stops it.
+    A positive `nice` lowers the process's CPU priority below the web workers'."""
+    global CURRENT_JOB_ID
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        job_id, task_name, kwargs = item
+        JOB_REGISTRY.start(job_id)
+        CURRENT_JOB_ID = job_id
+        started = time.perf_counter()
+        try:
+            result = run_task(task_name, **kwargs)
+            JOB_REGISTRY.finish(job_id, "succeeded", duration=time.perf_counter() - started,
+                                result=result if isinstance(result, (dict, list, str, int, float)) else None)
+        except Exception as e:
+            traceback.print_exc()
+            JOB_REGISTRY.finish(job_id, "failed", duration=time.perf_counter() - started,
+                                error=f"{type(e).__name__}: {e}")
+        finally:
+            CURRENT_JOB_ID = None
+
+
+class TaskWorker:
+    """Parent-side handle of the task worker process.
+
+    submit() admits the task through the job registry, which refuses it while the
+    task's admission limit (1 by default, so no overlapping runs) is taken, and
+    (re)starts the worker if it is not alive. A watcher thread heartbeats the worker's
+    jobs and marks them crashed if the process dies mid-run.
+    """
+
+    def __init__(self, start_method=None, name="analyze-task-worker", nice=0):
+        self.start_method = start_method or TASK_WORKER_START_METHOD
+        self.name = name
+        self.nice = nice
+        self.lock = threading.Lock()
+        self.process = None
+        self.tasks = None
+
+    def _ensure_started(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        context = multiprocessing.get_context(self.start_method)
+        self.tasks = context.Queue()
+        os.environ["ANALYZE_TASK_WORKER"] = "1"
+        try:
+            self.process = context.Process(target=_task_worker_main, args=(self.tasks, self.nice),
+                                           name=self.name, daemon=True)
+            self.process.start()
+        finally:
+            os.environ.pop("ANALYZE_TASK_WORKER", None)
+        threading.Thread(target=self._watch, args=(self.process,), daemon=True).start()
+        print(f"[TASKS] Started {self.name} pid {self.process.pid} ({self.start_method})")
+
+    def submit(self, task_name, **kwargs):
+        """Queue a task run and return its job id, or None if it was not admitted."""
+        with self.lock:
+            self._ensure_started()
+            job_id = JOB_REGISTRY.admit(task_name, details=kwargs or None, worker_pid=self.process.pid)
+            if job_id is None:
+                print(f"[TASKS] Refusing '{task_name}': admission limit reached (a run is still in flight)")
+                return None
+            self.tasks.put((job_id, task_name, kwargs))
+        return job_id
+
+    def _watch(self, process):
+        while True:
+            process.join(TASK_WORKER_HEARTBEAT_SECONDS)
+            try:
+                if process.is_alive():
+                    JOB_REGISTRY.heartbeat(process.pid)
+                    continue
+                crashed = JOB_REGISTRY.crash_worker_jobs(process.pid, process.exitcode)
+                if crashed:
+                    print(f"[TASKS] ⚠ Task worker pid {process.pid} exited with code {process.exitcode}; "
+                          f"{crashed} job(s) marked crashed")
+                return
+            except Exception as e:
+                print(f"[TASKS] ⚠ Task worker watcher error: {e}")
+                if not process.is_alive():
+                    return
+
+    def stop(self, timeout=10):
+        with self.lock:
+            if self.process is None or not self.process.is_alive():
+                return
+            self.tasks.put(None)
+            process = self.process
+        process.join(timeout)
+
+
+TASK_WORKER = TaskWorker()
+
+
+def enqueue_task(task_name: str, **kwargs):
+    """Hand a named task to the persistent task worker process.
+
+    Keeps heavy CPU / I/O work out of the Flask worker process. Returns the job id, or
+    None when the task was not admitted (a run is already in flight) or could not be queued.
+    """
+    try:
+        job_id = TASK_WORKER.submit(task_name, **kwargs)
+        if job_id:
+            print(f"[INFO] Enqueued task '{task_name}' as job {job_id}")
+        return job_id
+    except Exception as e:
+        print(f"[ERROR] Failed to enqueue task {task_name}: {e}")
+        return None
+
+
+# /train and /test_accuracy retrain models, which used to hold a web worker (and its CPU)
+# away from /analyze and QR pages for as long as that took. They run as jobs on their own
+# worker process instead, admitted against their JOB_TYPE_LIMITS, and a request waits for
+# its job only up to the inline budget of HEAVY_ENDPOINT_WAIT_SECONDS.
+HEAVY_ENDPOINT_WAIT_SECONDS = float(os.getenv("HEAVY_ENDPOINT_WAIT_SECONDS", "2"))
+HEAVY_ENDPOINT_RETRY_AFTER_SECONDS = int(os.getenv("HEAVY_ENDPOINT_RETRY_AFTER_SECONDS", "30"))
+# Training yields the CPU to request handling when they compete for it
+HEAVY_TASK_WORKER_NICE = int(os.getenv("HEAVY_TASK_WORKER_NICE", "10"))
+HEAVY_TASK_WORKER = TaskWorker(name="analyze-heavy-worker", nice=HEAVY_TASK_WORKER_NICE)
+
+
+def _wait_for_job(job_id, timeout):
+    """The job's registry entry once it leaves queued/running, or its latest entry after
+    `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = JOB_REGISTRY.get(job_id)
+        if job is None or job["state"] not in _JOB_LIVE_STATES or time.monotonic() >= deadline:
+            return job
+        time.sleep(0.2)
+
+
+def _job_accepted(job_id, status):
+    response = jsonify({"status": status, "job_id": job_id, "job_url": f"/jobs/{job_id}"})
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response
+
+
+def run_heavy_endpoint(task_name, params, wait, on_error):
+    """Serve a heavy endpoint through a `task_name` job on HEAVY_TASK_WORKER.
+
+    200 with the job's payload if it finishes within `wait` seconds, as when the work ran
+    inline; otherwise 202 with the job id to poll at /jobs/<id>. A failed job is answered
+    with on_error(message) -> (payload, status). While the endpoint's concurrency limit is
+    taken, a request identical to a live job gets 202 with that job's id, others get 429.
+    A job that can't be submitted (worker or registry down) is answered with on_error too.
+    """
+    try:
+        job_id = HEAVY_TASK_WORKER.submit(task_name, **params)
+    except Exception as e:
+        print(f"[ERROR] Failed to submit task {task_name}: {e}")
+        payload, status = on_error(str(e))
+        return jsonify(payload), status
+    if job_id is None:
+        live = [job for job in JOB_REGISTRY.list(job_type=task_name, limit=20) if job["state"] in _JOB_LIVE_STATES]
+        same = next((job for job in live if (job["details"] or {}) == params), None)
+        if same is not None:
+            return _job_accepted(same["id"], "already_running")
+        response = jsonify({"error": f"{task_name} is at its concurrency limit, try again later",
+                            "live_jobs": [job["id"] for job in live]})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(HEAVY_ENDPOINT_RETRY_AFTER_SECONDS)
+        return response
+    job = _wait_for_job(job_id, wait)
+    if job is None or job["state"] in _JOB_LIVE_STATES:
+        return _job_accepted(job_id, "accepted")
+    if job["state"] == "succeeded":
+        return jsonify(job["result"]), 200
+    payload, status = on_error(job["last_error"] or job["state"])
+    return jsonify(payload), status
+
+
+@app.route("/jobs", methods=["GET"])
+def jobs_endpoint():
+    """Background jobs newest first (filters: type, state, limit), with the live count and
+    admission limit per type and each type's latest job."""
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    job_type = request.args.get("type")
+    jobs = JOB_REGISTRY.list(job_type=job_type, state=request.args.get("state"), limit=limit)
+    live = JOB_REGISTRY.live_counts()
+    types = sorted(set(JOB_TYPE_LIMITS) | set(live) | ({job_type} if job_type else set()))
+    summary = {}
+    for name in types:
+        latest = JOB_REGISTRY.list(job_type=name, limit=1)
+        summary[name] = {
+            "live": live.get(name, 0),
+            "limit": JOB_TYPE_LIMITS.get(name, JOB_DEFAULT_LIMIT),
+            "latest": latest[0] if latest else None,
+        }
+    return jsonify({"jobs": jobs, "types": summary})
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_endpoint(job_id):
+    job = JOB_REGISTRY.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+# ------------------- Task scheduler -------------------
+# Every process serving the app runs the scheduler (gunicorn workers start it on their
+# first request), but a trigger only enqueues work in the leader: the process holding an
+# exclusive lock on SCHEDULER_LOCK_PATH. The OS drops the lock when its holder exits and
+# the next worker to see a trigger takes over. Across instances, the nightly shard leases
+# keep the work itself from being repeated.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", os.path.join(BASE_DIR, "data", "scheduler.lock"))
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Asia/Manila")
+SCHEDULER_NIGHTLY_HOUR = int(os.getenv("SCHEDULER_NIGHTLY_HOUR", "2"))
+SCHEDULER_NIGHTLY_MINUTE = int(os.getenv("SCHEDULER_NIGHTLY_MINUTE", "0"))
+SCHEDULER_JITTER_SECONDS = int(os.getenv("SCHEDULER_JITTER_SECONDS", "300"))
+SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "3600"))
+SCHEDULED_TASKS = ("daily_analysis", "migrate")
+
+SCHEDULER_STATE_LOCK = threading.Lock()
+SCHEDULER_METRICS = {}  # job id -> fire / skip / miss counters and trigger lag
+_scheduler = None
+_scheduler_leader_file = None
+
+
+def _scheduler_metrics(job_id):
+    return SCHEDULER_METRICS.setdefault(job_id, {
+        "fired": 0, "skipped_follower": 0, "missed": 0, "enqueue_refused": 0,
+        "last_scheduled_at": None, "last_fired_at": None, "last_lag_seconds": None, "max_lag_seconds": None,
+    })
+
+
+def is_scheduler_leader():
+    """Take or confirm scheduler leadership; True while this process holds the lock."""
+    global _scheduler_leader_file
+    with SCHEDULER_STATE_LOCK:
+        if _scheduler_leader_file is not None or fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(SCHEDULER_LOCK_PATH), exist_ok=True)
+        lock_file = open(SCHEDULER_LOCK_PATH, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{process_worker_id()}\n")
+        lock_file.flush()
+        _scheduler_leader_file = lock_file
+    print(f"[SCHEDULER] {process_worker_id()} is now the scheduler leader")
+    return True
+
+
+def _fire_scheduled_task(task_name):
+    if not is_scheduler_leader():
+        with SCHEDULER_STATE_LOCK:
+            _scheduler_metrics(task_name)["skipped_follower"] += 1
+        return
+    job_id = enqueue_task(task_name)
+    with SCHEDULER_STATE_LOCK:
+        metrics = _scheduler_metrics(task_name)
+        metrics["fired"] += 1
+        metrics["last_fired_at"] = datetime.now(timezone.utc).isoformat()
+        if job_id is None:
+            metrics["enqueue_refused"] += 1
+
+
+def _on_scheduler_event(event):
+    """Trigger lag (submission time minus scheduled time) and misfire counters."""
+    from apscheduler.events import EVENT_JOB_MISSED
+
+    scheduled = (event.scheduled_run_times[-1] if getattr(event, "scheduled_run_times", None)
+                 else getattr(event, "scheduled_run_time", None))
+    with SCHEDULER_STATE_LOCK:
+        metrics = _scheduler_metrics(event.job_id)
+        if scheduled is not None:
+            metrics["last_scheduled_at"] = scheduled.isoformat()
+        if event.code == EVENT_JOB_MISSED:
+            metrics["missed"] += 1
+            print(f"[SCHEDULER] ⚠ {event.job_id} missed its {scheduled} run (past the misfire grace time)")
+        elif scheduled is not None:
+            lag = round((datetime.now(timezone.utc) - scheduled).total_seconds(), 3)
+            metrics["last_lag_seconds"] = lag
+            metrics["max_lag_seconds"] = max(lag, metrics["max_lag_seconds"] or 0)
+
+
+def start_scheduler():
+    """Schedule light-weight triggers that enqueue heavy work on the task worker.
+
+    Each task runs daily at SCHEDULER_NIGHTLY_HOUR:MINUTE with up to
+    SCHEDULER_JITTER_SECONDS of jitter. Runs missed by less than the grace time (e.g.
+    across a worker restart) still fire, and a backlog of missed runs coalesces into one.
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED
+
+    scheduler = BackgroundScheduler(timezone=ZoneInfo(SCHEDULER_TIMEZONE), job_defaults={
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": SCHEDULER_MISFIRE_GRACE_SECONDS,
+    })
+    for task_name in SCHEDULED_TASKS:
+        scheduler.add_job(_fire_scheduled_task, CronTrigger(
+            hour=SCHEDULER_NIGHTLY_HOUR, minute=SCHEDULER_NIGHTLY_MINUTE,
+            jitter=SCHEDULER_JITTER_SECONDS, timezone=ZoneInfo(SCHEDULER_TIMEZONE),
+        ), args=[task_name], id=task_name, replace_existing=True)
+    scheduler.add_listener(_on_scheduler_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+    scheduler.start()
+    return scheduler
+
+
+def ensure_scheduler_started():
+    """Start this process's scheduler once; a no-op when disabled or inside the task worker."""
+    global _scheduler
+    if not SCHEDULER_ENABLED or os.getenv("ANALYZE_TASK_WORKER"):
+        return None
+    with SCHEDULER_STATE_LOCK:
+        if _scheduler is not None:
+            return _scheduler
+        _scheduler = start_scheduler()
+    is_scheduler_leader()
+    return _scheduler
+
+
+@app.route("/scheduler", methods=["GET"])
+def scheduler_status_endpoint():
+    """Leadership, next run times and trigger metrics of this process's scheduler."""
+    with SCHEDULER_STATE_LOCK:
+        metrics = {job_id: dict(values) for job_id, values in SCHEDULER_METRICS.items()}
+        leader = _scheduler_leader_file is not None or fcntl is None
+    jobs = []
+    if _scheduler is not None:
+        for job in _scheduler.get_jobs():
+            jobs.append({"id": job.id, "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None,
+                         "metrics": metrics.get(job.id)})
+    return jsonify({"worker": process_worker_id(), "running": _scheduler is not None, "leader": leader, "jobs": jobs})
+
+
+# Removed: backfill_future_sleep_forecasts() - predictions table deprecated
+# Removed: migrate_legacy_sleep_forecasts() - predictions table deprecated  
+# Removed: store_prediction() - predictions table deprecated
+
+def analyze_illness_duration_and_patterns(df):
+    """
+    Analyze illness duration, persistence, and historical patterns.
+    
+    Returns dict with:
+    - illness_duration_days: How long unhealthy pattern has persisted
+    - is_persistent: Whether illness lasted >7 days
+    - pattern_type: 'acute', 'chronic', 'cyclical', 'improving', 'worsening'
+    - sudden_changes: List of sudden health changes detected
+    - recovery_history: Whether pet has recovered before from similar patterns
+    """
+    if df is None or df.empty:
+        return {"illness_duration_days": 0, "is_persistent": False, "pattern_type": None}
+    
+    try:
+        df_copy = df.copy()
         df_copy['log_date'] = pd.to_datetime(df_copy['log_date'])
         df_copy = df_copy.sort_values('log_date')
         
@@ -2373,61 +4831,11 @@ def generate_health_guidance(health_issues, df=None, historical_context=None, an
         "details": guidance_items
     }
 
-def predict_illness_risk(activity_level, food_intake, water_intake, bathroom_habits, symptom_count=0, model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
-    """
-    Predict illness risk using activity, food intake, water intake, and bathroom habits.
-    Returns 'low'/'medium'/'high'.
-    Uses trained model if available, otherwise uses conservative rule-based logic.
-    """
-    # Normalize inputs
-    activity_in = str(activity_level or '').strip().lower()
-    food_in = str(food_intake or '').strip().lower()
-    water_in = str(water_intake or '').strip().lower()
-    bathroom_in = str(bathroom_habits or '').strip().lower()
-    symptom_in = int(symptom_count) if symptom_count else 0
-
-    print(f"[ML-PREDICT] Input: activity={activity_in}, food={food_in}, water={water_in}, bathroom={bathroom_in}, symptoms={symptom_in}")
-
-    # Rule-based fallback - distinguishes between serious and minor concerns
-    # SERIOUS issues: not eating/drinking, bathroom problems, 2+ symptoms, low activity
-    # MINOR issues: eating/drinking less (yellow flag but not immediate danger)
-    # Updated to use substring matching for new category values
-    serious_flag = (
-        "not eating" in food_in or
-        "not drinking" in water_in or
-        "diarrhea" in bathroom_in or
-        "constipation" in bathroom_in or
-        "frequent urin" in bathroom_in or
-        "straining" in bathroom_in or
-        "blood" in bathroom_in or
-        "house soiling" in bathroom_in or
-        symptom_in >= 2 or
-        "low" in activity_in
-    )
-    
-    minor_flag = (
-        "eating less" in food_in or
-        "drinking less" in water_in
-    )
-    
-    rule_flag = serious_flag or (minor_flag and "low" in activity_in)  # Only flag "eating less" if also low activity
-    print(f"[ML-PREDICT] Rule-based: serious={serious_flag}, minor={minor_flag}, combined_flag={rule_flag}")
-
-    loaded = load_illness_model(model_path)
-    if not loaded or loaded[0] is None:
-        print(f"[ML-PREDICT] No trained model found, using rule-based fallback")
-        result = "high" if rule_flag else "low"
-        print(f"[ML-PREDICT] → Rule-based result: {result}")
-        return result
-
-    try:
-        model, encoders, act_map, food_map, water_map, bathroom_map, metadata = loaded
-    except Exception as e:
-        print(f"[ML-PREDICT] Failed to unpack loaded model: {e}, using rule-based fallback")
-        result = "high" if rule_flag else "low"
-        print(f"[ML-PREDICT] → Rule-based result: {result}")
-        return result
-
+def _encode_illness_features(activity_in, food_in, water_in, bathroom_in, loaded):
+    """Encode normalized log fields with the label maps/encoders saved alongside the
+    illness model. Returns (act_enc, food_enc, water_enc, bathroom_enc); a field that
+    cannot be encoded is None."""
+    model, encoders, act_map, food_map, water_map, bathroom_map, metadata = loaded
     le_activity, le_food, le_water, le_bathroom = encoders if encoders else (None, None, None, None)
 
     # Encode features
@@ -2527,40 +4935,124 @@ def predict_illness_risk(activity_level, food_intake, water_intake, bathroom_hab
         print(f"[ML-PREDICT] Failed to encode water: {e}")
 
     try:
-        if bathroom_map and bathroom_in in bathroom_map:
-            bathroom_enc = int(bathroom_map[bathroom_in])
-        elif le_bathroom and bathroom_in in getattr(le_bathroom, 'classes_', []):
-            bathroom_enc = int(np.where(getattr(le_bathroom, 'classes_', []) == bathroom_in)[0][0])
-        else:
-            # Fallback: match on keyword if exact value not found
-            bc = None
-            if "diarrhea" in bathroom_in or "loose stool" in bathroom_in:
-                bc = "diarrhea"
-            elif "constipation" in bathroom_in or "hard stool" in bathroom_in:
-                bc = "constipation"
-            elif "frequent urin" in bathroom_in or "frequent urination" in bathroom_in:
-                bc = "frequent urination"
-            elif "straining" in bathroom_in or "strain" in bathroom_in:
-                bc = "straining"
-            elif "blood" in bathroom_in or "bloody" in bathroom_in:
-                bc = "blood in urine"
-            elif "house soiling" in bathroom_in or "accidents" in bathroom_in:
-                bc = "house soiling"
-            elif "normal" in bathroom_in:
-                bc = "normal"
-            else:
-                # Use most common as last resort
-                bc = metadata.get('bathroom_most_common') if metadata else None
-            
-            if bc:
-                if bathroom_map and bc in bathroom_map:
-                    bathroom_enc = int(bathroom_map[bc])
-                    print(f"[ML-PREDICT] Bathroom '{bathroom_in}' mapped to '{bc}'")
-                elif le_bathroom and bc in getattr(le_bathroom, 'classes_', []):
-                    bathroom_enc = int(np.where(getattr(le_bathroom, 'classes_', []) == bc)[0][0])
-                    print(f"[ML-PREDICT] Bathroom '{bathroom_in}' mapped to '{bc}'")
+        if bathroom_map and bathroom_in in bathroom_map:
+            bathroom_enc = int(bathroom_map[bathroom_in])
+        elif le_bathroom and bathroom_in in getattr(le_bathroom, 'classes_', []):
+            bathroom_enc = int(np.where(getattr(le_bathroom, 'classes_', []) == bathroom_in)[0][0])
+        else:
+            # Fallback: match on keyword if exact value not found
+            bc = None
+            if "diarrhea" in bathroom_in or "loose stool" in bathroom_in:
+                bc = "diarrhea"
+            elif "constipation" in bathroom_in or "hard stool" in bathroom_in:
+                bc = "constipation"
+            elif "frequent urin" in bathroom_in or "frequent urination" in bathroom_in:
+                bc = "frequent urination"
+            elif "straining" in bathroom_in or "strain" in bathroom_in:
+                bc = "straining"
+            elif "blood" in bathroom_in or "bloody" in bathroom_in:
+                bc = "blood in urine"
+            elif "house soiling" in bathroom_in or "accidents" in bathroom_in:
+                bc = "house soiling"
+            elif "normal" in bathroom_in:
+                bc = "normal"
+            else:
+                # Use most common as last resort
+                bc = metadata.get('bathroom_most_common') if metadata else None
+            
+            if bc:
+                if bathroom_map and bc in bathroom_map:
+                    bathroom_enc = int(bathroom_map[bc])
+                    print(f"[ML-PREDICT] Bathroom '{bathroom_in}' mapped to '{bc}'")
+                elif le_bathroom and bc in getattr(le_bathroom, 'classes_', []):
+                    bathroom_enc = int(np.where(getattr(le_bathroom, 'classes_', []) == bc)[0][0])
+                    print(f"[ML-PREDICT] Bathroom '{bathroom_in}' mapped to '{bc}'")
+    except Exception as e:
+        print(f"[ML-PREDICT] Failed to encode bathroom: {e}")
+
+    return act_enc, food_enc, water_enc, bathroom_enc
+
+
+def _illness_rule_flag(activity_in, food_in, water_in, bathroom_in, symptom_in):
+    """Rule-based illness flag used when no trained model can score a log.
+
+    Distinguishes between serious and minor concerns:
+    SERIOUS issues: not eating/drinking, bathroom problems, 2+ symptoms, low activity
+    MINOR issues: eating/drinking less (yellow flag but not immediate danger)
+    Returns (serious_flag, minor_flag, rule_flag).
+    """
+    serious_flag = (
+        "not eating" in food_in or
+        "not drinking" in water_in or
+        "diarrhea" in bathroom_in or
+        "constipation" in bathroom_in or
+        "frequent urin" in bathroom_in or
+        "straining" in bathroom_in or
+        "blood" in bathroom_in or
+        "house soiling" in bathroom_in or
+        symptom_in >= 2 or
+        "low" in activity_in
+    )
+    minor_flag = (
+        "eating less" in food_in or
+        "drinking less" in water_in
+    )
+    rule_flag = serious_flag or (minor_flag and "low" in activity_in)  # Only flag "eating less" if also low activity
+    return serious_flag, minor_flag, rule_flag
+
+
+ILLNESS_HIGH_PROBABILITY = 0.75
+ILLNESS_MEDIUM_PROBABILITY = 0.40
+
+
+def _illness_risk_from_probability(p_pos):
+    """Thresholds to convert probability into low/medium/high."""
+    if p_pos >= ILLNESS_HIGH_PROBABILITY:
+        print(f"[ML-PREDICT] → HIGH (p_pos {p_pos:.3f} >= 0.75)")
+        return "high"
+    elif p_pos >= ILLNESS_MEDIUM_PROBABILITY:
+        print(f"[ML-PREDICT] → MEDIUM (p_pos {p_pos:.3f} >= 0.40)")
+        return "medium"
+    else:
+        print(f"[ML-PREDICT] → LOW (p_pos {p_pos:.3f} < 0.40)")
+        return "low"
+
+
+def predict_illness_risk(activity_level, food_intake, water_intake, bathroom_habits, symptom_count=0, model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
+    """
+    Predict illness risk using activity, food intake, water intake, and bathroom habits.
+    Returns 'low'/'medium'/'high'.
+    Uses trained model if available, otherwise uses conservative rule-based logic.
+    """
+    # Normalize inputs
+    activity_in = str(activity_level or '').strip().lower()
+    food_in = str(food_intake or '').strip().lower()
+    water_in = str(water_intake or '').strip().lower()
+    bathroom_in = str(bathroom_habits or '').strip().lower()
+    symptom_in = int(symptom_count) if symptom_count else 0
+
+    print(f"[ML-PREDICT] Input: activity={activity_in}, food={food_in}, water={water_in}, bathroom={bathroom_in}, symptoms={symptom_in}")
+
+    # Rule-based fallback - distinguishes between serious and minor concerns
+    serious_flag, minor_flag, rule_flag = _illness_rule_flag(activity_in, food_in, water_in, bathroom_in, symptom_in)
+    print(f"[ML-PREDICT] Rule-based: serious={serious_flag}, minor={minor_flag}, combined_flag={rule_flag}")
+
+    loaded = load_illness_model(model_path)
+    if not loaded or loaded[0] is None:
+        print(f"[ML-PREDICT] No trained model found, using rule-based fallback")
+        result = "high" if rule_flag else "low"
+        print(f"[ML-PREDICT] → Rule-based result: {result}")
+        return result
+
+    try:
+        model = loaded[0]
+        act_enc, food_enc, water_enc, bathroom_enc = _encode_illness_features(
+            activity_in, food_in, water_in, bathroom_in, loaded)
     except Exception as e:
-        print(f"[ML-PREDICT] Failed to encode bathroom: {e}")
+        print(f"[ML-PREDICT] Failed to unpack loaded model: {e}, using rule-based fallback")
+        result = "high" if rule_flag else "low"
+        print(f"[ML-PREDICT] → Rule-based result: {result}")
+        return result
 
     # If encodings are missing, fallback
     if act_enc is None or food_enc is None or water_enc is None or bathroom_enc is None:
@@ -2587,196 +5079,751 @@ def predict_illness_risk(activity_level, food_intake, water_intake, bathroom_hab
         print(f"[ML-PREDICT] → Rule-based result: {result}")
         return result
 
-    # Thresholds to convert probability into low/medium/high
-    if p_pos >= 0.75:
-        print(f"[ML-PREDICT] → HIGH (p_pos {p_pos:.3f} >= 0.75)")
-        return "high"
-    elif p_pos >= 0.40:
-        print(f"[ML-PREDICT] → MEDIUM (p_pos {p_pos:.3f} >= 0.40)")
-        return "medium"
+    return _illness_risk_from_probability(p_pos)
+
+# ------------------- Batch analysis -------------------
+# Analyses of many pets share one bulk log fetch: the contextual-risk, activity and
+# illness-pattern rules are evaluated with groupby over the combined frame, and every
+# pet's latest log is scored with a single model call.
+BATCH_ANALYSIS_MAX_PETS = int(os.getenv("BATCH_ANALYSIS_MAX_PETS", "500"))
+BATCH_ANALYSIS_CHUNK_SIZE = int(os.getenv("BATCH_ANALYSIS_CHUNK_SIZE", "50"))
+BULK_FETCH_PAGE_SIZE = int(os.getenv("BULK_FETCH_PAGE_SIZE", "1000"))
+_SYMPTOM_PLACEHOLDERS = {"none of the above", "", "none", "unknown"}
+_NO_PATTERNS = {"illness_duration_days": 0, "is_persistent": False, "pattern_type": None}
+
+
+def _count_symptoms(value):
+    """Number of real symptoms in a log's JSON symptoms list."""
+    try:
+        symptoms = json.loads(str(value or "[]"))
+    except Exception:
+        return 0
+    if not isinstance(symptoms, list):
+        return 0
+    return sum(1 for s in symptoms if str(s).lower().strip() not in _SYMPTOM_PLACEHOLDERS)
+
+
+def _fetch_all_pages(build_query, page_size=None):
+    """Rows of a query read page by page; build_query() returns a fresh ordered query."""
+    page_size = page_size or BULK_FETCH_PAGE_SIZE
+    rows, offset = [], 0
+    while True:
+        page = build_query().range(offset, offset + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += len(page)
+
+
+def fetch_logs_bulk(pet_ids=None, days_back=30, limit_per_pet=200):
+    """Recent behavior logs for many pets as one frame with a string pet_id column.
+
+    Pets are queried BATCH_ANALYSIS_CHUNK_SIZE at a time with an `in` filter and each
+    query is paged, so round trips grow with total rows rather than with pets;
+    pet_ids=None reads every pet's recent logs. Like fetch_logs_df() only the last
+    `days_back` days are kept, at most `limit_per_pet` (the latest) per pet.
+    """
+    cutoff_date = (datetime.now() - timedelta(days=days_back)).date()
+
+    def logs_query(chunk=None):
+        query = supabase.table("behavior_logs").select("*")
+        if chunk is not None:
+            query = query.in_("pet_id", chunk)
+        return (query.gte("log_date", cutoff_date.isoformat())
+                .order("log_date", desc=False).order("id", desc=False))
+
+    rows = []
+    if pet_ids is None:
+        rows = _fetch_all_pages(logs_query)
     else:
-        print(f"[ML-PREDICT] → LOW (p_pos {p_pos:.3f} < 0.40)")
-        return "low"
+        pet_ids = [str(pet_id) for pet_id in pet_ids]
+        for start in range(0, len(pet_ids), BATCH_ANALYSIS_CHUNK_SIZE):
+            chunk = pet_ids[start:start + BATCH_ANALYSIS_CHUNK_SIZE]
+            rows.extend(_fetch_all_pages(lambda: logs_query(chunk)))
+    if not rows:
+        return pd.DataFrame(columns=["pet_id", "log_date", "activity_level", "food_intake",
+                                     "water_intake", "bathroom_habits", "symptoms"])
+    df = pd.DataFrame(rows)
+    df['pet_id'] = df['pet_id'].astype(str)
+    df['log_date'] = pd.to_datetime(df['log_date']).dt.date
+    df = df[df['log_date'] >= cutoff_date]
+    df = df.sort_values(['pet_id', 'log_date'], kind='mergesort').groupby('pet_id', sort=False).tail(limit_per_pet)
+    return _normalize_log_columns(df.reset_index(drop=True))
+
+
+def fetch_pets_bulk(pet_ids, columns="id, breed"):
+    """Pet rows for many ids, keyed by string id."""
+    pet_ids = [str(pet_id) for pet_id in pet_ids]
+    pets = {}
+    for start in range(0, len(pet_ids), BATCH_ANALYSIS_CHUNK_SIZE):
+        chunk = pet_ids[start:start + BATCH_ANALYSIS_CHUNK_SIZE]
+        resp = supabase.table("pets").select(columns).in_("id", chunk).execute()
+        for row in resp.data or []:
+            pets[str(row.get("id"))] = row
+    return pets
+
+
+def _prepare_logs_frame(df):
+    """Copy of a combined log frame sorted by pet and date, with datetime log dates and
+    the lowercased health columns the rules test."""
+    frame = df.copy()
+    frame['pet_id'] = frame['pet_id'].astype(str)
+    frame['log_date'] = pd.to_datetime(frame['log_date'])
+    frame = frame.sort_values(['pet_id', 'log_date'], kind='mergesort').reset_index(drop=True)
+    for column in ('activity_level', 'food_intake', 'water_intake', 'bathroom_habits'):
+        frame[f'{column}_lc'] = frame[column].astype(str).str.lower()
+    return frame
+
+
+def compute_contextual_risk_frame(frame):
+    """compute_contextual_risk() for every pet of a _prepare_logs_frame() frame at once.
+
+    Returns a Series of 'low'/'medium'/'high' indexed by pet_id.
+    """
+    recent = frame.groupby('pet_id', sort=False).tail(14)
+    if recent.empty:
+        return pd.Series(dtype=object)
+    act, food = recent['activity_level_lc'], recent['food_intake_lc']
+    water, bath = recent['water_intake_lc'], recent['bathroom_habits_lc']
+
+    def has(column, text):
+        return column.str.contains(text, regex=False, na=False)
+
+    counts = pd.DataFrame({
+        'pet_id': recent['pet_id'],
+        'low_act': has(act, 'low'),
+        'not_eating': has(food, 'not eating').astype(int) + has(food, 'weight loss').astype(int),
+        'not_drinking': has(water, 'not drinking'),
+        'bad_bathroom': sum(has(bath, text).astype(int) for text in
+                            ('diarrhea', 'constipation', 'straining', 'blood', 'house soiling', 'frequent urin')),
+        'normal_food': food == 'normal',
+        'normal_water': water == 'normal',
+    }).groupby('pet_id', sort=False).sum()
+    total = recent.groupby('pet_id', sort=False).size()
+    p_low_act = counts['low_act'] / total
+    p_not_eating = counts['not_eating'] / total
+    p_not_drinking = counts['not_drinking'] / total
+    p_bad_bathroom = counts['bad_bathroom'] / total
+
+    # Change detection: the latest log against a mostly-normal baseline of the earlier ones
+    latest = recent.groupby('pet_id', sort=False).tail(1).set_index('pet_id')
+    earlier = total - 1
+    food_baseline = (counts['normal_food'] - (latest['food_intake_lc'] == 'normal')) > earlier * 0.5
+    water_baseline = (counts['normal_water'] - (latest['water_intake_lc'] == 'normal')) > earlier * 0.5
+    change_detected = (total >= 2) & (
+        (food_baseline & latest['food_intake_lc'].isin(['eating less', 'not eating']))
+        | (water_baseline & latest['water_intake_lc'].isin(['drinking less', 'not drinking'])))
+
+    high = (((p_not_eating > 0.5) | (p_not_drinking > 0.5))
+            & ((counts['low_act'] >= 2) | (p_bad_bathroom > 0.3)))
+    medium = ((p_low_act > 0.7) | (p_not_eating > 0.3) | (p_not_drinking > 0.3)
+              | (p_bad_bathroom > 0.5) | change_detected)
+    return pd.Series(np.select([high, medium], ["high", "medium"], default="low"), index=total.index)
+
+
+def analyze_patterns_frame(frame):
+    """analyze_illness_duration_and_patterns() for every pet of a _prepare_logs_frame()
+    frame, with the streak and period scans done as grouped run-length operations.
+
+    Returns {pet_id: patterns dict}.
+    """
+    if frame.empty:
+        return {}
+    pet = frame['pet_id']
+    act, food = frame['activity_level_lc'], frame['food_intake_lc']
+    water, bath = frame['water_intake_lc'], frame['bathroom_habits_lc']
+    unhealthy = pd.Series(False, index=frame.index)
+    for column, texts in ((act, ('low',)), (food, ('not eating', 'eating less')),
+                          (water, ('not drinking', 'drinking less')),
+                          (bath, ('diarrhea', 'constipation', 'blood', 'straining'))):
+        for text in texts:
+            unhealthy |= column.str.contains(text, regex=False, na=False)
+
+    # Unhealthy runs in log order
+    position = frame.groupby('pet_id', sort=False).cumcount()
+    n_logs = frame.groupby('pet_id', sort=False).size()
+    run_start = unhealthy & ~unhealthy.groupby(pet, sort=False).shift(fill_value=False)
+    run_id = run_start.astype(int).groupby(pet, sort=False).cumsum()
+    runs = (pd.DataFrame({'pet_id': pet[unhealthy], 'run_id': run_id[unhealthy], 'position': position[unhealthy]})
+            .groupby(['pet_id', 'run_id'], sort=True)['position'].agg(['min', 'size']))
+    periods = run_start.groupby(pet, sort=False).sum()
+    last_unhealthy = position[unhealthy].groupby(pet[unhealthy]).max()
+    symptom_counts = frame['symptoms'].map(_count_symptoms) if 'symptoms' in frame else pd.Series(0, index=frame.index)
+    symptoms_at = dict(zip(zip(pet, position), symptom_counts))
+    longest_run = {}
+    for (pet_id, _), (start, size) in zip(runs.index, runs.itertuples(index=False)):
+        if size > longest_run.get(pet_id, (None, 0))[1]:
+            longest_run[pet_id] = (int(start), int(size))
+    sudden = frame.loc[run_start & (position > 0), ['pet_id', 'log_date']]
+    sudden_changes = {}
+    for pet_id, log_date in zip(sudden['pet_id'], sudden['log_date']):
+        sudden_changes.setdefault(pet_id, []).append({"date": str(log_date), "change": "healthy_to_unhealthy"})
+
+    # Calendar-day streaks; days without logs count as healthy
+    daily = (pd.DataFrame({'pet_id': pet, 'day': frame['log_date'].dt.normalize(), 'unhealthy': unhealthy})
+             .groupby(['pet_id', 'day'], sort=True)['unhealthy'].any().reset_index())
+    same_pet = daily['pet_id'].eq(daily['pet_id'].shift())
+    continues = (daily['unhealthy'] & daily['unhealthy'].shift(fill_value=False) & same_pet
+                 & (daily['day'] - daily['day'].shift()).eq(pd.Timedelta(days=1)))
+    daily['streak'] = (daily['unhealthy'] & ~continues).cumsum()
+    streaks = daily[daily['unhealthy']].groupby(['pet_id', 'streak'], sort=True)['day'].agg(['min', 'max', 'size'])
+    longest_day_streak = {}
+    for (pet_id, _), (first_day, _, size) in zip(streaks.index, streaks.itertuples(index=False)):
+        if size > longest_day_streak.get(pet_id, (None, 0))[1]:
+            longest_day_streak[pet_id] = (first_day, int(size))
+    last_day = daily.groupby('pet_id', sort=False).tail(1).set_index('pet_id')
+    current_streaks = streaks.groupby(level='pet_id').tail(1).reset_index(level='streak', drop=True)
+
+    results = {}
+    for pet_id, total in n_logs.items():
+        total = int(total)
+        current_days, current_start, current_end = 0, None, None
+        if bool(last_day.at[pet_id, 'unhealthy']):
+            first_day, end_day, size = current_streaks.loc[pet_id]
+            current_days, current_start, current_end = int(size), first_day, end_day
+        longest_start, longest_days = longest_day_streak.get(pet_id, (None, 0))
+        n_periods = int(periods.get(pet_id, 0))
+
+        pattern_type = None
+        pattern_basis = longest_days or current_days
+        if pattern_basis <= 3:
+            pattern_type = 'acute'
+        elif pattern_basis > 7:
+            pattern_type = 'chronic'
+        if n_periods >= 2:
+            pattern_type = 'cyclical'
+        if pet_id in longest_run:
+            start, size = longest_run[pet_id]
+            end = start + size
+            if end < total and total - end >= 2 and int(last_unhealthy[pet_id]) < end:
+                pattern_type = 'improving'
+            if size >= 2 and symptoms_at[(pet_id, end - 1)] > symptoms_at[(pet_id, start)]:
+                pattern_type = 'worsening'
+
+        results[pet_id] = {
+            "illness_duration_days": current_days,
+            "is_persistent": current_days > 7,
+            "pattern_type": pattern_type,
+            "unhealthy_periods": n_periods,
+            "sudden_changes": sudden_changes.get(pet_id, []),
+            "recovery_history": n_periods > 1,
+            "total_logs_analyzed": total,
+            "current_streak_start": str(current_start.date()) if current_start is not None else None,
+            "current_streak_end": str(current_end.date()) if current_end is not None else None,
+            "current_streak_days": current_days,
+            "longest_unhealthy_streak_days": longest_days,
+            "longest_streak_start": str(longest_start.date()) if longest_start is not None else None,
+        }
+    return results
+
+
+def activity_probabilities_frame(frame):
+    """analyze_pet_df()'s activity probabilities for every pet: {pet_id: {level: p}}."""
+    if frame.empty:
+        return {}
+    shares = frame.groupby('pet_id', sort=False)['activity_level_lc'].value_counts(normalize=True)
+    probabilities = {}
+    for (pet_id, level), share in shares.items():
+        probabilities.setdefault(pet_id, {})[level] = round(float(share), 2)
+    return probabilities
+
+
+def predict_illness_risk_batch(latest, model_path=os.path.join(MODELS_DIR, "illness_model.pkl")):
+    """predict_illness_risk() for many logs with one model load and one model call.
+
+    `latest` holds activity_level, food_intake, water_intake, bathroom_habits and
+    symptom_count columns; returns a list of 'low'/'medium'/'high' in row order.
+    """
+    if latest.empty:
+        return []
+    inputs = list(zip(
+        latest['activity_level'].fillna('').astype(str).str.strip().str.lower(),
+        latest['food_intake'].fillna('').astype(str).str.strip().str.lower(),
+        latest['water_intake'].fillna('').astype(str).str.strip().str.lower(),
+        latest['bathroom_habits'].fillna('').astype(str).str.strip().str.lower(),
+        latest['symptom_count'].fillna(0).astype(int),
+    ))
+    risks = ["high" if _illness_rule_flag(*row)[2] else "low" for row in inputs]
+
+    loaded = load_illness_model(model_path)
+    if not loaded or loaded[0] is None:
+        print(f"[ML-PREDICT] No trained model found, rule-based results for {len(risks)} logs")
+        return risks
+    model = loaded[0]
+
+    encodings, scored_rows, features = {}, [], []
+    for i, (activity_in, food_in, water_in, bathroom_in, symptom_in) in enumerate(inputs):
+        key = (activity_in, food_in, water_in, bathroom_in)
+        if key not in encodings:
+            try:
+                encodings[key] = _encode_illness_features(activity_in, food_in, water_in, bathroom_in, loaded)
+            except Exception as e:
+                print(f"[ML-PREDICT] Failed to encode {key}: {e}")
+                encodings[key] = (None, None, None, None)
+        encoded = encodings[key]
+        if None not in encoded:
+            scored_rows.append(i)
+            features.append([*encoded, symptom_in])
+    if not features:
+        return risks
 
-# Force-train endpoint (useful in dev)
-@app.route("/train", methods=["POST"])
-def train_endpoint():
-    data = request.get_json(silent=True) or {}
-    pet_id = data.get("pet_id")
     try:
-        if pet_id:
-            df = fetch_logs_df(pet_id, limit=10000)
-            if df.empty:
-                return jsonify({"status":"no_data","message":"No behavior_logs for pet_id"}), 200
-            train_illness_model(df)  # saves models/models.pkl
+        X = np.array(features)
+        if hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(X)
+            p_pos = proba[:, 1] if proba.shape[1] > 1 else proba[:, 0]
         else:
-            # train on all pets combined
-            resp = supabase.table("behavior_logs").select("*").order("log_date", desc=False).limit(100000).execute()
-            logs = resp.data or []
-            if not logs:
-                return jsonify({"status":"no_data","message":"No behavior_logs found"}), 200
-            df_all = pd.DataFrame(logs)
-            df_all['log_date'] = pd.to_datetime(df_all['log_date']).dt.date
-            # Sleep hours and mood no longer collected - skip these columns
-            df_all['activity_level'] = df_all['activity_level'].fillna('Unknown').astype(str)
-            train_illness_model(df_all)
-        return jsonify({"status":"ok","message":"Models trained"}), 200
+            p_pos = model.predict(X).astype(float)
+    except Exception as e:
+        print(f"[ML-PREDICT] Batch prediction failed: {e}, using rule-based fallback")
+        return risks
+    model_risks = np.select([p_pos >= ILLNESS_HIGH_PROBABILITY, p_pos >= ILLNESS_MEDIUM_PROBABILITY],
+                            ["high", "medium"], default="low")
+    for i, risk in zip(scored_rows, model_risks):
+        risks[i] = str(risk)
+    print(f"[ML-PREDICT] Scored {len(scored_rows)} of {len(risks)} logs in one model call")
+    return risks
+
+
+def _activity_recommendation(activity_prob):
+    """analyze_pet_df()'s trend and recommendation (mood is no longer collected)."""
+    recommendation = "Keep up the good work!"
+    if activity_prob.get('low', 0) > 0.5:
+        recommendation += " Increase pet activity through playtime."
+    elif activity_prob.get('high', 0) > 0.5:
+        recommendation += " Pet is very active."
+    elif activity_prob.get('medium', 0) > 0.5:
+        recommendation += " Activity level is moderate."
+    return "Pet is doing well overall.", recommendation
+
+
+def _by_pet_or_fallback(label, vectorized, per_pet, frame):
+    """Run a vectorized pass; if it fails, fall back to the per-pet function on each
+    group so one bad pet can't fail the others. Returns {pet_id: value or Exception}."""
+    try:
+        return vectorized(frame)
     except Exception as e:
-        return jsonify({"status":"error","message":str(e)}), 500
+        print(f"[BATCH] {label} vectorized pass failed ({e}); computing per pet")
+    results = {}
+    for pet_id, group in frame.groupby('pet_id', sort=False):
+        try:
+            results[pet_id] = per_pet(group)
+        except Exception as e:
+            results[pet_id] = e
+    return results
 
-@app.route("/test_accuracy", methods=["POST"])
-def test_model_accuracy():
-    """
-    Evaluate the illness prediction model using time-series cross-validation.
-    This endpoint trains on earlier logs and tests on the most recent `test_days`.
 
-    Request body:
-    {
-        "pet_id": "optional",
-        "test_days": 7
-    }
+def analyze_pets_frame(logs, pet_ids, breeds=None, include_patterns=True):
+    """Risk, health status, activity summary and illness patterns for many pets from one
+    combined log frame (see fetch_logs_bulk()).
+
+    Returns {pet_id: result dict or Exception}; pets without logs get the same
+    "No data" result analyze_pet_df() gives. include_patterns=False skips the
+    illness-pattern pass for callers that only need risk and freshness.
     """
+    breeds = breeds or {}
+    pet_ids = [str(pet_id) for pet_id in pet_ids]
+    frame = _prepare_logs_frame(logs) if not logs.empty else _prepare_logs_frame(
+        pd.DataFrame(columns=["pet_id", "log_date", "activity_level", "food_intake",
+                              "water_intake", "bathroom_habits", "symptoms"]))
+    frame = frame[frame['pet_id'].isin(pet_ids)]
+
+    contextual = _by_pet_or_fallback("contextual risk", lambda f: compute_contextual_risk_frame(f).to_dict(),
+                                     compute_contextual_risk, frame)
+    patterns = (_by_pet_or_fallback("illness patterns", analyze_patterns_frame,
+                                    analyze_illness_duration_and_patterns, frame)
+                if include_patterns else {})
+    activity = activity_probabilities_frame(frame)
+
+    latest = frame.groupby('pet_id', sort=False).tail(1).copy()
+    latest['symptom_count'] = latest['symptoms'].map(_count_symptoms) if not latest.empty else []
+    ml_risks = dict(zip(latest['pet_id'], predict_illness_risk_batch(latest)))
+    latest_dates = dict(zip(latest['pet_id'], latest['log_date']))
+    log_counts = frame.groupby('pet_id', sort=False).size().to_dict()
+    illness_model_trained = is_illness_model_trained()
+    now = datetime.now()
+
+    results = {}
+    for pet_id in pet_ids:
+        try:
+            for source in (contextual, patterns):
+                if isinstance(source.get(pet_id), Exception):
+                    raise source[pet_id]
+            log_count = int(log_counts.get(pet_id, 0))
+            if log_count:
+                activity_prob = activity.get(pet_id, {})
+                trend, recommendation = _activity_recommendation(activity_prob)
+                latest_log_date = latest_dates[pet_id]
+                days_since_log = (now - latest_log_date).days
+            else:
+                activity_prob = None
+                trend, recommendation = "No data available.", "Log more behavior data to get analysis."
+                latest_log_date, days_since_log = None, None
+            illness_risk_ml = ml_risks.get(pet_id, "low")
+            contextual_risk = contextual.get(pet_id, "low")
+            blended = blend_illness_risk(illness_risk_ml, contextual_risk)
+            is_unhealthy = blended in ("high", "medium")
+            results[pet_id] = {
+                "pet_id": pet_id,
+                "breed": breeds.get(pet_id),
+                "trend": trend,
+                "recommendation": recommendation,
+                "activity_prob": activity_prob,
+                "activity_probabilities": activity_prob,
+                "illness_risk_ml": illness_risk_ml,
+                "illness_risk_contextual": contextual_risk,
+                "illness_risk_blended": blended,
+                "illness_risk": blended,
+                "illness_prediction": blended,
+                "illness_model_trained": illness_model_trained,
+                "health_status": "unhealthy" if is_unhealthy else "healthy",
+                "is_unhealthy": is_unhealthy,
+                "illness_status_text": "Unhealthy" if is_unhealthy else "Healthy",
+                "log_count": log_count,
+                "latest_log_date": latest_log_date.date().isoformat() if latest_log_date is not None else None,
+                "days_since_log": days_since_log,
+            }
+            if include_patterns:
+                results[pet_id]["illness_patterns"] = patterns.get(pet_id, dict(_NO_PATTERNS))
+        except Exception as e:
+            results[pet_id] = e
+    return results
+
+
+def analyze_pets_batch(pet_ids):
+    """Bulk-fetch and analyze a list of pets; yields (pet_id, result, error) in input
+    order, BATCH_ANALYSIS_CHUNK_SIZE pets per round of queries."""
+    for start in range(0, len(pet_ids), BATCH_ANALYSIS_CHUNK_SIZE):
+        chunk = pet_ids[start:start + BATCH_ANALYSIS_CHUNK_SIZE]
+        started = time.perf_counter()
+        try:
+            pets = fetch_pets_bulk(chunk)
+            logs = fetch_logs_bulk([pet_id for pet_id in chunk if pet_id in pets])
+        except Exception as e:
+            print(f"[BATCH] Bulk fetch failed for {len(chunk)} pets: {e}")
+            for pet_id in chunk:
+                yield pet_id, None, f"Data fetch failed: {e}"
+            continue
+        results = analyze_pets_frame(logs, list(pets), {pet_id: row.get("breed") for pet_id, row in pets.items()})
+        print(f"[BATCH] Analyzed {len(pets)} pets / {len(logs)} logs in {time.perf_counter() - started:.2f}s")
+        for pet_id in chunk:
+            if pet_id not in pets:
+                yield pet_id, None, "Pet not found"
+            elif isinstance(results.get(pet_id), Exception):
+                yield pet_id, None, str(results[pet_id])
+            else:
+                yield pet_id, results[pet_id], None
+
+
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch_endpoint():
+    """Analyze many pets in one call.
 
+    Body: {"pet_ids": [...]}. Returns {"results": {pet_id: analysis}, "errors":
+    {pet_id: message}}; with `Accept: application/x-ndjson` (or "stream": true) one
+    JSON line per pet is streamed as each chunk of pets finishes.
+    """
     data = request.get_json(silent=True) or {}
-    pet_id = data.get("pet_id")
-    test_days = int(data.get("test_days", 7))
+    pet_ids = data.get("pet_ids")
+    if not isinstance(pet_ids, list) or not pet_ids:
+        return jsonify({"error": "pet_ids must be a non-empty list"}), 400
+    pet_ids = list(dict.fromkeys(str(pet_id) for pet_id in pet_ids if pet_id not in (None, "")))
+    if len(pet_ids) > BATCH_ANALYSIS_MAX_PETS:
+        return jsonify({"error": f"At most {BATCH_ANALYSIS_MAX_PETS} pet_ids per request"}), 400
+
+    if "application/x-ndjson" in request.headers.get("Accept", "") or data.get("stream"):
+        def generate():
+            for pet_id, result, error in analyze_pets_batch(pet_ids):
+                line = ({"pet_id": pet_id, "status": "ok", "analysis": result} if error is None
+                        else {"pet_id": pet_id, "status": "error", "error": error})
+                yield json.dumps(line, default=str) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    results, errors = {}, {}
+    for pet_id, result, error in analyze_pets_batch(pet_ids):
+        if error is None:
+            results[pet_id] = result
+        else:
+            errors[pet_id] = error
+    return jsonify({"results": results, "errors": errors})
+
+
+# ------------------- Owner dashboard -------------------
+# A log older than this many days makes a pet's status "stale" (the analysis warns past 7)
+PET_STATUS_STALE_AFTER_DAYS = int(os.getenv("PET_STATUS_STALE_AFTER_DAYS", "7"))
+
+
+def _data_freshness(days_since_log):
+    if days_since_log is None:
+        return "no_logs"
+    return "stale" if days_since_log > PET_STATUS_STALE_AFTER_DAYS else "fresh"
 
+
+@app.route("/owner/<owner_id>/pets/status", methods=["GET"])
+def owner_pets_status_endpoint(owner_id):
+    """Compact risk / health / freshness summary for every pet of an owner.
+
+    One query resolves the pets, one bulk query per chunk loads their recent logs,
+    and all pets are scored in a single analyze_pets_frame() pass.
+    """
     try:
-        from sklearn.metrics import (
-            accuracy_score, precision_score, recall_score,
-            f1_score, confusion_matrix
-        )
+        resp = (supabase.table("pets")
+                .select("id, name, breed, health, is_missing, profile_picture")
+                .eq("owner_id", owner_id).execute())
+        pets = resp.data or []
+        logs = fetch_logs_bulk([pet["id"] for pet in pets]) if pets else pd.DataFrame()
+    except Exception as e:
+        print(f"[OWNER-STATUS] Owner {owner_id}: ⚠ Fetch failed: {e}")
+        return jsonify({"error": "Pet data is temporarily unavailable"}), 503
 
-        results = {
-            "accuracy": None,
-            "precision": None,
-            "recall": None,
-            "f1_score": None,
-            "confusion_matrix": None,
-            "test_samples": 0,
-            "details": []
+    # Serve each pet's snapshot while its inputs are unchanged; analyze only the rest
+    pet_ids = [str(pet["id"]) for pet in pets]
+    breeds = {str(pet["id"]): pet.get("breed") for pet in pets}
+    watermarks = analysis_input_watermarks(logs, pet_ids, breeds)
+    try:
+        snapshots = load_pet_snapshots(pet_ids)
+    except Exception as e:
+        print(f"[OWNER-STATUS] Owner {owner_id}: ⚠ Snapshot lookup failed: {e}")
+        snapshots = {}
+    analyses = {pet_id: snapshots[pet_id]["summary"] for pet_id in pet_ids
+                if pet_id in snapshots and snapshots[pet_id]["watermark"] == watermarks[pet_id]}
+    moved = [pet_id for pet_id in pet_ids if pet_id not in analyses]
+    if moved:
+        computed = analyze_pets_frame(logs, moved, breeds)
+        analyses.update(computed)
+        try:
+            store_pet_snapshots([{"pet_id": pet_id, "watermark": watermarks[pet_id], "summary": _snapshot_summary(result)}
+                                 for pet_id, result in computed.items() if not isinstance(result, Exception)],
+                                source="dashboard")
+        except Exception as e:
+            print(f"[OWNER-STATUS] Owner {owner_id}: ⚠ Could not store snapshots: {e}")
+    summaries = []
+    for pet in pets:
+        pet_id = str(pet["id"])
+        summary = {
+            "pet_id": pet_id,
+            "name": pet.get("name"),
+            "breed": pet.get("breed"),
+            "profile_picture": pet.get("profile_picture"),
+            "is_missing": _is_pet_missing(pet.get("is_missing")),
         }
-
-        # -----------------------------
-        # SELECT PET(S)
-        # -----------------------------
-        if pet_id:
-            pet_ids = [pet_id]
+        analysis = analyses.get(pet_id)
+        if isinstance(analysis, Exception) or analysis is None:
+            summary["error"] = str(analysis) if analysis is not None else "Analysis unavailable"
+            summaries.append(summary)
+            continue
+        risk = analysis["illness_risk_blended"]
+        # Same precedence as the public page: an explicit health flag wins over the risk
+        health_flag = str(pet.get("health") or "").strip().lower()
+        if health_flag in ("good", "bad"):
+            status_text = "Healthy" if health_flag == "good" else "Unhealthy"
         else:
-            pets_resp = supabase.table("pets").select("id").limit(1).execute()
-            pet_ids = [p["id"] for p in (pets_resp.data or [])]
+            status_text = analysis["illness_status_text"]
+        summary.update({
+            "illness_risk": risk,
+            "health_status": analysis["health_status"],
+            "status_text": status_text,
+            "log_count": analysis["log_count"],
+            "latest_log_date": analysis["latest_log_date"],
+            "days_since_log": analysis["days_since_log"],
+            "data_freshness": _data_freshness(analysis["days_since_log"]),
+        })
+        summaries.append(summary)
 
-        if not pet_ids:
-            return jsonify({"warning": "No pets found"}), 200
+    return jsonify({
+        "owner_id": owner_id,
+        "pet_count": len(summaries),
+        "unhealthy_count": sum(1 for s in summaries if s.get("health_status") == "unhealthy"),
+        "pets": summaries,
+    })
 
-        y_true, y_pred = [], []
 
-        # -----------------------------
-        # PROCESS EACH PET
-        # -----------------------------
-        for pid in pet_ids:
+# Force-train endpoint (useful in dev)
+def train_models(pet_id=None):
+    """Train the illness model on one pet's logs, or on all pets' when pet_id is None.
+    Runs as the "train_model" task (see /train). Returns the response payload."""
+    if pet_id:
+        df = fetch_logs_df(pet_id, limit=10000)
+        if df.empty:
+            return {"status":"no_data","message":"No behavior_logs for pet_id"}
+        train_illness_model(df)  # saves models/models.pkl
+    else:
+        # train on all pets combined
+        resp = supabase.table("behavior_logs").select("*").order("log_date", desc=False).limit(100000).execute()
+        logs = resp.data or []
+        if not logs:
+            return {"status":"no_data","message":"No behavior_logs found"}
+        df_all = pd.DataFrame(logs)
+        df_all['log_date'] = pd.to_datetime(df_all['log_date']).dt.date
+        # Sleep hours and mood no longer collected - skip these columns
+        df_all['activity_level'] = df_all['activity_level'].fillna('Unknown').astype(str)
+        train_illness_model(df_all)
+    return {"status":"ok","message":"Models trained"}
 
-            df = fetch_logs_df(pid, limit=500)
-            if df.empty or len(df) < test_days + 10:
-                continue
 
-            df = df.copy()
-            df["log_date"] = pd.to_datetime(df["log_date"])
-            df = df.sort_values("log_date")
+@app.route("/train", methods=["POST"])
+def train_endpoint():
+    data = request.get_json(silent=True) or {}
+    pet_id = data.get("pet_id")
+    # Training on every pet's logs (up to 100k rows) is always past the inline budget
+    return run_heavy_endpoint("train_model", {"pet_id": pet_id} if pet_id else {},
+                              wait=HEAVY_ENDPOINT_WAIT_SECONDS if pet_id else 0,
+                              on_error=lambda message: ({"status": "error", "message": message}, 500))
+
+def evaluate_illness_model(pet_id=None, test_days=7):
+    """Train on each pet's earlier logs and score predictions on its last `test_days`.
+    Runs as the "test_accuracy" task (see /test_accuracy). Returns the response payload."""
+    from sklearn.metrics import (
+        accuracy_score, precision_score, recall_score,
+        f1_score, confusion_matrix
+    )
 
-            # train/test split
-            split_idx = len(df) - test_days
-            train_df = df.iloc[:split_idx]
-            test_df = df.iloc[split_idx:]
+    results = {
+        "accuracy": None,
+        "precision": None,
+        "recall": None,
+        "f1_score": None,
+        "confusion_matrix": None,
+        "test_samples": 0,
+        "details": []
+    }
 
-            # ---------------------------------
-            # TRAIN MODEL ON TRAIN SUBSET ONLY
-            # ---------------------------------
-            try:
-                trained = train_illness_model(train_df)
-                if not trained:
-                    continue
-            except Exception as e:
-                print(f"Training error for pet {pid}: {e}")
+    # -----------------------------
+    # SELECT PET(S)
+    # -----------------------------
+    if pet_id:
+        pet_ids = [pet_id]
+    else:
+        pets_resp = supabase.table("pets").select("id").limit(1).execute()
+        pet_ids = [p["id"] for p in (pets_resp.data or [])]
+
+    if not pet_ids:
+        return {"warning": "No pets found"}
+
+    y_true, y_pred = [], []
+
+    # -----------------------------
+    # PROCESS EACH PET
+    # -----------------------------
+    for pid in pet_ids:
+
+        df = fetch_logs_df(pid, limit=500)
+        if df.empty or len(df) < test_days + 10:
+            continue
+
+        df = df.copy()
+        df["log_date"] = pd.to_datetime(df["log_date"])
+        df = df.sort_values("log_date")
+
+        # train/test split
+        split_idx = len(df) - test_days
+        train_df = df.iloc[:split_idx]
+        test_df = df.iloc[split_idx:]
+
+        # ---------------------------------
+        # TRAIN MODEL ON TRAIN SUBSET ONLY
+        # ---------------------------------
+        try:
+            trained = train_illness_model(train_df)
+            if not trained:
                 continue
+        except Exception as e:
+            print(f"Training error for pet {pid}: {e}")
+            continue
 
-            # ---------------------------------
-            # RUN PREDICTIONS ON TEST SUBSET
-            # ---------------------------------
-            import json
+        # ---------------------------------
+        # RUN PREDICTIONS ON TEST SUBSET
+        # ---------------------------------
+        import json
 
-            for _, row in test_df.iterrows():
+        for _, row in test_df.iterrows():
 
-                activity = str(row.get("activity_level", ""))
-                food = str(row.get("food_intake", ""))
-                water = str(row.get("water_intake", ""))
-                bathroom = str(row.get("bathroom_habits", ""))
+            activity = str(row.get("activity_level", ""))
+            food = str(row.get("food_intake", ""))
+            water = str(row.get("water_intake", ""))
+            bathroom = str(row.get("bathroom_habits", ""))
 
-                # count symptoms
+            # count symptoms
+            symptom_count = 0
+            try:
+                raw = row.get("symptoms", "[]")
+                arr = json.loads(raw) if isinstance(raw, str) else []
+                filtered = [
+                    s for s in arr
+                    if str(s).lower().strip() not in ["none", "none of the above", ""]
+                ]
+                symptom_count = len(filtered)
+            except:
                 symptom_count = 0
-                try:
-                    raw = row.get("symptoms", "[]")
-                    arr = json.loads(raw) if isinstance(raw, str) else []
-                    filtered = [
-                        s for s in arr
-                        if str(s).lower().strip() not in ["none", "none of the above", ""]
-                    ]
-                    symptom_count = len(filtered)
-                except:
-                    symptom_count = 0
 
-                # predicted
-                pred = predict_illness_risk(
-                    activity, food, water, bathroom, symptom_count
-                )
-
-                # ground truth based on the SAME heuristic used for training labels
-                actual_unhealthy = (
-                    (food.lower() in ["not eating", "eating less"]) or
-                    (water.lower() in ["not drinking", "drinking less"]) or
-                    (bathroom.lower() in ["diarrhea", "constipation", "frequent urination"]) or
-                    (symptom_count >= 2) or
-                    (activity.lower() == "low")
-                )
-                actual = "high" if actual_unhealthy else "low"
-
-                # convert to binary (same as training)
-                y_true.append(1 if actual == "high" else 0)
-                y_pred.append(1 if pred in ["high", "medium"] else 0)
-
-                results["details"].append({
-                    "pet_id": pid,
-                    "date": str(row["log_date"].date()),
-                    "predicted": pred,
-                    "actual": actual,
-                    "correct": (pred == actual)
-                })
+            # predicted
+            pred = predict_illness_risk(
+                activity, food, water, bathroom, symptom_count
+            )
 
-        # -----------------------------
-        # COMPUTE METRICS
-        # -----------------------------
-        if y_true and y_pred:
-            results["test_samples"] = len(y_true)
-            results["accuracy"] = round(accuracy_score(y_true, y_pred), 3)
-            results["precision"] = round(precision_score(y_true, y_pred, zero_division=0), 3)
-            results["recall"] = round(recall_score(y_true, y_pred, zero_division=0), 3)
-            results["f1_score"] = round(f1_score(y_true, y_pred, zero_division=0), 3)
-
-            cm = confusion_matrix(y_true, y_pred)
-            if cm.shape == (2, 2):
-                results["confusion_matrix"] = {
-                    "true_negative": int(cm[0][0]),
-                    "false_positive": int(cm[0][1]),
-                    "false_negative": int(cm[1][0]),
-                    "true_positive": int(cm[1][1])
-                }
-            else:
-                results["confusion_matrix"] = "Invalid shape"
+            # ground truth based on the SAME heuristic used for training labels
+            actual_unhealthy = (
+                (food.lower() in ["not eating", "eating less"]) or
+                (water.lower() in ["not drinking", "drinking less"]) or
+                (bathroom.lower() in ["diarrhea", "constipation", "frequent urination"]) or
+                (symptom_count >= 2) or
+                (activity.lower() == "low")
+            )
+            actual = "high" if actual_unhealthy else "low"
+
+            # convert to binary (same as training)
+            y_true.append(1 if actual == "high" else 0)
+            y_pred.append(1 if pred in ["high", "medium"] else 0)
+
+            results["details"].append({
+                "pet_id": pid,
+                "date": str(row["log_date"].date()),
+                "predicted": pred,
+                "actual": actual,
+                "correct": (pred == actual)
+            })
 
-        return jsonify(results)
+    # -----------------------------
+    # COMPUTE METRICS
+    # -----------------------------
+    if y_true and y_pred:
+        results["test_samples"] = len(y_true)
+        results["accuracy"] = round(accuracy_score(y_true, y_pred), 3)
+        results["precision"] = round(precision_score(y_true, y_pred, zero_division=0), 3)
+        results["recall"] = round(recall_score(y_true, y_pred, zero_division=0), 3)
+        results["f1_score"] = round(f1_score(y_true, y_pred, zero_division=0), 3)
+
+        cm = confusion_matrix(y_true, y_pred)
+        if cm.shape == (2, 2):
+            results["confusion_matrix"] = {
+                "true_negative": int(cm[0][0]),
+                "false_positive": int(cm[0][1]),
+                "false_negative": int(cm[1][0]),
+                "true_positive": int(cm[1][1])
+            }
+        else:
+            results["confusion_matrix"] = "Invalid shape"
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return results
+
+
+@app.route("/test_accuracy", methods=["POST"])
+def test_model_accuracy():
+    """
+    Evaluate the illness prediction model using time-series cross-validation.
+    This endpoint trains on earlier logs and tests on the most recent `test_days`.
+
+    Request body:
+    {
+        "pet_id": "optional",
+        "test_days": 7
+    }
+    """
+
+    data = request.get_json(silent=True) or {}
+    params = {"pet_id": data.get("pet_id"), "test_days": int(data.get("test_days", 7))}
+    return run_heavy_endpoint("test_accuracy", params, wait=HEAVY_ENDPOINT_WAIT_SECONDS,
+                              on_error=lambda message: ({"error": message}, 500))
 
 @app.route("/test_accuracy_quick", methods=["POST"])
 def test_model_accuracy_quick():
@@ -2992,37 +6039,164 @@ def migrate_legacy_sleep_forecasts():
     return
 
 
+# ------------------- Startup -------------------
+# Process-level side effects (model housekeeping, the Supabase client, warming the heavy
+# imports, the scheduler) run here instead of at import. __main__ calls init_services()
+# directly; gunicorn workers, which import the app without running __main__, run it
+# before their first request.
+_services_initialized = False
+_shared_state_preloaded = False
+_services_lock = threading.Lock()
+WARM_IMPORTS = ("numpy", "pandas", "joblib", "sklearn.ensemble", "sklearn.preprocessing")
+
+
+def process_memory():
+    """This process's resident memory in MB: rss, plus pss (its share of pages shared
+    with other processes, e.g. copy-on-write with the gunicorn master) where available."""
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as fh:
+            for line in fh:
+                field, _, value = line.partition(":")
+                if field in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    memory[field.lower()] = int(value.split()[0])
+    except OSError:
+        import resource
+        memory["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {key: round(memory[key] / 1024, 1) for key in ("rss", "pss") if key in memory}
+    if "shared_clean" in memory:
+        result["shared"] = round((memory["shared_clean"] + memory["shared_dirty"]) / 1024, 1)
+        result["private"] = round((memory["private_clean"] + memory["private_dirty"]) / 1024, 1)
+    return result
+
+
+def preload_shared_state():
+    """Load what every worker reads but never writes, once, before forking.
+
+    Runs the model cleanup, imports the heavy libraries, loads the model registry and
+    the missing-alert parse cache (templates and matchers are compiled at import), then
+    freezes the GC so collections in the workers don't touch, and thereby copy, the
+    preloaded objects' pages. No threads or clients are created, so it is fork-safe.
+    """
+    global _shared_state_preloaded
+    started = time.perf_counter()
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    if not os.getenv("ANALYZE_TASK_WORKER"):
+        cleanup_incompatible_models()
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
+    models = MODEL_REGISTRY.preload()
+    load_missing_alert_parse_cache()
+    gc.collect()
+    gc.freeze()
+    _shared_state_preloaded = True
+    print(f"[STARTUP] Preloaded {models} model(s) and shared state in {time.perf_counter() - started:.2f}s "
+          f"(pid {os.getpid()}, memory {process_memory()})")
+
+
+def create_app(preload=False):
+    """App factory for WSGI servers (see gunicorn.conf.py). preload=True runs
+    preload_shared_state() now, i.e. in the gunicorn master when preload_app is on."""
+    if preload:
+        preload_shared_state()
+    return app
+
+
+def install_model_reload_signal(signum=signal.SIGUSR1):
+    """Reload the model registry when this process receives `signum`, after running any
+    handler already installed (gunicorn's workers reopen their log files on SIGUSR1)."""
+    previous = signal.getsignal(signum)
+
+    def _reload_models():
+        before = process_memory()
+        count = MODEL_REGISTRY.reload()
+        print(f"[MODELS] Reloaded {count} model(s) in pid {os.getpid()} (memory {before} -> {process_memory()})")
+
+    def _handler(sig, frame):
+        if callable(previous):
+            previous(sig, frame)
+        threading.Thread(target=_reload_models, name="model-reload", daemon=True).start()
+
+    signal.signal(signum, _handler)
+
+
+def _warm_imports():
+    started = time.perf_counter()
+    try:
+        for name in WARM_IMPORTS:
+            importlib.import_module(name)
+        get_supabase_client()
+        print(f"[STARTUP] Warmed imports and Supabase client in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"[STARTUP] ⚠ Import warm-up failed: {e}")
+
+
+def init_services(warm_imports=True, scheduler=True):
+    """Explicit startup hook; idempotent per process.
+
+    Unless preload_shared_state() already ran (in the gunicorn master), cleans up
+    incompatible models (not in the task worker, which shares the web process's
+    models), loads the missing-alert parse cache and warms the heavy imports and the
+    Supabase client on a background thread so the first request isn't held up by them.
+    Then starts the leader-elected scheduler.
+    """
+    global _services_initialized
+    with _services_lock:
+        if _services_initialized:
+            return
+        _services_initialized = True
+    if not _shared_state_preloaded:
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        if not os.getenv("ANALYZE_TASK_WORKER"):
+            cleanup_incompatible_models()
+        load_missing_alert_parse_cache()
+    if warm_imports and not _shared_state_preloaded:
+        threading.Thread(target=_warm_imports, name="warm-imports", daemon=True).start()
+    if scheduler:
+        try:
+            ensure_scheduler_started()
+        except Exception as e:
+            print(f"[SCHEDULER] ⚠ Failed to start scheduler: {e}")
+
+
+@app.before_request
+def _bootstrap_process():
+    if not _services_initialized:
+        init_services()
+
+
 if __name__ == "__main__":
     # Run a one-time migration at startup (safe and idempotent)
     parser = argparse.ArgumentParser()
     parser.add_argument("--task", type=str, default=None,
                         help="Optional task to run directly: daily_analysis | migrate | backfill_sleep | migrate_legacy_sleep_forecasts")
+    parser.add_argument("--shard-index", type=int, default=None,
+                        help="daily_analysis: only run this shard (default: claim any unclaimed shard)")
+    parser.add_argument("--shard-count", type=int, default=None,
+                        help="daily_analysis: number of hash partitions of the pets (default NIGHTLY_SHARD_COUNT)")
     args = parser.parse_args()
 
-    # If invoked with --task, run that task directly (useful for subprocess workers)
+    # If invoked with --task, run that task directly (useful for one-off manual runs)
     if args.task:
-        task = args.task.lower()
-        if task == "daily_analysis":
-            daily_analysis_job()
-        elif task in ("migrate", "migrate_behavior_logs_to_predictions"):
-            migrate_behavior_logs_to_predictions()
-        elif task in ("backfill_sleep", "backfill_future_sleep_forecasts"):
-            backfill_future_sleep_forecasts()
-        elif task in ("migrate_legacy_sleep_forecasts", "migrate_sleep_forecasts"):
-            migrate_legacy_sleep_forecasts()
-        else:
-            print(f"Unknown task: {args.task}")
+        kwargs = {}
+        if args.task.lower() == "daily_analysis":
+            kwargs = {"shard_index": args.shard_index, "shard_count": args.shard_count}
+        try:
+            run_task(args.task, **kwargs)
+        except ValueError as e:
+            print(e)
         sys.exit(0)
 
     # Otherwise run startup migration once and start the webserver with scheduler
+    init_services(scheduler=False)
     try:
         migrate_behavior_logs_to_predictions()
     except Exception as e:
         print(f"Startup migration error: {e}")
 
-    # Start the lightweight scheduler that enqueues heavy jobs as subprocesses
+    # Start the lightweight scheduler that enqueues heavy jobs on the task worker
     try:
-        start_scheduler()
+        ensure_scheduler_started()
     except Exception as e:
         print(f"Failed to start scheduler: {e}")
 
@@ -0,0 +1,48 @@
+"""gunicorn settings for analyze_behavior.
+
+    gunicorn -c analyze_services/gunicorn.conf.py
+
+With preload_app the master imports the app and runs preload_shared_state() (heavy
+imports, model registry, parse cache) once before forking, so workers share those pages
+copy-on-write instead of each loading its own copy. `kill -USR1 <master pid>` makes every
+worker reload its models from disk without a restart. GUNICORN_PRELOAD=0 restores the
+previous per-worker loading.
+
+GUNICORN_WORKER_CLASS=gevent (the default) serves each worker's requests on greenlets,
+so requests overlap their Supabase I/O; "sync" restores one request per worker. The
+patching happens here, before the preloaded app creates any locks or pools.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_preload = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "200"))
+if worker_class == "gevent":
+    # httpcore imports trio when it is installed, and trio needs the select.epoll that
+    # patching removes, so load it first
+    import httpcore  # noqa: F401
+    from gevent import monkey
+    monkey.patch_all()
+
+wsgi_app = f"analyze_behavior:create_app(preload={_preload})"
+bind = f"0.0.0.0:{os.getenv('PORT', os.getenv('BACKEND_PORT', '5000'))}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = _preload
+
+
+def when_ready(server):
+    if preload_app:
+        import analyze_behavior
+        server.log.info("[STARTUP] master memory %s", analyze_behavior.process_memory())
+
+
+def post_worker_init(worker):
+    import analyze_behavior
+    analyze_behavior.init_services(warm_imports=not preload_app)
+    analyze_behavior.install_model_reload_signal()
+    worker.log.info("[STARTUP] worker %s memory %s", worker.pid, analyze_behavior.process_memory())
@@ -0,0 +1,113 @@
+"""Cold-start benchmark for analyze_behavior: import time and time to first byte.
+
+Runs each measurement in a fresh interpreter against a temporary copy of
+analyze_services (startup housekeeping touches the models directory), and prints a
+markdown summary. --write stores it in analyze_services/IMPORTTIME.md; the exit
+status is non-zero when a median exceeds its budget.
+
+    python analyze_services/scripts/importtime_benchmark.py [--runs 5] [--write]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUMMARY_PATH = os.path.join(SERVICE_DIR, "IMPORTTIME.md")
+
+# Budgets for a cold worker: importing the app, and process start to the first byte of
+# a response (the health route, which needs none of the heavy imports).
+IMPORT_BUDGET_MS = 400
+TTFB_BUDGET_MS = 800
+
+ENV = dict(os.environ,
+           SUPABASE_URL=os.getenv("SUPABASE_URL", "http://localhost:54321"),
+           SUPABASE_KEY=os.getenv("SUPABASE_KEY", "benchmark-key"),
+           SCHEDULER_ENABLED="0")
+
+TTFB_SCRIPT = """
+import analyze_behavior
+response = analyze_behavior.app.test_client().get("/")
+assert response.status_code == 200
+print("first-byte")
+"""
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us, depth)} from `python -X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def measure_import(service_dir):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import analyze_behavior"],
+                          cwd=service_dir, env=ENV, capture_output=True, text=True, check=True)
+    return parse_importtime(proc.stderr)
+
+
+def measure_ttfb(service_dir):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", TTFB_SCRIPT], cwd=service_dir, env=ENV,
+                   capture_output=True, text=True, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def summarize(runs, service_dir):
+    import_ms, ttfb_ms, last = [], [], None
+    for _ in range(runs):
+        last = measure_import(service_dir)
+        import_ms.append(last["analyze_behavior"][1] / 1000)
+        ttfb_ms.append(measure_ttfb(service_dir))
+    heaviest = sorted(((cumulative, name) for name, (_, cumulative, depth) in last.items() if depth == 1),
+                      reverse=True)[:8]
+    import_median, ttfb_median = statistics.median(import_ms), statistics.median(ttfb_ms)
+    lines = [
+        "# analyze_behavior cold start",
+        "",
+        f"Generated by `scripts/importtime_benchmark.py` ({runs} runs, Python {sys.version.split()[0]}).",
+        "",
+        "| metric | median | budget | status |",
+        "| --- | --- | --- | --- |",
+        f"| import analyze_behavior | {import_median:.0f} ms | {IMPORT_BUDGET_MS} ms | "
+        f"{'ok' if import_median <= IMPORT_BUDGET_MS else 'OVER'} |",
+        f"| process start to first byte (`GET /`) | {ttfb_median:.0f} ms | {TTFB_BUDGET_MS} ms | "
+        f"{'ok' if ttfb_median <= TTFB_BUDGET_MS else 'OVER'} |",
+        "",
+        "Heaviest direct imports (cumulative, last run):",
+        "",
+        "| module | ms |",
+        "| --- | --- |",
+    ]
+    lines += [f"| {name} | {cumulative / 1000:.1f} |" for cumulative, name in heaviest]
+    return "\n".join(lines) + "\n", import_median <= IMPORT_BUDGET_MS and ttfb_median <= TTFB_BUDGET_MS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--write", action="store_true", help=f"write the summary to {SUMMARY_PATH}")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service_dir = os.path.join(tmp, "analyze_services")
+        shutil.copytree(SERVICE_DIR, service_dir, ignore=shutil.ignore_patterns("__pycache__", "data"))
+        summary, within_budget = summarize(args.runs, service_dir)
+    print(summary)
+    if args.write:
+        with open(SUMMARY_PATH, "w", encoding="utf-8") as fh:
+            fh.write(summary)
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
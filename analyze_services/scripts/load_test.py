@@ -0,0 +1,278 @@
+"""QR-scan load test: sync vs gevent gunicorn workers on the same worker count.
+
+Serves a temporary copy of analyze_services with gunicorn.conf.py, pointed at a local
+PostgREST stand-in that answers every query after a fixed delay (the Supabase round
+trip), and drives GET /pet/<id> (Accept: text/html, a new pet on every request so the
+page and watermark caches don't absorb the load) from concurrent clients. Prints a
+markdown summary per worker class; --write stores it in analyze_services/LOADTEST.md.
+
+--train keeps a full POST /train (every pet's logs) running throughout, to check that
+the scans' latency holds up while the model trains.
+
+    python analyze_services/scripts/load_test.py [--concurrency 32] [--duration 20] [--train] [--write]
+"""
+import argparse
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUMMARY_PATH = os.path.join(SERVICE_DIR, "LOADTEST.md")
+
+LOGS_PER_PET = 30
+TRAINING_PETS = 1000  # pets behind an unfiltered behavior_logs read (a full /train)
+ACTIVITY = ["Low", "Medium", "High"]
+FOOD = ["Normal", "Eating less", "Not eating"]
+SYMPTOMS = ["[]", "[]", "[\"Vomiting\"]", "[\"Vomiting\", \"Coughing\"]"]
+
+
+def _pet_row(pet_id):
+    return {"id": pet_id, "owner_id": "owner-1", "name": f"Pet {pet_id}", "breed": "Aspin",
+            "is_missing": False, "date_of_birth": "2021-01-01", "gender": "Male", "weight": 5,
+            "health": "Good", "updated_at": "2026-01-01T00:00:00+00:00"}
+
+
+def _log_rows(pet_id):
+    seed = int(hashlib.md5(pet_id.encode()).hexdigest()[:8], 16)
+    today = date.today()
+    return [{"id": f"{pet_id}-{day}", "pet_id": pet_id, "log_date": (today - timedelta(days=day)).isoformat(),
+             "activity_level": ACTIVITY[(seed + day) % 3], "food_intake": FOOD[(seed // 3 + day) % 3],
+             "water_intake": "Normal", "bathroom_habits": "Normal", "symptoms": SYMPTOMS[(seed + 2 * day) % 4],
+             "created_at": f"{(today - timedelta(days=day)).isoformat()}T08:00:00+00:00"}
+            for day in range(LOGS_PER_PET)]
+
+
+@lru_cache(maxsize=1)
+def _all_log_rows():
+    return [row for n in range(TRAINING_PETS) for row in _log_rows(f"train-{n}")]
+
+
+class PostgrestStub(BaseHTTPRequestHandler):
+    """Answers PostgREST reads with generated rows after `latency` seconds."""
+    latency = 0.05
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, rows, total=None):
+        body = json.dumps(rows).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        total = len(rows) if total is None else total
+        self.send_header("Content-Range", f"0-{max(len(rows) - 1, 0)}/{total}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        table = url.path.rsplit("/", 1)[-1]
+        params = dict(parse_qsl(url.query))
+        filters = {key: value[3:] for key, value in params.items() if value.startswith("eq.")}
+        if table == "pets" and "id" in filters:
+            rows = [_pet_row(filters["id"])]
+            if "users" in params.get("select", ""):
+                rows[0]["users"] = {"name": "Load Test", "role": "Pet Owner", "profile_picture": ""}
+        elif table == "behavior_logs" and "pet_id" in filters:
+            rows = _log_rows(filters["pet_id"])
+        elif table == "behavior_logs":
+            rows = _all_log_rows()
+        else:
+            rows = []
+        total = len(rows)
+        if "order" in params:
+            column, _, direction = params["order"].partition(".")
+            rows = sorted(rows, key=lambda row: str(row.get(column, "")), reverse=direction.startswith("desc"))
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        self._respond(200, rows, total)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency)
+        self._respond(201, [])
+
+    do_PATCH = do_POST
+
+
+def serve_stub(port, latency):
+    PostgrestStub.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), PostgrestStub)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"service on port {port} did not come up")
+
+
+def drive(port, concurrency, duration, pet_ids):
+    """Scan pages from `concurrency` clients for `duration` seconds; latencies in ms."""
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            with lock:
+                pet_id = next(pet_ids)
+            started = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                conn.request("GET", f"/pet/{pet_id}", headers={"Accept": "text/html"})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def keep_training(port, stop, runs):
+    """POST /train, then poll its job until done, over and over until `stop` is set."""
+    while not stop.is_set():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("POST", "/train", body="{}", headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        body = json.loads(response.read() or b"{}")
+        job_url = body.get("job_url") if response.status == 202 else None
+        while job_url and not stop.is_set():
+            time.sleep(0.5)
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request("GET", job_url)
+            if json.loads(conn.getresponse().read()).get("state") not in ("queued", "running"):
+                break
+        runs.append(response.status)
+
+
+def run_mode(worker_class, args, service_dir, stub_port, pet_ids):
+    port = _free_port()
+    env = dict(os.environ, SUPABASE_URL=f"http://127.0.0.1:{stub_port}", SUPABASE_KEY="load-test-key",
+               SCHEDULER_ENABLED="0", PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_WORKER_CLASS=worker_class)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], cwd=service_dir,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        _wait_for(port)
+        drive(port, args.concurrency, 3, pet_ids)  # warm up every worker
+        stop, training_runs = threading.Event(), []
+        if args.train:
+            trainer = threading.Thread(target=keep_training, args=(port, stop, training_runs))
+            trainer.start()
+        try:
+            latencies, errors = drive(port, args.concurrency, args.duration, pet_ids)
+        finally:
+            stop.set()
+            if args.train:
+                trainer.join()
+    finally:
+        server.send_signal(signal.SIGINT)  # quick shutdown: the run is over
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            # kill the whole group: killing only the master would orphan its workers
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+
+    return {"worker_class": worker_class + (" + /train" if args.train else ""), "requests": len(latencies), "errors": errors,
+            "rps": len(latencies) / args.duration, "p50": statistics.median(latencies) if latencies else float("nan"),
+            "p95": percentile(0.95), "p99": percentile(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per Supabase call")
+    parser.add_argument("--modes", default="sync,gevent")
+    parser.add_argument("--train", action="store_true", help="keep a full /train running during the test")
+    parser.add_argument("--write", action="store_true", help=f"write the summary to {SUMMARY_PATH}")
+    parser.add_argument("--serve-stub", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_stub:
+        serve_stub(args.serve_stub, args.latency)
+        return
+
+    stub_port = _free_port()
+    stub = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve-stub", str(stub_port),
+                             "--latency", str(args.latency)])
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            service_dir = os.path.join(tmp, "analyze_services")
+            shutil.copytree(SERVICE_DIR, service_dir, ignore=shutil.ignore_patterns("__pycache__", "data"))
+            pet_ids = (f"load-{n}" for n in itertools.count())
+            for mode in args.modes.split(","):
+                results.append(run_mode(mode, args, service_dir, stub_port, pet_ids))
+    finally:
+        stub.terminate()
+
+    lines = [
+        "# QR scan load test",
+        "",
+        f"Generated by `scripts/load_test.py`: {args.workers} gunicorn workers, {args.concurrency} concurrent "
+        f"clients for {args.duration:.0f}s, GET /pet/<new id> as HTML, {args.latency * 1000:.0f} ms per "
+        f"Supabase call (Python {sys.version.split()[0]}, {os.cpu_count()} CPUs).",
+        "",
+        "| worker class | requests/s | p50 ms | p95 ms | p99 ms | errors |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    lines += [f"| {r['worker_class']} | {r['rps']:.1f} | {r['p50']:.0f} | {r['p95']:.0f} | {r['p99']:.0f} | "
+              f"{r['errors']} |" for r in results]
+    summary = "\n".join(lines) + "\n"
+    print(summary)
+    if args.write:
+        with open(SUMMARY_PATH, "w", encoding="utf-8") as fh:
+            fh.write(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""MissingAlertIndex queries against an in-memory stand-in for community_posts."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyze_behavior as ab  # noqa: E402
+
+
+def make_post(post_id, created_at, lat=None, lng=None, content="🔍 Missing Pet Alert", **extra):
+    return {"id": post_id, "type": "missing", "content": content, "created_at": created_at,
+            "latitude": lat, "longitude": lng, **extra}
+
+
+class PostsTable:
+    """List-backed fetch_page(since_created_at, offset, limit), oldest first like Supabase."""
+
+    def __init__(self, posts):
+        self.posts = list(posts)
+
+    def __call__(self, since_created_at, offset, limit):
+        rows = sorted((p for p in self.posts if not since_created_at or p["created_at"] >= since_created_at),
+                      key=lambda p: p["created_at"])
+        return rows[offset:offset + limit]
+
+
+@pytest.fixture
+def table():
+    return PostsTable([
+        make_post("cebu-1", "2026-10-01T00:00:00+00:00", 10.3157, 123.8854),   # Cebu City
+        make_post("cebu-2", "2026-10-02T00:00:00+00:00", 10.3300, 123.9000),   # ~2.3 km away
+        make_post("mandaue", "2026-10-03T00:00:00+00:00", 10.3236, 123.9223),  # ~4.1 km away
+        make_post("manila", "2026-10-04T00:00:00+00:00", 14.5995, 120.9842),
+        make_post("no-coords", "2026-10-05T00:00:00+00:00"),
+    ])
+
+
+@pytest.fixture
+def index(table):
+    idx = ab.MissingAlertIndex(fetch_page=table)
+    idx.refresh(force_full=True)
+    return idx
+
+
+def ids(entries):
+    return [entry["post"]["id"] for entry in entries]
+
+
+def test_nearby_returns_posts_within_radius_nearest_first(index):
+    found = index.nearby(10.3157, 123.8854, 3)
+    assert ids(entry for _, entry in found) == ["cebu-1", "cebu-2"]
+    assert found[0][0] == pytest.approx(0.0, abs=1e-6)
+    assert 2.0 < found[1][0] < 3.0
+
+    assert ids(entry for _, entry in index.nearby(10.3157, 123.8854, 5)) == ["cebu-1", "cebu-2", "mandaue"]
+
+
+def test_within_bbox_returns_newest_first(index):
+    assert ids(index.within_bbox(10.0, 123.0, 11.0, 124.0)) == ["mandaue", "cebu-2", "cebu-1"]
+    assert ids(index.within_bbox(14.0, 120.0, 15.0, 121.0)) == ["manila"]
+    assert ids(index.within_bbox(-90, -180, 90, 180)) == ["manila", "mandaue", "cebu-2", "cebu-1"]
+
+
+def test_incremental_refresh_adds_new_posts_to_the_grid(index, table):
+    table.posts.append(make_post("cebu-3", "2026-10-06T00:00:00+00:00", 10.3160, 123.8860))
+    index.refresh()
+    assert "cebu-3" in index.posts
+    assert ids(entry for _, entry in index.nearby(10.3157, 123.8854, 1)) == ["cebu-1", "cebu-3"]
+
+
+def test_lookup_prefers_pet_id_then_owner_then_name():
+    idx = ab.MissingAlertIndex(fetch_page=PostsTable([
+        make_post("by-pet", "2026-10-01T00:00:00+00:00", content="🔍 Missing Pet Alert: Buddy", pet_id="pet-1"),
+        make_post("by-owner", "2026-10-02T00:00:00+00:00", content="🔍 Missing Pet Alert: Max", user_id="owner-1"),
+        make_post("by-name", "2026-10-03T00:00:00+00:00", content="🔍 Missing Pet Alert: Max", user_id="owner-2"),
+        make_post("in-word", "2026-10-04T00:00:00+00:00", content="🔍 Missing Pet Alert #LostMax"),
+    ]))
+    idx.refresh(force_full=True)
+
+    def found(pet_id, owner_id, name):
+        entry = idx.lookup(pet_id, owner_id, name)
+        return entry["post"]["id"] if entry else None
+
+    assert found("pet-1", "owner-1", "Max") == "by-pet"
+    assert found("pet-2", "owner-1", "Max") == "by-owner"
+    # Without an owner match the newest post mentioning the name wins, inside a longer word too
+    assert found("pet-2", "owner-3", " MAX ") == "in-word"
+    assert found(None, None, "buddy") == "by-pet"
+    assert found("pet-2", "owner-3", "Rex") is None
+    assert found(None, None, None) is None
+
+
+
+def test_name_lookup_miss_is_cached_until_a_post_mentions_the_name(index, table):
+    assert index.lookup(None, None, "Rex") is None
+    assert "rex" in index.by_name
+    table.posts.append(make_post("rex", "2026-10-06T00:00:00+00:00", content="🔍 Missing Pet Alert #FindRex"))
+    index.refresh()
+    assert "rex" not in index.by_name
+    assert index.lookup(None, None, "Rex")["post"]["id"] == "rex"
+
+
+@pytest.fixture
+def client(index, monkeypatch):
+    monkeypatch.setattr(ab, "MISSING_ALERT_INDEX", index)
+    # Skip the startup housekeeping, which would clean up the checked-in models directory
+    monkeypatch.setattr(ab, "_services_initialized", True)
+    return ab.app.test_client()
+
+
+def test_feed_cursor_pages_newest_first_without_shifting(client, index, table):
+    first = client.get("/missing?limit=2").get_json()
+    assert [item["post_id"] for item in first["results"]] == ["no-coords", "manila"]
+
+    # A post arriving between pages lands ahead of the cursor, not in the next page
+    table.posts.append(make_post("newest", "2026-10-06T00:00:00+00:00"))
+    index.refresh()
+    second = client.get(f"/missing?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [item["post_id"] for item in second["results"]] == ["mandaue", "cebu-2"]
+
+    third = client.get(f"/missing?limit=2&cursor={second['next_cursor']}").get_json()
+    assert [item["post_id"] for item in third["results"]] == ["cebu-1"]
+    assert third["next_cursor"] is None
+    assert client.get("/missing?limit=1").get_json()["results"][0]["post_id"] == "newest"
+
+
+def test_feed_filters_by_urgency(client, index, table):
+    table.posts.append(make_post("critical", "2026-10-06T00:00:00+00:00",
+                                 content="🚨 CRITICAL MISSING PET ALERT 🚨"))
+    index.refresh()
+    body = client.get("/missing?urgency=critical").get_json()
+    assert [item["post_id"] for item in body["results"]] == ["critical"]
+    assert body["results"][0]["urgency"] == "Critical"
+    assert len(client.get("/missing?urgency=critical,medium").get_json()["results"]) == 6
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "cursor=not-a-cursor", "urgency=urgent"])
+def test_feed_rejects_invalid_queries(client, query):
+    assert client.get(f"/missing?{query}").status_code == 400
+
+
+def test_nearby_endpoint_paginates_with_offset(client):
+    first = client.get("/missing/nearby?lat=10.3157&lng=123.8854&radius_km=5&limit=2").get_json()
+    assert first["total"] == 3
+    assert [item["post_id"] for item in first["results"]] == ["cebu-1", "cebu-2"]
+    assert first["next_offset"] == 2
+
+    second = client.get("/missing/nearby?lat=10.3157&lng=123.8854&radius_km=5&limit=2&offset=2").get_json()
+    assert [item["post_id"] for item in second["results"]] == ["mandaue"]
+    assert second["next_offset"] is None
+    assert second["results"][0]["distance_km"] > 4
+
+
+def test_nearby_endpoint_bbox(client):
+    body = client.get("/missing/nearby?min_lat=10&min_lng=123&max_lat=11&max_lng=124").get_json()
+    assert [item["post_id"] for item in body["results"]] == ["mandaue", "cebu-2", "cebu-1"]
+    assert "distance_km" not in body["results"][0]
+
+
+@pytest.mark.parametrize("query", [
+    "lat=nan&lng=123",
+    "lat=10&lng=123&radius_km=inf",
+    "min_lat=nan&min_lng=0&max_lat=1&max_lng=1",
+    "min_lat=-1e308&min_lng=120&max_lat=90&max_lng=122",
+    "min_lat=10&min_lng=124&max_lat=11&max_lng=123",
+    "lat=abc&lng=1",
+    "",
+])
+def test_nearby_endpoint_rejects_invalid_queries(client, query):
+    assert client.get(f"/missing/nearby?{query}").status_code == 400